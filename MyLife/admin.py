@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from .models import (Profile, Event, EventPostMedia, EventPost, Collaborator, EventInvite, EventCollaborator)
-from .models import (WorkLog) # import WorkLog model
+from .models import (WorkLog, WorkLogRollup) # import WorkLog model and its rollups
 
 admin.site.register(Profile)
 admin.site.register(Event)
@@ -11,4 +11,5 @@ admin.site.register(EventPostMedia)
 admin.site.register(Collaborator)
 admin.site.register(EventInvite)
 admin.site.register(EventCollaborator)
-admin.site.register(WorkLog)
\ No newline at end of file
+admin.site.register(WorkLog)
+admin.site.register(WorkLogRollup)
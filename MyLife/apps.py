@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ProjectConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'MyLife'
+
+    def ready(self):
+        # connect the model signal handlers
+        from . import signals  # noqa: F401
+
+        # tune every new sqlite connection
+        from django.db.backends.signals import connection_created
+        from .db import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='mylife_sqlite_pragmas')
+
+        # count every query of a request towards its metrics, whatever thread it runs on
+        from .metrics import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='mylife_query_recorder')
@@ -0,0 +1,139 @@
+# File: async_views.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: native async versions of the hot read views (dashboard, event details, events feed) for ASGI.
+#              urls.py serves them at the usual urls when MYLIFE_ASYNC_VIEWS is on.
+#              Also the live updates stream (server-sent events), which only works under ASGI
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.generic import View
+
+from .dashboard import abuild_dashboard_snapshot
+from .db import gather_queries, replica_reads
+from .fragments import acached_event_fragments
+from .middleware import aget_request_profile
+from .models import Event
+from .push import format_event, get_broker, profile_channel
+from .views import (CalendarFeedEncoder, ShowEventDetailsView, ShowUserDashboardView,
+                    acalendar_feed_chunks, calendar_feed_etag, calendar_feed_rows, event_details_context,
+                    event_details_loaders, event_viewer_role, parse_calendar_window)
+
+# templates are rendered on a thread, the context processors and templates use the (sync, lazy) request.user
+render_async = sync_to_async(render)
+
+
+class AsyncReadView(View):
+    '''
+    Base of the async views. dispatch is a coroutine (so login_required and the other
+    view decorators use their async versions) and loads request.profile up front,
+    so the views, etag functions and templates can use it without a query.
+    '''
+
+    async def dispatch(self, request, *args, **kwargs):
+        await aget_request_profile(request)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
+class AsyncUserDashboardView(AsyncReadView):
+    '''ShowUserDashboardView, with the four dashboard queries running at the same time'''
+    template_name = ShowUserDashboardView.template_name
+
+    async def get(self, request, *args, **kwargs):
+        profile = request.profile or None
+        context = {'view': self, 'profile': profile}
+        if profile:
+            context.update(await abuild_dashboard_snapshot(profile))
+        return await render_async(request, self.template_name, context)
+
+
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
+@method_decorator(login_required, name="dispatch")
+class AsyncShowEventDetailsView(AsyncReadView):
+    '''
+    ShowEventDetailsView: loads the event, then the viewer's role and the sections
+    whose fragments aren't cached (collaborators, invites, posts) at the same time
+    '''
+    template_name = ShowEventDetailsView.template_name
+
+    async def get(self, request, pk):
+        try:
+            event = await ShowEventDetailsView.queryset.aget(pk=pk)
+        except Event.DoesNotExist:
+            raise Http404("No event found matching the query")
+        cached = await acached_event_fragments(event)
+        missing = {name: load for name, load in event_details_loaders(event).items() if name not in cached}
+        role, *rows = await gather_queries(lambda: event_viewer_role(event, request.profile), *missing.values())
+        context = {'view': self, 'object': event, 'event': event,
+                   **event_details_context(event, request.profile, role, dict(zip(missing, rows)))}
+        return await render_async(request, self.template_name, context)
+
+
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
+@method_decorator(login_required, name="dispatch")
+class AsyncEventJsonFeedView(AsyncReadView):
+    '''
+    EventJsonFeedView on the async ORM. Its one events query needs the profile first,
+    so there is nothing to run at the same time, but it doesn't hold a thread while waiting
+    '''
+    # the browser must revalidate every time, then gets a 304 when nothing changed
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=calendar_feed_etag))
+    async def get(self, request, *args, **kwargs):
+        try:
+            window_start, window_end = parse_calendar_window(request)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        rows = calendar_feed_rows(request.profile, window_start, window_end)
+        return StreamingHttpResponse(acalendar_feed_chunks(rows, CalendarFeedEncoder(window_start, window_end)),
+                                     content_type="application/json")
+
+
+async def live_updates(channel):
+    '''
+    The server-sent events of a channel: every published message, a comment line every
+    MYLIFE_PUSH_HEARTBEAT_SECONDS (keeps proxies from closing an idle connection),
+    and the end after MYLIFE_PUSH_STREAM_SECONDS. The browser's EventSource reconnects by itself.
+    '''
+    heartbeat = getattr(settings, 'MYLIFE_PUSH_HEARTBEAT_SECONDS', 15)
+    closes_at = time.monotonic() + getattr(settings, 'MYLIFE_PUSH_STREAM_SECONDS', 300)
+    async with get_broker().subscribe(channel) as messages:
+        # subscribed, tell the browser how long to wait before reconnecting
+        yield f"retry: {int(heartbeat * 1000)}\n: connected\n\n"
+        while (left := closes_at - time.monotonic()) > 0:
+            try:
+                message = await asyncio.wait_for(messages.get(), timeout=min(heartbeat, left))
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+            else:
+                yield format_event(message)
+
+
+@method_decorator(login_required, name="dispatch")
+class LiveUpdatesView(AsyncReadView):
+    '''
+    server-sent events stream of the logged in profile: new invites, invite answers and new posts
+    on their events. The dashboard and event pages listen to it instead of being reloaded.
+    '''
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            # under WSGI a never ending stream would hold a worker thread for its whole life
+            return HttpResponse("Live updates need the ASGI server.", status=501, content_type="text/plain")
+        if not request.profile:
+            return HttpResponse("Make a profile first.", status=404, content_type="text/plain")
+        response = StreamingHttpResponse(live_updates(profile_channel(request.profile.pk)),
+                                         content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx would hold the events back otherwise
+        return response
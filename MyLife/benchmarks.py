@@ -0,0 +1,295 @@
+# File: benchmarks.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: times the core views against synthetic datasets and returns machine readable results
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from importlib import import_module, reload
+from statistics import median
+import asyncio
+import json
+import platform
+import random
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+
+from . import memberships
+from .models import Profile, Event
+from .synthetic import generate, scale_options
+
+# results format version, bump when the keys change
+RESULTS_FORMAT = 3
+
+# the fullcalendar window the json feed is asked for (inside the generated date range)
+FEED_WINDOW = {'start': '2025-06-01', 'end': '2025-07-06'}
+
+# json feed cost runs: events in the window at each step, and the window (a year from a date of its own)
+FEED_SIZES = (10_000, 100_000)
+FEED_COST_START = date(2030, 1, 1)
+FEED_COST_DAYS = 365
+
+# views that have an async version (async_views.py), compared in the throughput runs
+ASYNC_VIEWS = ('user_dashboard', 'event_details', 'events_json')
+
+
+def view_urls(profile):
+    ''' Returns [(name, url), ...] of the views measured for a profile'''
+    event = (Event.objects.filter(event_creator=profile).annotate(post_count=Count('posts'))
+             .order_by('-post_count', '-event_date').first())
+    urls = [
+        ('user_dashboard', reverse('user_dashboard')),
+        ('show_profile', reverse('show_profile')),
+        ('events_json', f"{reverse('events_json')}?start={FEED_WINDOW['start']}&end={FEED_WINDOW['end']}"),
+    ]
+    if event is not None:
+        urls.insert(2, ('event_details', reverse('event_details', args=[event.pk])))
+    return urls
+
+
+def pick_subjects():
+    '''
+    Returns {"busiest": profile, "typical": profile}: the profile with the most collaborators
+    (the worst case of the power-law graph) and one with a median number.
+    '''
+    ranked = list(Profile.objects.annotate(links=Count('collaborator_links')).order_by('-links', 'pk')
+                  .values_list('pk', flat=True))
+    if not ranked:
+        return {}
+    return {'busiest': Profile.objects.get(pk=ranked[0]),
+            'typical': Profile.objects.get(pk=ranked[len(ranked) // 2])}
+
+
+def _percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))]
+
+
+def time_view(client, url, repeat, warmup=1):
+    '''
+    GET a url warmup + repeat times (fresh cache each time, so every run does the full work).
+    Returns {"status", "queries", "min_ms", "median_ms", "p95_ms", "max_ms"}.
+    '''
+    timings = []
+    for run in range(warmup + repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - start) * 1000
+        if run >= warmup:
+            timings.append(elapsed)
+    return {
+        'status': response.status_code,
+        'queries': len(queries.captured_queries),
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(median(timings), 3),
+        'p95_ms': round(_percentile(timings, 0.95), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+@contextmanager
+def hot_views(use_async):
+    ''' serve the hot views with their sync or async versions (urls.py picks them when it is imported)'''
+    def reload_urls():
+        reload(import_module('MyLife.urls'))
+        reload(import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+    try:
+        with override_settings(MYLIFE_ASYNC_VIEWS=use_async):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+def _drain(response):
+    if response.streaming:
+        b''.join(response.streaming_content)
+
+
+async def _adrain(response):
+    if response.streaming:
+        if response.is_async:
+            async for _ in response.streaming_content:
+                pass
+        else:
+            b''.join(response.streaming_content)
+
+
+def sync_throughput(cookies, url, concurrency, requests):
+    '''
+    The WSGI path: concurrency threads (like a threaded WSGI server), each with its own
+    client and database connection, share the requests. Returns requests per second.
+    '''
+    def worker(count):
+        client = Client()
+        client.cookies = cookies
+        try:
+            for _ in range(count):
+                _drain(client.get(url))
+        finally:
+            connection.close()
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, shares))
+    return requests / (time.perf_counter() - start)
+
+
+def async_throughput(cookies, url, concurrency, requests):
+    ''' The ASGI path: concurrency clients in one event loop share the requests. Returns requests per second.'''
+    async def worker(count):
+        client = AsyncClient()
+        client.cookies = cookies
+        for _ in range(count):
+            await _adrain(await client.get(url))
+
+    async def run():
+        shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(count) for count in shares))
+        return requests / (time.perf_counter() - start)
+    return asyncio.run(run())
+
+
+def compare_throughput(profile, concurrency, requests):
+    '''
+    Requests per second of the sync views under WSGI and their async versions under ASGI,
+    for the hot views of a profile. Returns [{"view", "url", "wsgi_rps", "asgi_rps", "speedup"}, ...].
+    '''
+    login = Client()
+    login.force_login(profile.user)
+    rows = []
+    for view, url in view_urls(profile):
+        if view not in ASYNC_VIEWS:
+            continue
+        cache.clear()
+        with hot_views(use_async=False):
+            wsgi = sync_throughput(login.cookies, url, concurrency, requests)
+        cache.clear()
+        with hot_views(use_async=True):
+            asgi = async_throughput(login.cookies, url, concurrency, requests)
+        rows.append({'view': view, 'url': url, 'wsgi_rps': round(wsgi, 1), 'asgi_rps': round(asgi, 1),
+                     'speedup': round(asgi / wsgi, 2)})
+    return rows
+
+
+def add_feed_events(profile, count, start, days, seed=0):
+    ''' bulk add count events (about a tenth of them weekly series) spread over days from start'''
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        event = Event(event_creator=profile, event_title=f'Feed event {i}', event_type='self',
+                      event_date=start + timedelta(days=rng.randrange(days)))
+        if rng.random() < 0.5:
+            event.event_start_time, event.event_end_time = dt_time(rng.randrange(7, 20), 30), dt_time(21, 0)
+        if rng.random() < 0.1:
+            event.recurrence_frequency, event.recurrence_count = 'weekly', rng.randrange(2, 6)
+        events.append(event)
+    # bulk_create skips the signals, the feed reads the membership index
+    memberships.add_events(Event.objects.bulk_create(events, batch_size=2000))
+
+
+def feed_costs(sizes=FEED_SIZES, repeat=3, log=print):
+    '''
+    The per-event cost of the json feed: a profile gets more and more events inside one window
+    and the whole window is fetched at every size. Returns
+    [{"events", "items", "bytes", "median_ms", "us_per_event"}, ...]
+    '''
+    profile = Profile.objects.create(user=User.objects.create(username='feed-benchmark'), first_name='Feed',
+                                     last_name='Benchmark', email_address='feed@example.com', timezone='EST')
+    client = Client()
+    client.force_login(profile.user)
+    url = f"{reverse('events_json')}?start={FEED_COST_START.isoformat()}&end={(FEED_COST_START + timedelta(days=FEED_COST_DAYS)).isoformat()}"
+    rows, added = [], 0
+    for size in sorted(sizes):
+        add_feed_events(profile, size - added, FEED_COST_START, FEED_COST_DAYS, seed=size)
+        added = size
+        timing = time_view(client, url, repeat)
+        response = client.get(url)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        row = {'events': size, 'items': len(json.loads(body)), 'bytes': len(body), 'median_ms': timing['median_ms'],
+               'us_per_event': round(timing['median_ms'] * 1000 / size, 2)}
+        log(f'   feed {size:7} events {row["median_ms"]:10.2f} ms  {row["us_per_event"]:7.2f} us/event')
+        rows.append(row)
+    return rows
+
+
+def run_benchmarks(scales, repeat=10, seed=0, label='', log=print, concurrency=0, throughput_requests=200,
+                   feed_sizes=()):
+    '''
+    For each scale: empty the database, generate the dataset, then time every view for the
+    busiest and a typical profile. With a concurrency, also compares the WSGI and ASGI
+    throughput of the hot views, and with feed_sizes the per-event cost of the json feed
+    (on its own, after the scales). Destroys the data of the database it runs on,
+    so only call it on a throwaway (test) database. Returns the results as a dict.
+    '''
+    results = {
+        'format': RESULTS_FORMAT,
+        'label': label,
+        'created_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'seed': seed,
+        'repeat': repeat,
+        'scales': {},
+        'results': [],
+        'throughput': [],
+        'feed': [],
+    }
+    for scale in scales:
+        log(f'== {scale}')
+        call_command('flush', interactive=False, verbosity=0)
+        start = time.perf_counter()
+        rows = generate(**scale_options(scale), seed=seed, log=lambda message: log(f'   {message}'))
+        results['scales'][scale] = {'rows': rows, 'generate_seconds': round(time.perf_counter() - start, 2)}
+
+        for subject, profile in pick_subjects().items():
+            client = Client()
+            client.force_login(profile.user)
+            for view, url in view_urls(profile):
+                timing = time_view(client, url, repeat)
+                log(f'   {subject:8} {view:16} {timing["median_ms"]:9.2f} ms  {timing["queries"]:4} queries')
+                results['results'].append({'scale': scale, 'subject': subject, 'view': view, 'url': url, **timing})
+            if concurrency:
+                for row in compare_throughput(profile, concurrency, throughput_requests):
+                    log(f'   {subject:8} {row["view"]:16} wsgi {row["wsgi_rps"]:8.1f}/s  asgi {row["asgi_rps"]:8.1f}/s'
+                        f'  x{row["speedup"]}')
+                    results['throughput'].append({'scale': scale, 'subject': subject, 'concurrency': concurrency,
+                                                  'requests': throughput_requests, **row})
+    if feed_sizes:
+        log('== feed')
+        call_command('flush', interactive=False, verbosity=0)
+        results['feed'] = feed_costs(feed_sizes, repeat, log)
+    return results
+
+
+def compare(old, new):
+    '''
+    Returns [(scale, subject, view, old median ms, new median ms, change %), ...]
+    for the measurements two result files have in common.
+    '''
+    before = {(r['scale'], r['subject'], r['view']): r for r in old['results']}
+    rows = []
+    for r in new['results']:
+        key = (r['scale'], r['subject'], r['view'])
+        if key in before:
+            was = before[key]['median_ms']
+            change = (r['median_ms'] - was) / was * 100 if was else 0.0
+            rows.append((*key, was, r['median_ms'], round(change, 1)))
+    return rows
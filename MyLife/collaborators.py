@@ -0,0 +1,86 @@
+# File: collaborators.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: per-profile collaborator neighbor cache on top of the CollaboratorLink adjacency index
+
+from django.core.cache import cache
+
+from .models import Collaborator, CollaboratorLink
+
+# how long a neighbor list stays cached (it is also dropped on every accept/reject)
+NEIGHBOR_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(profile_id):
+    ''' cache key of one profile's neighbor map'''
+    return f'mylife:collab-neighbors:{profile_id}'
+
+
+def _profile_id(profile):
+    ''' accept a Profile or a plain pk'''
+    return getattr(profile, 'pk', profile)
+
+
+def neighbors(profile):
+    '''
+    Return {collaborator_type: frozenset(other profile ids)} for a profile.
+    Served from the cache, or one indexed query on CollaboratorLink.profile when cold.
+    '''
+    profile_id = _profile_id(profile)
+    key = _cache_key(profile_id)
+    result = cache.get(key)
+    if result is None:
+        grouped = {ctype: set() for ctype, _ in Collaborator.COLLABORATOR_TYPES}
+        rows = CollaboratorLink.objects.filter(profile_id=profile_id).values_list('other_id', 'collaborator_type')
+        for other_id, ctype in rows:
+            grouped.setdefault(ctype, set()).add(other_id)
+        result = {ctype: frozenset(ids) for ctype, ids in grouped.items()}
+        cache.set(key, result, NEIGHBOR_CACHE_TIMEOUT)
+    return result
+
+
+def collaborator_ids(profile, collaborator_type=None):
+    ''' Return the ids of a profile's accepted collaborators, optionally of one type only'''
+    grouped = neighbors(profile)
+    if collaborator_type is not None:
+        return grouped.get(collaborator_type, frozenset())
+    return frozenset().union(*grouped.values())
+
+
+def are_collaborators(profile, other, collaborator_type=None):
+    ''' Return whether two profiles are accepted collaborators (of the given type, if any)'''
+    return _profile_id(other) in collaborator_ids(profile, collaborator_type)
+
+
+def list_collaborators(profile, collaborator_type=None):
+    '''
+    Return a list of dicts for a profile's accepted collaborators:
+    {"profile", "rel_type" ("inviter" if the profile sent the invite, else "invitee"), "collaborator_type", "type_label"}
+    One query on CollaboratorLink with the other profile joined in.
+    '''
+    links = CollaboratorLink.objects.filter(profile_id=_profile_id(profile)).select_related('other').order_by('pk')
+    if collaborator_type is not None:
+        links = links.filter(collaborator_type=collaborator_type)
+    return [
+        {
+            "profile": link.other,
+            "rel_type": "inviter" if link.is_inviter else "invitee",
+            "collaborator_type": link.collaborator_type,
+            "type_label": link.get_collaborator_type_display(),
+        }
+        for link in links
+    ]
+
+
+def invalidate(*profile_ids):
+    ''' Drop the cached neighbor maps of the given profiles'''
+    cache.delete_many([_cache_key(pid) for pid in profile_ids])
+
+
+def sync_collaborator(collaborator, deleted=False):
+    ''' Bring the adjacency index and the cache in line with one Collaborator row'''
+    if collaborator.invite_status == 'accepted' and not deleted:
+        CollaboratorLink.objects.link(collaborator)
+    else:
+        # pending, rejected or deleted relationships are not neighbors
+        CollaboratorLink.objects.unlink(collaborator)
+    invalidate(collaborator.inviter_id, collaborator.invitee_id)
@@ -0,0 +1,14 @@
+# File: context_processors.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: template context shared by every page
+
+from .middleware import get_request_profile
+
+
+def profile(request):
+    '''
+    has_profile (for the nav bar) and current_profile, from the one lookup request.profile does.
+    Views can still put their own "profile" (ex. someone else's page) in the context.
+    '''
+    current = get_request_profile(request)
+    return {'has_profile': current is not None, 'current_profile': current}
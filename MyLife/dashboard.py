@@ -0,0 +1,97 @@
+# File: dashboard.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: loads everything the user dashboard shows in a fixed number of queries
+
+from datetime import date
+from functools import partial
+
+from django.db.models import Q
+
+from .models import Event, EventInvite, Collaborator
+from .collaborators import list_collaborators
+from .db import gather_queries
+
+
+def load_events(profile, today):
+    ''' events the profile created or collaborates on (single query, no duplicates)'''
+    events = list(Event.objects.visible_to(profile))
+    # recurring events show their next date, expanded lazily from today
+    for event in events:
+        if event.is_recurring:
+            event.next_date = event.next_occurrence(today)
+    return events
+
+
+def load_pending_event_invites(profile):
+    ''' pending event invites in both directions, split in python. Returns (received, sent)'''
+    received, sent = [], []
+    event_invites = (
+        EventInvite.objects
+        .filter(Q(invitee=profile) | Q(inviter=profile), invite_status='pending')
+        .select_related('event', 'inviter', 'invitee')
+        .order_by('pk')
+    )
+    for invite in event_invites:
+        if invite.invitee_id == profile.pk:
+            received.append(invite)
+        else:
+            sent.append(invite)
+    return received, sent
+
+
+def load_pending_collab_invites(profile):
+    ''' pending collaborator invites in both directions, split in python. Returns (sent, received)'''
+    sent, received = [], []
+    collaborators = (
+        Collaborator.objects
+        .filter(Q(inviter=profile) | Q(invitee=profile), invite_status='pending')
+        .select_related('inviter', 'invitee')
+        .order_by('pk')
+    )
+    for collab in collaborators:
+        if collab.inviter_id == profile.pk:
+            sent.append(collab)
+        else:
+            received.append(collab)
+    return sent, received
+
+
+def dashboard_loaders(profile, today=None):
+    ''' the four independent queries of the dashboard, as functions (see abuild_dashboard_snapshot)'''
+    today = today or date.today()
+    return (
+        partial(load_events, profile, today),
+        partial(load_pending_event_invites, profile),
+        # accepted collaborators from the symmetric adjacency index
+        partial(list_collaborators, profile),
+        partial(load_pending_collab_invites, profile),
+    )
+
+
+def _snapshot(events, event_invites, accepted_collaborators, collab_invites):
+    return {
+        'events': events,
+        'pending_event_invites_received': event_invites[0],
+        'pending_event_invites_sent': event_invites[1],
+        'collaborators': accepted_collaborators,
+        'pending_collab_invites_sent': collab_invites[0],
+        'pending_collab_invites_received': collab_invites[1],
+    }
+
+
+def build_dashboard_snapshot(profile, today=None):
+    '''
+    Return the dashboard context for a profile:
+    events, pending event invites (received/sent), accepted collaborators
+    and pending collaborator invites (sent/received).
+
+    Always 4 queries no matter how many rows the profile has: one each for events,
+    event invites, accepted collaborators and pending collaborator invites, with the
+    related rows the template prints (inviter, invitee, event) joined in.
+    '''
+    return _snapshot(*(load() for load in dashboard_loaders(profile, today)))
+
+
+async def abuild_dashboard_snapshot(profile, today=None):
+    ''' build_dashboard_snapshot for the async dashboard, the 4 queries run at the same time'''
+    return _snapshot(*await gather_queries(*dashboard_loaders(profile, today)))
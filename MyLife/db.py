@@ -0,0 +1,185 @@
+# File: db.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: read replica routing for the read heavy views, concurrent queries for the async views
+#              and the pragmas every SQLite connection gets
+
+from contextvars import ContextVar
+from functools import wraps
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+# set while a replica_reads view runs
+_replica_allowed = ContextVar('mylife_replica_allowed', default=False)
+# set once this request wrote something (or came right after a request that did)
+_pinned_to_primary = ContextVar('mylife_pinned_to_primary', default=False)
+_wrote = ContextVar('mylife_wrote', default=False)
+
+# cookie that keeps the next requests on the primary for a moment after a write,
+# so a redirect after a POST never reads from a replica that hasn't caught up
+PIN_COOKIE = 'mylife_primary'
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',       # readers don't block the writer (and the other way around)
+    'synchronous': 'NORMAL',     # safe with WAL, much faster than FULL
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,        # negative = KiB, so about 20MB of page cache per connection
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,        # wait for a lock instead of failing with "database is locked"
+}
+
+
+def replica_alias():
+    ''' Returns the configured replica alias, or None when there is no replica'''
+    alias = getattr(settings, 'MYLIFE_REPLICA_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+class ReplicaRouter:
+    '''
+    Reads of this app's models inside replica_reads views go to the replica, everything else to "default".
+    Sessions and users always come from the primary (a login is a write the replica may not have yet).
+    After the first write of a request (and for MYLIFE_REPLICA_PIN_SECONDS after, see
+    ReplicaPinMiddleware) reads stay on the primary, so a request always sees its own writes.
+    '''
+
+    def db_for_read(self, model, **hints):
+        if _replica_allowed.get() and not _pinned_to_primary.get() and model._meta.app_label == 'MyLife':
+            return replica_alias()
+        return None  # default
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        _pinned_to_primary.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema from the primary (replication, or sync_replica)
+        return db != replica_alias()
+
+
+def replica_reads(view):
+    '''
+    Decorator for read heavy views: their queries (and the template rendering,
+    which is done inside, since querysets are lazy) may use the replica. Works on async views too.
+    '''
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            token = _replica_allowed.set(True)
+            try:
+                response = await view(*args, **kwargs)
+                if callable(getattr(response, 'render', None)) and not response.is_rendered:
+                    await sync_to_async(response.render)()
+                return response
+            finally:
+                _replica_allowed.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _replica_allowed.set(True)
+        try:
+            response = view(*args, **kwargs)
+            if callable(getattr(response, 'render', None)) and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            _replica_allowed.reset(token)
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    '''
+    Starts every request with a clean routing state and, when a request wrote,
+    sets a short lived cookie that keeps that browser's next requests on the primary.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pinned = _pinned_to_primary.set(request.COOKIES.get(PIN_COOKIE) == '1')
+        wrote = _wrote.set(False)
+        try:
+            return self.pin(self.get_response(request))
+        finally:
+            _pinned_to_primary.reset(pinned)
+            _wrote.reset(wrote)
+
+    async def __acall__(self, request):
+        pinned = _pinned_to_primary.set(request.COOKIES.get(PIN_COOKIE) == '1')
+        wrote = _wrote.set(False)
+        try:
+            return self.pin(await self.get_response(request))
+        finally:
+            _pinned_to_primary.reset(pinned)
+            _wrote.reset(wrote)
+
+    def pin(self, response):
+        if _wrote.get() and replica_alias():
+            response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'MYLIFE_REPLICA_PIN_SECONDS', 5),
+                                httponly=True, samesite='Lax')
+        return response
+
+
+def _on_worker_thread(query):
+    def run():
+        try:
+            return query()
+        finally:
+            # the worker threads are reused, don't keep their connections past CONN_MAX_AGE
+            close_old_connections()
+    return run
+
+
+async def gather_queries(*queries):
+    '''
+    Run independent ORM calls (functions without arguments) for an async view, returns their results in order.
+    Django's async ORM sends every query through the one database thread, so they would still wait
+    for each other. With MYLIFE_ASYNC_CONCURRENT_QUERIES each call runs on its own worker thread and
+    connection instead, all at the same time. Only for reads: the calls don't share a transaction.
+    '''
+    if not getattr(settings, 'MYLIFE_ASYNC_CONCURRENT_QUERIES', False):
+        return [await sync_to_async(query)() for query in queries]
+    return await asyncio.gather(*(sync_to_async(_on_worker_thread(query), thread_sensitive=False)()
+                                  for query in queries))
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    ''' connection_created handler, tunes every new SQLite connection (MYLIFE_SQLITE_PRAGMAS)'''
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'MYLIFE_SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    # straight on the sqlite3 connection, so they don't show up as queries of the request that connected
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def sync_sqlite_replica(alias=None):
+    '''
+    Copy the primary SQLite database into the replica file with SQLite's online backup,
+    for a local replica stand-in. Returns the replica file name.
+    '''
+    alias = alias or replica_alias()
+    if alias is None:
+        raise ValueError('No replica database is configured.')
+    primary, replica = connections['default'], connections[alias]
+    if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+        raise ValueError('Only SQLite replicas can be copied, real replicas are kept up to date by the database.')
+    primary.ensure_connection()
+    replica.ensure_connection()
+    primary.connection.backup(replica.connection)
+    return replica.settings_dict['NAME']
@@ -0,0 +1,41 @@
+# File: density.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: how many events a profile has per day, by event type, for the year view and the busy-day heatmap.
+#              Single events are counted by the database (GROUP BY day and type over the EventMembership index),
+#              only the recurring series are expanded here, so the work and the answer grow with the days, not the events
+
+from collections import defaultdict
+
+from django.db.models import Count
+
+from . import recurrence
+from .models import Event, EventMembership, membership_window
+
+EVENT_TYPES = [value for value, label in Event.EVENT_TYPES]
+
+
+def daily_counts(profile, start, end):
+    '''
+    Returns [{"date": iso, "total": n, "self": n, "friends": n, "work": n}, ...] for the days in [start, end)
+    (end exclusive) the profile has something on, in date order. Days without events are left out.
+    '''
+    counts = defaultdict(lambda: dict.fromkeys(EVENT_TYPES, 0))
+    rows = EventMembership.objects.filter(membership_window(start, end), profile=profile)
+
+    # single events, counted by the database, one row per (day, type)
+    singles = (rows.filter(event_date__gte=start, event__recurrence_frequency='')
+               .values_list('event_date', 'event_type').order_by().annotate(n=Count('pk')))
+    for day, event_type, n in singles:
+        counts[day][event_type] += n
+
+    # the series (they can start before the window), expanded inside it. A series can have a single
+    # date or none at all (its only date excepted), so these never go through the grouped count
+    series = (rows.exclude(event__recurrence_frequency='')
+              .values_list('event_type', 'event_date', 'event__recurrence_frequency', 'event__recurrence_interval',
+                           'last_date', 'event__recurrence_count', 'event__recurrence_exceptions'))
+    for event_type, *rule in series:
+        for day in recurrence.rule_dates(*rule, window_start=start, window_end=end):
+            counts[day][event_type] += 1
+
+    return [{"date": day.isoformat(), "total": sum(by_type.values()), **by_type}
+            for day, by_type in sorted(counts.items())]
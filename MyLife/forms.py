@@ -1,6 +1,7 @@
 from django import forms
 from .models import * # Import models
 from django.forms import inlineformset_factory ## TO ALLOW MULTIPLE MEDIA FILES PER POST
+from datetime import date
 
 # File: forms.py
 # Author: Si Yeon Cho (seancho@bu.edu)
@@ -25,7 +26,38 @@ class UpdateProfileForm(forms.ModelForm):
         # fields that you can change
         fields = ['email_address', 'profile_photo', 'timezone']
 
-class EventForm(forms.ModelForm):
+class RecurrenceFormMixin(forms.ModelForm):
+    ''' Shared recurrence fields for the event forms, exceptions are typed as comma separated dates'''
+    recurrence_exceptions = forms.CharField(
+        required=False,
+        label='Skip dates',
+        help_text='Comma separated dates to skip (YYYY-MM-DD)',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # show the stored list as comma separated text
+        if self.instance.pk and self.instance.recurrence_exceptions:
+            self.initial['recurrence_exceptions'] = ', '.join(self.instance.recurrence_exceptions)
+
+    def clean_recurrence_exceptions(self):
+        ''' turn the comma separated text into a sorted list of iso dates'''
+        raw = self.cleaned_data.get('recurrence_exceptions') or ''
+        dates = set()
+        for part in raw.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                dates.add(date.fromisoformat(part).isoformat())
+            except ValueError:
+                raise forms.ValidationError(f'"{part}" is not a valid date (YYYY-MM-DD).')
+        return sorted(dates)
+
+# the recurrence fields on an Event
+RECURRENCE_FIELDS = ['recurrence_frequency', 'recurrence_interval', 'recurrence_until', 'recurrence_count', 'recurrence_exceptions']
+
+class EventForm(RecurrenceFormMixin):
     ''' A form to create an event on calendar '''
     class Meta:
         ''' associate this form with the Event model'''
@@ -33,9 +65,9 @@ class EventForm(forms.ModelForm):
         model = Event
 
         # fields associated with an Event
-        fields = ['event_title', 'event_description', 'event_start_time', 'event_end_time', 'event_date', 'event_type']
+        fields = ['event_title', 'event_description', 'event_start_time', 'event_end_time', 'event_date', 'event_type'] + RECURRENCE_FIELDS
 
-class UpdateEventForm(forms.ModelForm):
+class UpdateEventForm(RecurrenceFormMixin):
     ''' A form to update an Event to the database'''
     class Meta:
         ''' associate this form with the Event model'''
@@ -43,7 +75,7 @@ class UpdateEventForm(forms.ModelForm):
         model = Event
 
         # fields that you can change for an event
-        fields = ['event_title', 'event_description', 'event_start_time', 'event_end_time', 'event_date']
+        fields = ['event_title', 'event_description', 'event_start_time', 'event_end_time', 'event_date'] + RECURRENCE_FIELDS
 
 class EventPostForm(forms.ModelForm):
     ''' A form to create a post for an Event to the database'''
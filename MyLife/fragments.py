@@ -0,0 +1,78 @@
+# File: fragments.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: version counters behind the cached template fragments of the event and profile pages.
+#              Every fragment's cache key has its version in it, so bumping the version (from the signals,
+#              and from the bulk paths that skip them) is all it takes to stop serving the old copy
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import F, Q, QuerySet
+
+from .models import Event, EventInvite, Profile
+
+# the {% cache %} fragments of the event page and the Event version each one is keyed by
+# (the template varies them on event.pk and that version, in that order).
+# The profile page's invite lists are keyed by the viewer's Profile.invites_version
+EVENT_FRAGMENTS = {
+    'event_collaborators': 'members_version',
+    'event_pending_invites': 'members_version',
+    'event_posts': 'posts_version',
+}
+
+
+def fragment_cache():
+    ''' the cache the {% cache %} tag stores fragments in'''
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def fragment_keys(obj, fragments):
+    ''' Returns {cache key: fragment name} of an object's fragments at its current versions'''
+    return {make_template_fragment_key(name, [obj.pk, getattr(obj, field)]): name
+            for name, field in fragments.items()}
+
+
+async def acached_event_fragments(event):
+    ''' Returns the names of the event page fragments that are in the cache (one cache round trip)'''
+    keys = fragment_keys(event, EVENT_FRAGMENTS)
+    return {keys[key] for key in await fragment_cache().aget_many(keys)}
+
+
+def _bump(model, field, ids):
+    ''' one UPDATE adding 1 to field, ids is an iterable of pks or a values() queryset (used as a subquery)'''
+    if not isinstance(ids, QuerySet):
+        ids = {pk for pk in ids if pk is not None}
+        if not ids:
+            return
+    model.objects.filter(pk__in=ids).update(**{field: F(field) + 1})
+
+
+def bump_posts_versions(event_ids):
+    ''' the post list of these events changed'''
+    _bump(Event, 'posts_version', event_ids)
+
+
+def bump_members_versions(event_ids):
+    ''' the collaborator or pending invite list of these events changed'''
+    _bump(Event, 'members_version', event_ids)
+
+
+def bump_invites_versions(profile_ids):
+    ''' the invites these profiles received changed'''
+    _bump(Profile, 'invites_version', profile_ids)
+
+
+def event_invitees(event_id):
+    ''' the profiles with a pending invite to an event (their invite lists show its title)'''
+    return EventInvite.objects.filter(event_id=event_id, invite_status='pending').values('invitee_id')
+
+
+def profile_renamed(profile):
+    ''' a name shows up in other people's fragments: the events they are on or invited to, their posts, their invites'''
+    bump_members_versions(Event.objects.filter(Q(memberships__profile=profile) | Q(invites__invitee=profile)).values('pk'))
+    bump_posts_versions(Event.objects.filter(posts__post_author=profile).values('pk'))
+    bump_invites_versions(Profile.objects.filter(
+        Q(pk=profile.pk) | Q(received_event_invites__inviter=profile) | Q(received_collaborator_invites__inviter=profile)
+    ).values('pk'))
@@ -0,0 +1,168 @@
+# File: freebusy.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: free/busy lookups over events: per-profile busy indexes, overlap checks and common free slots
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+import heapq
+
+from .models import Event, EventMembership, membership_window
+
+# the shortest free slot worth suggesting
+DEFAULT_MIN_SLOT = timedelta(minutes=30)
+
+# free slots are only looked for inside these hours of each day
+DEFAULT_DAY_START = time(8)
+DEFAULT_DAY_END = time(20)
+
+# how far ahead a repeating event is checked for conflicts
+CONFLICT_HORIZON = timedelta(days=90)
+
+# every event happens on a single date, so no busy interval is longer than a day
+_MAX_INTERVAL = timedelta(days=1)
+
+# the event columns the busy intervals are made from
+_EVENT_FIELDS = ('pk', 'event_title', 'event_date', 'event_start_time', 'event_end_time', 'event_creator_id',
+                 'recurrence_frequency', 'recurrence_interval', 'recurrence_until', 'recurrence_count',
+                 'recurrence_exceptions')
+
+
+def event_interval(day, start_time, end_time):
+    '''
+    Returns the (start, end) datetimes of an event on a day.
+    Missing times are treated like the calendar feed does (time.min / time.max).
+    '''
+    start = datetime.combine(day, start_time or time.min)
+    end = datetime.combine(day, end_time or time.max)
+    # events with no length (or an end before the start) still block their start time
+    return start, max(end, start + timedelta(microseconds=1))
+
+
+class BusyIndex:
+    '''
+    Sorted busy intervals of one profile inside a window.
+    Intervals are sorted by start and none is longer than a day, so an overlap lookup
+    is a binary search plus a scan of the intervals starting in the day before the range.
+    '''
+
+    def __init__(self, intervals=()):
+        # (start, end, event_pk, title), sorted by start
+        self.intervals = sorted(intervals)
+        self.starts = [interval[0] for interval in self.intervals]
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        ''' Returns the intervals that overlap [start, end)'''
+        first = bisect_left(self.starts, start - _MAX_INTERVAL)
+        last = bisect_left(self.starts, end)
+        return [interval for interval in self.intervals[first:last] if interval[1] > start]
+
+    def is_free(self, start, end):
+        return not self.overlapping(start, end)
+
+    def merged(self):
+        ''' Returns the busy time as sorted, non overlapping (start, end) blocks'''
+        blocks = []
+        for start, end, *_ in self.intervals:
+            if blocks and start <= blocks[-1][1]:
+                blocks[-1][1] = max(blocks[-1][1], end)
+            else:
+                blocks.append([start, end])
+        return [tuple(block) for block in blocks]
+
+
+def build_indexes(profile_ids, start, end, exclude_event=None):
+    '''
+    Returns {profile_id: BusyIndex} of the created and collaborator events of each profile
+    happening in [start, end) (dates, end exclusive). Two queries no matter how many profiles.
+    '''
+    profile_ids = set(profile_ids)
+    # who, out of the asked profiles, is on each event in the window (range scans of the membership index)
+    memberships = EventMembership.objects.filter(membership_window(start, end), profile_id__in=profile_ids)
+    if exclude_event is not None:
+        memberships = memberships.exclude(event_id=exclude_event)
+    attendees = defaultdict(set)
+    for event_id, profile_id in memberships.values_list('event_id', 'profile_id'):
+        attendees[event_id].add(profile_id)
+    events = list(Event.objects.filter(pk__in=memberships.values('event_id')).order_by().only(*_EVENT_FIELDS))
+
+    intervals = defaultdict(list)
+    for event in events:
+        for day in event.occurrences_between(start, end):
+            interval = event_interval(day, event.event_start_time, event.event_end_time) + (event.pk, event.event_title)
+            for profile_id in attendees[event.pk]:
+                intervals[profile_id].append(interval)
+    return {profile_id: BusyIndex(intervals[profile_id]) for profile_id in profile_ids}
+
+
+def find_conflicts(event, profile_ids):
+    '''
+    Returns [(profile_id, day, other_event_pk, other_title), ...] for every other event
+    of the given profiles that overlaps an occurrence of this event
+    (repeating events are checked for CONFLICT_HORIZON).
+    '''
+    window_start = event.event_date
+    window_end = window_start + (CONFLICT_HORIZON if event.is_recurring else timedelta(days=1))
+    days = event.occurrences_between(window_start, window_end)
+    if not days:
+        return []
+    indexes = build_indexes(profile_ids, window_start, window_end, exclude_event=event.pk)
+    conflicts = []
+    for day in days:
+        start, end = event_interval(day, event.event_start_time, event.event_end_time)
+        for profile_id, index in indexes.items():
+            for _, _, other_pk, other_title in index.overlapping(start, end):
+                conflicts.append((profile_id, day, other_pk, other_title))
+    return conflicts
+
+
+def describe_conflicts(conflicts, limit=3):
+    ''' Returns a short readable warning for find_conflicts results, or "" when there are none'''
+    seen = []
+    for _, day, _, title in conflicts:
+        if (title, day) not in seen:
+            seen.append((title, day))
+    if not seen:
+        return ""
+    shown = ", ".join(f"{title} on {day}" for title, day in seen[:limit])
+    more = f" and {len(seen) - limit} more" if len(seen) > limit else ""
+    return f"Heads up: this overlaps {shown}{more}."
+
+
+def common_free_slots(profile_ids, start, end, min_length=DEFAULT_MIN_SLOT,
+                      day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END):
+    '''
+    Returns [(start, end), ...] datetimes when every given profile is free,
+    inside day_start..day_end of each date in [start, end) and at least min_length long.
+    The busy blocks of everyone are merged with one k-way merge of the already sorted lists.
+    '''
+    indexes = build_indexes(profile_ids, start, end)
+    busy = heapq.merge(*(index.merged() for index in indexes.values()))
+
+    slots = []
+    busy_block = next(busy, None)
+    day = start
+    while day < end:
+        cursor = datetime.combine(day, day_start)
+        day_close = datetime.combine(day, day_end)
+        # skip the blocks that ended before this part of the day
+        while busy_block is not None and busy_block[1] <= cursor:
+            busy_block = next(busy, None)
+        while cursor < day_close:
+            if busy_block is None or busy_block[0] >= day_close:
+                free_until = day_close
+            else:
+                free_until = max(busy_block[0], cursor)
+            if free_until - cursor >= min_length:
+                slots.append((cursor, free_until))
+            if free_until >= day_close:
+                break
+            cursor = max(cursor, busy_block[1])
+            busy_block = next(busy, None)
+            while busy_block is not None and busy_block[1] <= cursor:
+                busy_block = next(busy, None)
+        day += timedelta(days=1)
+    return slots
@@ -0,0 +1,242 @@
+# File: ics.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: writes a profile's events as an iCalendar (RFC 5545) feed, one line at a time,
+#              and reads VEVENTs back out of .ics files the same way
+
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from . import recurrence
+
+# identifies this app in the feed and in event UIDs
+PRODID = '-//SoCalendar//MyLife//EN'
+UID_DOMAIN = 'mylife.socalendar'
+
+# icalendar RRULE names of our recurrence frequencies
+RRULE_FREQUENCIES = {
+    recurrence.DAILY: 'DAILY',
+    recurrence.WEEKLY: 'WEEKLY',
+    recurrence.MONTHLY: 'MONTHLY',
+}
+
+# and the other way around, for imports
+FREQUENCIES_BY_RRULE = {name: frequency for frequency, name in RRULE_FREQUENCIES.items()}
+
+# the most octets one content line may have before it has to be folded
+MAX_LINE_OCTETS = 75
+
+
+def escape_text(value):
+    ''' Escape a TEXT value (backslash, semicolon, comma and newlines)'''
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n'))
+
+
+def fold_line(line):
+    ''' Returns a content line folded at 75 octets and terminated with CRLF'''
+    encoded = line.encode('utf-8')
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + '\r\n'
+    parts = []
+    limit = MAX_LINE_OCTETS
+    while encoded:
+        cut = min(limit, len(encoded))
+        # never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = MAX_LINE_OCTETS - 1  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_date(value):
+    return value.strftime('%Y%m%d')
+
+
+def format_datetime(value):
+    ''' floating local time, like the times stored on Event'''
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def event_uid(event_pk):
+    ''' the UID an event is exported with'''
+    return f'event-{event_pk}@{UID_DOMAIN}'
+
+
+def _vevent_lines(event, stamp, url):
+    ''' Yield the unfolded content lines of one VEVENT'''
+    all_day = event.event_start_time is None and event.event_end_time is None
+    yield 'BEGIN:VEVENT'
+    yield f'UID:{event_uid(event.pk)}'
+    yield f'DTSTAMP:{stamp}'
+    if all_day:
+        yield f'DTSTART;VALUE=DATE:{format_date(event.event_date)}'
+        yield f'DTEND;VALUE=DATE:{format_date(event.event_date + timedelta(days=1))}'
+    else:
+        # missing times are treated like the calendar feed does
+        start = datetime.combine(event.event_date, event.event_start_time or time.min)
+        end = datetime.combine(event.event_date, event.event_end_time or time.max.replace(microsecond=0))
+        yield f'DTSTART:{format_datetime(start)}'
+        yield f'DTEND:{format_datetime(max(start, end))}'
+    yield f'SUMMARY:{escape_text(event.event_title)}'
+    if event.event_description:
+        yield f'DESCRIPTION:{escape_text(event.event_description)}'
+    yield f'CATEGORIES:{escape_text(event.get_event_type_display())}'
+    if url:
+        yield f'URL:{url}'
+
+    # recurring events are sent as one VEVENT with their rule, not as copies
+    if event.recurrence_frequency in RRULE_FREQUENCIES:
+        rule = [f'FREQ={RRULE_FREQUENCIES[event.recurrence_frequency]}']
+        if (event.recurrence_interval or 1) > 1:
+            rule.append(f'INTERVAL={event.recurrence_interval}')
+        if event.recurrence_until:
+            until = (format_date(event.recurrence_until) if all_day
+                     else format_datetime(datetime.combine(event.recurrence_until, time(23, 59, 59))))
+            rule.append(f'UNTIL={until}')
+        if event.recurrence_count:
+            rule.append(f'COUNT={event.recurrence_count}')
+        yield 'RRULE:' + ';'.join(rule)
+        for skipped in event.recurrence_exceptions or []:
+            skipped = date.fromisoformat(skipped)
+            if all_day:
+                yield f'EXDATE;VALUE=DATE:{format_date(skipped)}'
+            else:
+                yield f'EXDATE:{format_datetime(datetime.combine(skipped, event.event_start_time or time.min))}'
+    yield 'END:VEVENT'
+
+
+def iter_calendar(events, name, url_for=None, now=None):
+    '''
+    Yield the feed as folded CRLF lines, one event at a time,
+    so a big calendar never has to be built in memory.
+    url_for(event) may return an absolute url for the event page.
+    '''
+    now = now or datetime.now(dt_timezone.utc)
+    stamp = now.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield fold_line('BEGIN:VCALENDAR')
+    yield fold_line('VERSION:2.0')
+    yield fold_line(f'PRODID:{PRODID}')
+    yield fold_line('CALSCALE:GREGORIAN')
+    yield fold_line('METHOD:PUBLISH')
+    yield fold_line(f'X-WR-CALNAME:{escape_text(name)}')
+    for event in events:
+        url = url_for(event) if url_for else None
+        yield ''.join(fold_line(line) for line in _vevent_lines(event, stamp, url))
+    yield fold_line('END:VCALENDAR')
+
+
+def unescape_text(value):
+    ''' Undo escape_text'''
+    out = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            char = next(chars, '')
+            out.append('\n' if char in ('n', 'N') else char)
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+def unfold_lines(lines):
+    ''' Yield logical content lines from raw lines, joining folded continuation lines back together'''
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_content_line(line):
+    '''
+    Split "NAME;PARAM=VALUE:value" into (NAME, {PARAM: VALUE}, value).
+    Raises ValueError when the line has no value.
+    '''
+    # the first colon outside a quoted parameter value ends the name and parameters
+    quoted = False
+    for index, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            break
+    else:
+        raise ValueError(f'not a content line: {line[:40]!r}')
+    head, value = line[:index], line[index + 1:]
+    name, *raw_params = head.split(';')
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def iter_vevents(lines):
+    '''
+    Yield one {NAME: (params, value)} dict per VEVENT, reading the file line by line.
+    Properties a VEVENT has more than once (EXDATE) are kept as lists of (params, value).
+    Lines that can't be parsed are skipped; nested components (VALARM) are ignored.
+    '''
+    event = None
+    depth = 0
+    for line in unfold_lines(lines):
+        try:
+            name, params, value = parse_content_line(line)
+        except ValueError:
+            continue
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT' and event is None:
+                event, depth = {}, 0
+            elif event is not None:
+                depth += 1
+        elif name == 'END':
+            if event is not None and depth:
+                depth -= 1
+            elif event is not None and value.upper() == 'VEVENT':
+                yield event
+                event = None
+        elif event is not None and not depth:
+            if name == 'EXDATE':
+                event.setdefault(name, []).append((params, value))
+            else:
+                event.setdefault(name, (params, value))
+
+
+def parse_ics_datetime(params, value, local_zone):
+    '''
+    Returns a date (VALUE=DATE) or a naive datetime in local_zone.
+    UTC (trailing Z) and TZID times are converted, floating times are kept as they are.
+    Raises ValueError for values that can't be read.
+    '''
+    value = value.strip()
+    if params.get('VALUE', '').upper() == 'DATE' or len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d').date()
+    if value.endswith('Z'):
+        moment = datetime.strptime(value[:-1], '%Y%m%dT%H%M%S').replace(tzinfo=dt_timezone.utc)
+    else:
+        moment = datetime.strptime(value, '%Y%m%dT%H%M%S')
+        if params.get('TZID'):
+            try:
+                moment = moment.replace(tzinfo=ZoneInfo(params['TZID']))
+            except (ZoneInfoNotFoundError, ValueError):
+                pass  # unknown zone names are read as floating time
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(local_zone).replace(tzinfo=None)
+    return moment
+
+
+def parse_rrule(value):
+    ''' Returns {part: value} of an RRULE, e.g. {"FREQ": "WEEKLY", "INTERVAL": "2"}'''
+    rule = {}
+    for part in value.split(';'):
+        key, _, part_value = part.partition('=')
+        if key:
+            rule[key.upper()] = part_value
+    return rule
@@ -0,0 +1,167 @@
+# File: ics_import.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: imports the VEVENTs of large .ics files as a profile's Events, in batches
+
+from datetime import datetime
+from itertools import islice
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import ics, memberships, search
+from .models import Event
+from .signals import bump_calendar_versions
+
+# events per bulk_create / transaction
+DEFAULT_BATCH_SIZE = 1000
+
+# how many bad entries are reported back in detail
+MAX_REPORTED_ERRORS = 50
+
+# the error of an import that stopped part way because the rest of the file isn't text
+NOT_UTF8 = 'The file must be UTF-8 text.'
+
+_TITLE_LENGTH = Event._meta.get_field('event_title').max_length
+_UID_LENGTH = Event._meta.get_field('external_uid').max_length
+# CATEGORIES values we understand, by code and by label
+_EVENT_TYPES = {name.lower(): code for code, label in Event.EVENT_TYPES for name in (code, label)}
+
+
+def _uid_of(vevent):
+    ''' Returns the entry's UID, or a stable stand-in made from its contents when it has none'''
+    uid = vevent.get('UID', (None, ''))[1].strip()
+    if uid:
+        return uid[:_UID_LENGTH]
+    # same file, same entry, same stand-in, so re-imports still match
+    raw = '|'.join(f'{name}:{value}' for name, (_, value) in sorted(
+        (name, prop) for name, prop in vevent.items() if name in ('DTSTART', 'DTEND', 'SUMMARY', 'DESCRIPTION')))
+    return 'sha1:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def build_event(vevent, profile, local_zone):
+    '''
+    Turn one parsed VEVENT into an unsaved Event of the profile.
+    Raises ValueError with a readable message for entries that can't be imported.
+    '''
+    if 'DTSTART' not in vevent:
+        raise ValueError('no DTSTART')
+    start = ics.parse_ics_datetime(*vevent['DTSTART'], local_zone)
+    end = ics.parse_ics_datetime(*vevent['DTEND'], local_zone) if 'DTEND' in vevent else None
+
+    event = Event(event_creator=profile, external_uid=_uid_of(vevent), event_type='self',
+                  event_title=ics.unescape_text(vevent.get('SUMMARY', (None, ''))[1]).strip()[:_TITLE_LENGTH] or '(No title)',
+                  event_description=ics.unescape_text(vevent.get('DESCRIPTION', (None, ''))[1]).strip())
+    if isinstance(start, datetime):
+        event.event_date, event.event_start_time = start.date(), start.time()
+        # the end time is only kept when the event ends the same day
+        if isinstance(end, datetime) and end.date() == start.date() and end >= start:
+            event.event_end_time = end.time()
+    else:
+        event.event_date = start  # all day
+
+    for category in ics.unescape_text(vevent.get('CATEGORIES', (None, ''))[1]).split(','):
+        if category.strip().lower() in _EVENT_TYPES:
+            event.event_type = _EVENT_TYPES[category.strip().lower()]
+            break
+
+    if 'RRULE' in vevent:
+        rule = ics.parse_rrule(vevent['RRULE'][1])
+        frequency = ics.FREQUENCIES_BY_RRULE.get(rule.get('FREQ', '').upper())
+        if frequency is None:
+            raise ValueError(f'unsupported RRULE {vevent["RRULE"][1]!r}')
+        event.recurrence_frequency = frequency
+        event.recurrence_interval = max(int(rule.get('INTERVAL') or 1), 1)
+        if rule.get('COUNT'):
+            event.recurrence_count = max(int(rule['COUNT']), 1)
+        if rule.get('UNTIL'):
+            until = ics.parse_ics_datetime({}, rule['UNTIL'], local_zone)
+            until = until.date() if isinstance(until, datetime) else until
+            event.recurrence_until = max(until, event.event_date)
+        exceptions = set()
+        for params, value in vevent.get('EXDATE', []):
+            for part in value.split(','):
+                skipped = ics.parse_ics_datetime(params, part, local_zone)
+                exceptions.add((skipped.date() if isinstance(skipped, datetime) else skipped).isoformat())
+        event.recurrence_exceptions = sorted(exceptions)
+    return event
+
+
+def _insert_new(profile, new_events, result):
+    '''
+    Insert the events of a batch ({uid: Event}) whose UID the profile doesn't have yet,
+    counting the others as duplicates. Returns the inserted events. Call inside a transaction.
+    '''
+    events = list(new_events.values())
+    while True:
+        # one indexed lookup for every UID in the batch
+        known = set(Event.objects.filter(event_creator=profile, external_uid__in=[e.external_uid for e in events])
+                    .values_list('external_uid', flat=True))
+        result['duplicates'] += len(known)
+        events = [event for event in events if event.external_uid not in known]
+        if not events:
+            return events
+        try:
+            with transaction.atomic():
+                Event.objects.bulk_create(events)
+            return events
+        except IntegrityError:
+            # a second import of the same file running at the same time saved some of them first, look again
+            if not Event.objects.filter(event_creator=profile, external_uid__in=[e.external_uid for e in events]).exists():
+                raise
+
+
+def import_events(lines, profile, batch_size=DEFAULT_BATCH_SIZE):
+    '''
+    Read VEVENTs from an iterable of .ics lines and add them as the profile's Events.
+    Entries whose UID the profile already has (from an earlier import, or earlier in the file)
+    are skipped, so importing the same file again writes nothing.
+    Each batch costs one UID lookup and one bulk_create.
+    Returns {"imported": n, "duplicates": n, "skipped": n, "errors": [messages]}, plus "error" when
+    the file turned out not to be UTF-8 part way (the batches before that stay imported).
+    '''
+    result = {'imported': 0, 'duplicates': 0, 'skipped': 0, 'errors': []}
+    local_zone = timezone.get_current_timezone()
+    vevents = ics.iter_vevents(lines)
+    number = 0
+    while True:
+        try:
+            chunk = list(islice(vevents, batch_size))
+        except UnicodeDecodeError:
+            # lines are decoded as they are read, so this can come after batches were saved
+            result['error'] = NOT_UTF8
+            result['errors'].append(f'the file is not UTF-8 text after event {number}, the rest was not imported')
+            break
+        if not chunk:
+            break
+        new_events = {}
+        for vevent in chunk:
+            number += 1
+            try:
+                event = build_event(vevent, profile, local_zone)
+            except (ValueError, TypeError) as e:
+                result['skipped'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append(f'event {number}: {e}')
+                continue
+            if event.external_uid in new_events:
+                result['duplicates'] += 1
+                continue
+            new_events[event.external_uid] = event
+
+        with transaction.atomic():
+            events = _insert_new(profile, new_events, result)
+            if not events:
+                continue
+            # bulk_create skips the signals, so read the new rows back for the search index and the membership index
+            saved = list(Event.objects.filter(event_creator=profile, external_uid__in=[e.external_uid for e in events])
+                         .only('pk', 'event_title', 'event_description', 'event_creator_id', 'event_date', 'event_type',
+                               'recurrence_frequency', 'recurrence_until'))
+            search.index_events(saved)
+            memberships.add_events(saved)
+        result['imported'] += len(saved)
+
+    if result['imported']:
+        # mark the calendar as changed too
+        bump_calendar_versions([profile.pk])
+    return result
@@ -0,0 +1,89 @@
+# File: invites.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: the invite state machine (pending -> accepted / rejected) for collaborator and event invites.
+#              Every transition is one conditional UPDATE over a whole batch, so a double click or two
+#              racing requests can only settle an invite once. update() skips the post_save signals, so the
+#              side effects they would do (links, memberships, calendar and fragment versions, live updates) are done here
+
+from django.db import transaction
+
+from . import collaborators, fragments, memberships, push
+from .models import Collaborator, CollaboratorLink, EventCollaborator
+from .signals import bump_calendar_versions
+
+# the decision in the urls -> the status it moves an invite to
+DECISIONS = {'accept': 'accepted', 'reject': 'rejected'}
+
+
+def _settle(invites, status):
+    '''
+    Move the still pending invites of a queryset to status with one UPDATE ... WHERE invite_status = 'pending'.
+    Returns the rows that were moved (already answered ones are left alone). Call inside a transaction.
+    '''
+    # lock them first (where the database can), so the UPDATE moves exactly the rows we read
+    rows = list(invites.filter(invite_status='pending').select_for_update(of=('self',)))
+    if rows:
+        invites.model.objects.filter(pk__in=[row.pk for row in rows], invite_status='pending').update(invite_status=status)
+        for row in rows:
+            row.invite_status = status
+    return rows
+
+
+def settle_collaborator_invites(invites, decision):
+    '''
+    Accept or reject ('accept' / 'reject') the pending Collaborator invites of a queryset in one transaction.
+    Returns the settled invites.
+    '''
+    status = DECISIONS[decision]
+    with transaction.atomic():
+        settled = _settle(invites.select_related('inviter', 'invitee'), status)
+        if settled and status == 'accepted':
+            # the adjacency index gets both directions of every pair in one insert
+            CollaboratorLink.objects.link_all(settled)
+            collaborators.invalidate(*{pk for invite in settled for pk in (invite.inviter_id, invite.invitee_id)})
+        fragments.bump_invites_versions(invite.invitee_id for invite in settled)
+        for invite in settled:
+            push.notify_collaborator_invite(invite, created=False)
+    return settled
+
+
+def settle_event_invites(invites, decision):
+    '''
+    Accept or reject ('accept' / 'reject') the pending EventInvites of a queryset in one transaction.
+    Accepting makes the invitee an attendee of the event. Returns the settled invites.
+    '''
+    status = DECISIONS[decision]
+    with transaction.atomic():
+        settled = _settle(invites.select_related('event', 'inviter', 'invitee'), status)
+        if not settled:
+            return settled
+        if status == 'accepted':
+            joined = [EventCollaborator(event=invite.event, collaborator_id=invite.invitee_id, role='attendee')
+                      for invite in settled]
+            # the unique (event, collaborator) constraint keeps a racing accept from adding anyone twice
+            EventCollaborator.objects.bulk_create(joined, ignore_conflicts=True)
+            memberships.add_collaborators(joined)
+        # the invites (and the new collaborators' calendars) changed for both sides
+        bump_calendar_versions(pk for invite in settled for pk in (invite.inviter_id, invite.invitee_id))
+        fragments.bump_members_versions(invite.event_id for invite in settled)
+        fragments.bump_invites_versions(invite.invitee_id for invite in settled)
+        for invite in settled:
+            push.notify_event_invite_response(invite)
+    return settled
+
+
+def reopen_collaborator_invite(inviter, invitee, collaborator_type):
+    '''
+    Send a rejected Collaborator invite again: one conditional UPDATE back to pending.
+    Returns whether there was a rejected invite to reopen.
+    '''
+    with transaction.atomic():
+        invites = Collaborator.objects.filter(inviter=inviter, invitee=invitee, collaborator_type=collaborator_type)
+        if not invites.filter(invite_status='rejected').update(invite_status='pending'):
+            return False
+        # update() skips the signals that tell the invitee and refresh their invite list
+        fragments.bump_invites_versions([invitee.pk])
+        invite = invites.get()
+        invite.inviter = inviter
+        push.notify_collaborator_invite(invite, created=True)
+    return True
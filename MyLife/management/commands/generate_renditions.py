@@ -0,0 +1,25 @@
+# File: generate_renditions.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: backfill the small/medium/large renditions of post images
+
+from django.core.management.base import BaseCommand
+
+from MyLife.models import EventPostMedia
+from MyLife.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized renditions of EventPostMedia images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='regenerate every image, not only pending/failed ones')
+
+    def handle(self, *args, **options):
+        media = EventPostMedia.objects.all()
+        if not options['all']:
+            media = media.exclude(renditions_status='ready')
+        done = 0
+        for media_id in media.values_list('pk', flat=True).iterator():
+            generate_renditions(media_id)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} image(s).'))
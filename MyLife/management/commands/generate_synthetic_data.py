@@ -0,0 +1,30 @@
+# File: generate_synthetic_data.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: fill the database with a large deterministic dataset (profiles, collaborator graph, events, posts, work logs)
+
+from django.core.management.base import BaseCommand, CommandError
+
+from MyLife.synthetic import SCALES, generate, has_synthetic_data, scale_options
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset for benchmarks; the same --scale/--seed always gives the same rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='preset size')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--profiles', type=int, help='override the number of profiles')
+        parser.add_argument('--events-per-profile', type=int, help='override the events each profile creates')
+        parser.add_argument('--links-per-profile', type=int, help='collaborators each new profile links to')
+        parser.add_argument('--worklogs', type=int, help='override the number of work logs')
+
+    def handle(self, *args, **options):
+        if has_synthetic_data():
+            raise CommandError('This database already has synthetic data, use a fresh one.')
+        sizes = scale_options(options['scale'], profiles=options['profiles'],
+                              events_per_profile=options['events_per_profile'],
+                              links_per_profile=options['links_per_profile'], worklogs=options['worklogs'])
+        created = generate(**sizes, seed=options['seed'], log=self.stdout.write)
+        for table, count in created.items():
+            self.stdout.write(f'{table:22} {count}')
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,40 @@
+# File: import_ics.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: stream the events of an .ics file into a profile's calendar in batches
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from MyLife.ics_import import DEFAULT_BATCH_SIZE, import_events
+from MyLife.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Import the events of an .ics file for a user ("-" reads stdin); already imported UIDs are skipped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='user whose profile gets the events')
+        parser.add_argument('path', help='.ics file to import, or - for stdin')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='events per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            profile = Profile.objects.get(user__username=options['username'])
+        except Profile.DoesNotExist:
+            raise CommandError(f"No profile for user {options['username']!r}")
+
+        path = options['path']
+        try:
+            if path == '-':
+                result = import_events(sys.stdin, profile, options['batch_size'])
+            else:
+                with open(path, newline='', encoding='utf-8') as lines:
+                    result = import_events(lines, profile, options['batch_size'])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} event(s), {result['duplicates']} already there, skipped {result['skipped']}."))
@@ -0,0 +1,36 @@
+# File: import_worklogs.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: stream a CSV/NDJSON file of work logs into WorkLog in batches
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from MyLife.worklog_io import DEFAULT_BATCH_SIZE, FORMATS, guess_format, import_worklogs, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import WorkLog rows from a CSV or NDJSON file ("-" reads stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='file to import, or - for stdin')
+        parser.add_argument('--format', choices=FORMATS, help='defaults to the file extension, else csv')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='rows per transaction')
+        parser.add_argument('--skip-errors', action='store_true', help='skip bad rows instead of stopping')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        try:
+            if path == '-':
+                result = import_worklogs(read_rows(sys.stdin, fmt), options['batch_size'], options['skip_errors'])
+            else:
+                with open(path, newline='', encoding='utf-8') as lines:
+                    result = import_worklogs(read_rows(lines, fmt), options['batch_size'], options['skip_errors'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} work log(s), skipped {result['skipped']}."))
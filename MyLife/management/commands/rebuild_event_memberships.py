@@ -0,0 +1,15 @@
+# File: rebuild_event_memberships.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: refill the EventMembership index from the events and their collaborators
+
+from django.core.management.base import BaseCommand
+
+from MyLife.memberships import rebuild_memberships
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the EventMembership table from every Event and EventCollaborator (backfill or repair)'
+
+    def handle(self, *args, **options):
+        written = rebuild_memberships()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} membership row(s).'))
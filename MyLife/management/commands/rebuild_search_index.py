@@ -0,0 +1,18 @@
+# File: rebuild_search_index.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: refill the full text search index from the Event and EventPost tables
+
+from django.core.management.base import BaseCommand
+
+from MyLife.search import is_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the event/post search index (after bulk loads or if it got out of sync)'
+
+    def handle(self, *args, **options):
+        if not is_available():
+            self.stdout.write('The search index needs SQLite (FTS5), nothing to rebuild.')
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} event(s) and post(s).'))
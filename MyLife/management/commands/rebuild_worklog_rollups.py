@@ -0,0 +1,15 @@
+# File: rebuild_worklog_rollups.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: recompute the WorkLog daily/weekly/monthly rollups from the raw logs
+
+from django.core.management.base import BaseCommand
+
+from MyLife.worklog_rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the WorkLogRollup table from every WorkLog (backfill or repair)'
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup row(s).'))
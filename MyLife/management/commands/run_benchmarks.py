@@ -0,0 +1,69 @@
+# File: run_benchmarks.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: time the dashboard, profile, event detail and json feed views at several data scales,
+#              and optionally compare the WSGI and ASGI throughput of the hot views
+#              and time the json feed with very many events
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from MyLife.benchmarks import compare, run_benchmarks
+from MyLife.synthetic import SCALES
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the core views on generated data and write the results as JSON. '
+            'Runs on a separate test database, the real one is never touched.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='tiny,small', help=f'comma separated, from {", ".join(SCALES)}')
+        parser.add_argument('--repeat', type=int, default=10, help='timed requests per view')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='', help='stored in the results, ex. a version or branch')
+        parser.add_argument('--output', default='benchmark-results.json', help='results file, - for stdout')
+        parser.add_argument('--compare', help='earlier results file to print the changes against')
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='also compare the WSGI and ASGI throughput of the hot views with this many '
+                                 'requests in flight (0 = skip)')
+        parser.add_argument('--throughput-requests', type=int, default=200, help='requests per throughput run')
+        parser.add_argument('--feed-sizes', default='',
+                            help='also time the json feed with this many events in its window, comma separated '
+                                 '(ex. 10000,100000)')
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options['scales'].split(',') if scale.strip()]
+        unknown = [scale for scale in scales if scale not in SCALES]
+        if unknown:
+            raise CommandError(f'Unknown scale(s): {", ".join(unknown)}')
+        try:
+            feed_sizes = [int(size) for size in options['feed_sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--feed-sizes must be comma separated numbers')
+
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = run_benchmarks(scales, options['repeat'], options['seed'], options['label'],
+                                     log=self.stdout.write, concurrency=options['concurrency'],
+                                     throughput_requests=options['throughput_requests'], feed_sizes=feed_sizes)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        text = json.dumps(results, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(text)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(text + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                rows = compare(json.load(previous), results)
+            for scale, subject, view, was, now, change in rows:
+                self.stdout.write(f'{scale:7} {subject:8} {view:16} {was:9.2f} -> {now:9.2f} ms ({change:+.1f}%)')
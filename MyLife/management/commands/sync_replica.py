@@ -0,0 +1,18 @@
+# File: sync_replica.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: copy the primary sqlite database into the local replica file (a stand-in for real replication)
+
+from django.core.management.base import BaseCommand, CommandError
+
+from MyLife.db import sync_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = 'Refresh the local SQLite replica (set MYLIFE_REPLICA_DB) from the primary database'
+
+    def handle(self, *args, **options):
+        try:
+            name = sync_sqlite_replica()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Copied the primary database into {name}.'))
@@ -0,0 +1,95 @@
+# File: memberships.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: keeps the EventMembership index (who can see which event, by date) in step with
+#              Event and EventCollaborator, plus the set-based rebuild for backfills
+
+from django.db import transaction
+
+from .models import Event, EventCollaborator, EventMembership
+
+# rows per bulk_create
+BATCH_SIZE = 2000
+
+
+def last_date(event_date, recurrence_frequency, recurrence_until):
+    ''' the last date an event can happen on: its date, the end of its series, or None (no end)'''
+    return recurrence_until if recurrence_frequency else event_date
+
+
+def _membership(profile_id, event, role):
+    return EventMembership(profile_id=profile_id, event_id=event.pk, role=role, event_date=event.event_date,
+                           last_date=last_date(event.event_date, event.recurrence_frequency, event.recurrence_until),
+                           event_type=event.event_type)
+
+
+def add_events(events):
+    ''' Add the creator rows of new events (bulk paths call this, bulk_create skips the signals)'''
+    EventMembership.objects.bulk_create([_membership(event.event_creator_id, event, 'creator') for event in events],
+                                        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def event_saved(event, created):
+    ''' a new event gets its creator row, an edited one updates the copied columns of all its rows'''
+    if created:
+        add_events([event])
+        return
+    EventMembership.objects.filter(event_id=event.pk).update(
+        event_date=event.event_date, event_type=event.event_type,
+        last_date=last_date(event.event_date, event.recurrence_frequency, event.recurrence_until))
+
+
+def add_collaborators(event_collaborators):
+    '''
+    Add the rows of new EventCollaborators (their events are loaded if they aren't already).
+    A creator who is also listed as a collaborator keeps the creator row.
+    '''
+    EventMembership.objects.bulk_create([_membership(ec.collaborator_id, ec.event, ec.role) for ec in event_collaborators],
+                                        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def collaborator_saved(event_collaborator, created):
+    if created:
+        add_collaborators([event_collaborator])
+    else:
+        # a role change
+        (EventMembership.objects.filter(profile_id=event_collaborator.collaborator_id, event_id=event_collaborator.event_id)
+         .exclude(role='creator').update(role=event_collaborator.role))
+
+
+def collaborator_removed(event_collaborator):
+    ''' drop the row, unless the profile is still on the event (its creator, or listed twice)'''
+    still_there = (EventCollaborator.objects.filter(event_id=event_collaborator.event_id,
+                                                    collaborator_id=event_collaborator.collaborator_id)
+                   .exclude(pk=event_collaborator.pk).exists())
+    if not still_there:
+        (EventMembership.objects.filter(profile_id=event_collaborator.collaborator_id, event_id=event_collaborator.event_id)
+         .exclude(role='creator').delete())
+
+
+def rebuild_memberships():
+    '''
+    Refill the whole index from Event and EventCollaborator (backfill / repair).
+    Streams both tables, never holding more than a batch. Returns the number of rows written.
+    '''
+    with transaction.atomic():
+        EventMembership.objects.all().delete()
+        # creators first, so they keep the creator role when they are also collaborators
+        creators = (_membership(event.event_creator_id, event, 'creator')
+                    for event in Event.objects.order_by().only('pk', 'event_creator_id', 'event_date', 'event_type',
+                                                               'recurrence_frequency', 'recurrence_until')
+                    .iterator(chunk_size=BATCH_SIZE))
+        collaborators = (_membership(ec.collaborator_id, ec.event, ec.role)
+                         for ec in EventCollaborator.objects.order_by().select_related('event')
+                         .only('collaborator_id', 'role', 'event', 'event__event_date', 'event__event_type',
+                               'event__recurrence_frequency', 'event__recurrence_until')
+                         .iterator(chunk_size=BATCH_SIZE))
+        for rows in (creators, collaborators):
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    EventMembership.objects.bulk_create(batch, ignore_conflicts=True)
+                    batch = []
+            if batch:
+                EventMembership.objects.bulk_create(batch, ignore_conflicts=True)
+        return EventMembership.objects.count()
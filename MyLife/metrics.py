@@ -0,0 +1,181 @@
+# File: metrics.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: per-view latency and SQL counters, N+1 detection, query budgets and the Prometheus text output
+
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# latency histogram bucket bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# the same query shape running this many times in one request is reported as a likely N+1
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+# quoted strings, numbers and IN (...) lists are blanked out so near-identical queries match
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+# the rows of a multi-row INSERT (bulk_create), two tuples or more
+_VALUES_LIST = re.compile(r'\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+
+# recorder of the request being answered. sync_to_async copies it into the threads
+# the ORM runs on, so queries of async views (and their worker threads) count too
+current_recorder = ContextVar('mylife_query_recorder', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    ''' raised (instead of only logged) when MYLIFE_QUERY_BUDGET_STRICT is on, so tests fail'''
+
+
+def fingerprint(sql):
+    ''' Returns the shape of a query, without its values'''
+    sql = _STRING.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub('VALUES (...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    return ' '.join(sql.split())
+
+
+class QueryRecorder:
+    '''
+    execute_wrapper that counts and times the queries of one request.
+    Only the fingerprints are kept, not the queries with their values.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            # async views run queries on several threads at once
+            with self._lock:
+                self.duration += elapsed
+                self.count += 1
+                # batches (executemany, multi-row INSERTs) repeat one shape by design, they are not an N+1
+                if not many and not _VALUES_LIST.search(sql):
+                    self.shapes[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        ''' Returns [(shape, times), ...] of the shapes that ran at least threshold times'''
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+
+
+def record_current_query(execute, sql, params, many, context):
+    ''' execute_wrapper on every connection, hands the query to the current request's recorder (if any)'''
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    '''
+    connection_created handler, puts record_current_query on the connection.
+    It goes first in the list, so the execute_wrapper() blocks that pop the last wrapper leave it alone.
+    '''
+    if record_current_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_current_query)
+
+
+class MetricsRegistry:
+    '''
+    In-memory metrics of this process, by view (url name).
+    Every server process keeps its own numbers, so each one is scraped on its own.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()
+            self.latency_buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+            self.latency_sum = Counter()
+            self.queries = Counter()
+            self.sql_seconds = Counter()
+            self.n_plus_one = Counter()
+            self.budget_exceeded = Counter()
+
+    def observe(self, view, seconds, recorder, suspected_n_plus_one, over_budget):
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            self.requests[view] += 1
+            if index < len(LATENCY_BUCKETS):
+                self.latency_buckets[view][index] += 1
+            self.latency_sum[view] += seconds
+            self.queries[view] += recorder.count
+            self.sql_seconds[view] += recorder.duration
+            self.n_plus_one[view] += suspected_n_plus_one
+            self.budget_exceeded[view] += over_budget
+
+    def render(self):
+        ''' Returns every metric in the Prometheus text exposition format'''
+        lines = []
+        with self._lock:
+            views = sorted(self.requests)
+            lines += ['# HELP mylife_request_duration_seconds Time spent answering a request, by view.',
+                      '# TYPE mylife_request_duration_seconds histogram']
+            for view in views:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets[view]):
+                    cumulative += count
+                    lines.append(f'mylife_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                lines.append(f'mylife_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {self.requests[view]}')
+                lines.append(f'mylife_request_duration_seconds_sum{{view="{view}"}} {self.latency_sum[view]:.6f}')
+                lines.append(f'mylife_request_duration_seconds_count{{view="{view}"}} {self.requests[view]}')
+            for name, kind, help_text, values, fmt in (
+                ('mylife_sql_queries_total', 'counter', 'SQL queries run, by view.', self.queries, '{}'),
+                ('mylife_sql_duration_seconds_total', 'counter', 'Time spent in SQL, by view.', self.sql_seconds, '{:.6f}'),
+                ('mylife_n_plus_one_suspected_total', 'counter',
+                 'Requests that repeated one query shape many times, by view.', self.n_plus_one, '{}'),
+                ('mylife_query_budget_exceeded_total', 'counter',
+                 'Requests that ran more queries than their budget, by view.', self.budget_exceeded, '{}'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{{view="{view}"}} {fmt.format(values[view])}' for view in views]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def query_budget(view):
+    ''' Returns the query budget of a view from MYLIFE_QUERY_BUDGETS, or None'''
+    return getattr(settings, 'MYLIFE_QUERY_BUDGETS', {}).get(view)
+
+
+def record_request(view, seconds, recorder):
+    '''
+    Add one finished request to the registry, log likely N+1 queries and check its query budget.
+    Raises QueryBudgetExceeded when over budget and MYLIFE_QUERY_BUDGET_STRICT is on.
+    '''
+    threshold = getattr(settings, 'MYLIFE_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+    repeated = recorder.repeated(threshold)
+    for shape, times in repeated[:3]:
+        logger.warning('Possible N+1 in %s: %d x %s', view, times, shape[:300])
+
+    budget = query_budget(view)
+    over_budget = budget is not None and recorder.count > budget
+    registry.observe(view, seconds, recorder, bool(repeated), over_budget)
+    if over_budget:
+        message = f'{view} ran {recorder.count} queries, its budget is {budget}'
+        if getattr(settings, 'MYLIFE_QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
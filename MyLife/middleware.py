@@ -0,0 +1,143 @@
+# File: middleware.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: request middleware, gives every request a lazily loaded request.profile
+#              and records per-view latency/SQL metrics. Both work under WSGI and (natively) ASGI
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.functional import SimpleLazyObject
+
+from . import metrics
+from .models import Profile
+
+
+def get_request_profile(request):
+    '''
+    Returns the logged in user's Profile, or None (anonymous, or no profile made yet).
+    Goes through user.project_profile, so later request.user.project_profile lookups
+    (views, templates) reuse the same object instead of querying again.
+    '''
+    if not hasattr(request, '_cached_profile'):
+        profile = None
+        if request.user.is_authenticated:
+            try:
+                profile = request.user.project_profile
+            except Profile.DoesNotExist:
+                pass
+        request._cached_profile = profile
+    return request._cached_profile
+
+
+async def aget_request_profile(request):
+    '''
+    get_request_profile for async views. Afterwards request.profile is loaded,
+    so using it (in the view or the template) doesn't query again.
+    '''
+    if not hasattr(request, '_cached_profile'):
+        await sync_to_async(get_request_profile)(request)
+    return request._cached_profile
+
+
+class ProfileMiddleware:
+    '''
+    Sets request.profile, loaded at most once per request and only if something uses it.
+    It is falsy when there is no profile, so check it with "if request.profile".
+    Needs to come after AuthenticationMiddleware. Async views load it with aget_request_profile first.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_request_profile(request))
+        return self.get_response(request)
+
+
+class QueryMetricsMiddleware:
+    '''
+    Times every request and counts its SQL queries (all databases), by url name,
+    for the /metrics endpoint. Also reports likely N+1 queries and checks MYLIFE_QUERY_BUDGETS.
+    Streaming responses are recorded when their body has been sent, since most of their queries
+    run while it is read (the events feed reads its events there).
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = metrics.QueryRecorder()
+        token = metrics.current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_recorder.reset(token)
+        return self.finish(request, response, start, recorder)
+
+    async def __acall__(self, request):
+        recorder = metrics.QueryRecorder()
+        token = metrics.current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_recorder.reset(token)
+        return self.finish(request, response, start, recorder)
+
+    def finish(self, request, response, start, recorder):
+        ''' record the request now, or for a streaming response once its body is used up'''
+        if not response.streaming:
+            self.record(request, time.perf_counter() - start, recorder)
+        elif response.is_async:
+            response.streaming_content = self.arecording(response.streaming_content, request, start, recorder)
+        else:
+            response.streaming_content = self.recording(response.streaming_content, request, start, recorder)
+        return response
+
+    def recording(self, content, request, start, recorder):
+        ''' the body of a streaming response, with the request's recorder set while each part is made'''
+        content = iter(content)
+        try:
+            while True:
+                token = metrics.current_recorder.set(recorder)
+                try:
+                    part = next(content, None)
+                finally:
+                    metrics.current_recorder.reset(token)
+                if part is None:
+                    break
+                yield part
+        finally:
+            self.record(request, time.perf_counter() - start, recorder)
+
+    async def arecording(self, content, request, start, recorder):
+        content = aiter(content)
+        try:
+            while True:
+                token = metrics.current_recorder.set(recorder)
+                try:
+                    part = await anext(content, None)
+                finally:
+                    metrics.current_recorder.reset(token)
+                if part is None:
+                    break
+                yield part
+        finally:
+            self.record(request, time.perf_counter() - start, recorder)
+
+    def record(self, request, seconds, recorder):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unresolved'
+        if view != 'metrics':
+            metrics.record_request(view, seconds, recorder)
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0003_worklog_end_time_worklog_start_time_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='worklog',
+            name='duration',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['event_creator', 'event_date'], name='event_creator_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventcollaborator',
+            index=models.Index(fields=['collaborator', 'event'], name='eventcollab_collab_event_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0005_event_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='calendar_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
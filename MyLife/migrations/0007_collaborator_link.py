@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_links(apps, schema_editor):
+    '''store every already accepted Collaborator in both directions'''
+    Collaborator = apps.get_model('MyLife', 'Collaborator')
+    CollaboratorLink = apps.get_model('MyLife', 'CollaboratorLink')
+    links = []
+    for inviter_id, invitee_id, ctype in (Collaborator.objects.filter(invite_status='accepted')
+                                          .values_list('inviter_id', 'invitee_id', 'collaborator_type')
+                                          .iterator()):
+        links.append(CollaboratorLink(profile_id=inviter_id, other_id=invitee_id, collaborator_type=ctype, is_inviter=True))
+        links.append(CollaboratorLink(profile_id=invitee_id, other_id=inviter_id, collaborator_type=ctype, is_inviter=False))
+    CollaboratorLink.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0006_profile_calendar_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollaboratorLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collaborator_type', models.CharField(choices=[('friend', 'Friend'), ('work', 'Work')], max_length=6)),
+                ('is_inviter', models.BooleanField(default=False)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='MyLife.profile')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collaborator_links', to='MyLife.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'collaborator_type'], name='collablink_profile_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('profile', 'other', 'collaborator_type'), name='unique_collaborator_link')],
+            },
+        ),
+        migrations.RunPython(backfill_links, migrations.RunPython.noop),
+    ]
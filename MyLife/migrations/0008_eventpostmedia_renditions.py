@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0007_collaborator_link'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventpostmedia',
+            name='renditions_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=7),
+        ),
+        migrations.CreateModel(
+            name='EventPostMediaRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('small', 'Small'), ('medium', 'Medium'), ('large', 'Large')], max_length=6)),
+                ('image', models.ImageField(upload_to='renditions/')),
+                ('width', models.PositiveIntegerField(default=0)),
+                ('height', models.PositiveIntegerField(default=0)),
+                ('media', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='MyLife.eventpostmedia')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('media', 'size'), name='unique_media_rendition_size')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0008_eventpostmedia_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventpost',
+            index=models.Index(fields=['event', 'timestamp', 'id'], name='eventpost_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0009_eventpost_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('category', models.CharField(choices=[('DEV', 'Development/Coding'), ('BIZ', 'Business/Admin'), ('LRN', 'Learning/Research'), ('DES', 'Design/UI')], max_length=3)),
+                ('total_duration', models.DecimalField(decimal_places=1, default=0, max_digits=12)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start', 'category'), name='unique_worklog_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:10
+
+import MyLife.models
+import secrets
+from django.db import migrations, models
+
+
+def give_tokens(apps, schema_editor):
+    '''every existing profile needs its own token before the column can be unique'''
+    Profile = apps.get_model('MyLife', 'Profile')
+    for profile in Profile.objects.filter(calendar_token__isnull=True).only('pk'):
+        profile.calendar_token = secrets.token_urlsafe(32)
+        profile.save(update_fields=['calendar_token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0010_worklog_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='calendar_token',
+            field=models.CharField(editable=False, max_length=43, null=True),
+        ),
+        migrations.RunPython(give_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='profile',
+            name='calendar_token',
+            field=models.CharField(default=MyLife.models.new_calendar_token, editable=False, max_length=43, unique=True),
+        ),
+    ]
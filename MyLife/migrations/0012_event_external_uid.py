@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0011_profile_calendar_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='external_uid',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(condition=models.Q(('external_uid', ''), _negated=True), fields=('event_creator', 'external_uid'), name='unique_event_external_uid'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:05
+
+from django.db import migrations
+
+# keep in sync with MyLife.search.SEARCH_TABLE
+SEARCH_TABLE = 'mylife_search'
+
+
+def create_search_table(apps, schema_editor):
+    '''FTS5 index of event titles/descriptions and post texts (SQLite only, other databases search without it)'''
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, event_id UNINDEXED, title, body, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    # index what is already there, same rowids as MyLife.search uses (events even, posts odd)
+    schema_editor.execute(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, event_id, title, body) "
+        "SELECT id * 2, 'event', id, id, event_title, event_description FROM MyLife_event"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, event_id, title, body) "
+        "SELECT id * 2 + 1, 'post', id, event_id, '', post_text_content FROM MyLife_eventpost"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0012_event_external_uid'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_memberships(apps, schema_editor):
+    '''one row for the creator and each collaborator of every existing event (same as MyLife.memberships)'''
+    Event = apps.get_model('MyLife', 'Event')
+    EventCollaborator = apps.get_model('MyLife', 'EventCollaborator')
+    EventMembership = apps.get_model('MyLife', 'EventMembership')
+
+    def membership(profile_id, event_id, role, event_date, frequency, until, event_type):
+        return EventMembership(profile_id=profile_id, event_id=event_id, role=role, event_date=event_date,
+                               last_date=until if frequency else event_date, event_type=event_type)
+
+    rows = [membership(creator_id, event_id, 'creator', *rest) for event_id, creator_id, *rest in
+            Event.objects.values_list('pk', 'event_creator_id', 'event_date', 'recurrence_frequency',
+                                      'recurrence_until', 'event_type').iterator()]
+    # after the creators, so a creator listed as a collaborator keeps the creator row
+    rows += [membership(*values) for values in
+             EventCollaborator.objects.values_list('collaborator_id', 'event_id', 'role', 'event__event_date',
+                                                   'event__recurrence_frequency', 'event__recurrence_until',
+                                                   'event__event_type').iterator()]
+    EventMembership.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('creator', 'Creator'), ('attendee', 'Attendee'), ('editor', 'Editor')], max_length=10)),
+                ('event_date', models.DateField()),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('event_type', models.CharField(choices=[('self', 'Self'), ('friends', 'Friends'), ('work', 'Work')], max_length=7)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='MyLife.event')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_memberships', to='MyLife.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'event_date'], name='membership_profile_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('profile', 'event'), name='unique_event_membership')],
+            },
+        ),
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
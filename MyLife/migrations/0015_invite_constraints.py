@@ -0,0 +1,60 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+def _delete_duplicates(model, group_fields, ranked):
+    '''keep one row per group (the most settled invite, then the oldest) and delete the rest'''
+    order = [*group_fields, 'pk']
+    rows = model.objects.all()
+    if ranked:
+        # accepted beats pending beats rejected
+        rows = rows.annotate(rank=models.Case(models.When(invite_status='accepted', then=0),
+                                              models.When(invite_status='pending', then=1), default=2))
+        order.insert(len(group_fields), 'rank')
+    seen, duplicates = set(), []
+    for pk, *group in rows.order_by(*order).values_list('pk', *group_fields).iterator():
+        if tuple(group) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add(tuple(group))
+    for start in range(0, len(duplicates), 500):
+        model.objects.filter(pk__in=duplicates[start:start + 500]).delete()
+
+
+def delete_duplicate_invites(apps, schema_editor):
+    '''rows the new unique constraints would reject, made by double clicks before they existed'''
+    _delete_duplicates(apps.get_model('MyLife', 'Collaborator'), ['inviter', 'invitee', 'collaborator_type'], True)
+    _delete_duplicates(apps.get_model('MyLife', 'EventInvite'), ['event', 'invitee'], True)
+    _delete_duplicates(apps.get_model('MyLife', 'EventCollaborator'), ['event', 'collaborator'], False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0014_event_membership'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_invites, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='collaborator',
+            index=models.Index(fields=['invitee', 'invite_status'], name='collab_invitee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventinvite',
+            index=models.Index(fields=['invitee', 'invite_status'], name='eventinvite_invitee_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='collaborator',
+            constraint=models.UniqueConstraint(fields=('inviter', 'invitee', 'collaborator_type'), name='unique_collaborator_invite'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventcollaborator',
+            constraint=models.UniqueConstraint(fields=('event', 'collaborator'), name='unique_event_collaborator'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventinvite',
+            constraint=models.UniqueConstraint(fields=('event', 'invitee'), name='unique_event_invite'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0015_invite_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='members_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='posts_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='invites_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0016_fragment_versions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='eventmembership',
+            name='membership_profile_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='eventmembership',
+            index=models.Index(fields=['profile', 'event_date', 'last_date', 'event_type'], name='membership_profile_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MyLife', '0017_membership_covering_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='calendar_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='invites_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
 # Create your models here.
 
@@ -11,11 +11,23 @@ from django.contrib.auth.models import User
 
 # Import Coalesce to sort event times by start and end time
 from django.db.models.functions import Coalesce
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+
+# Import recurrence helpers to expand repeating events
+from . import recurrence
 
 #Import datetime
 from datetime import datetime, date, timedelta
+import base64
+import binascii
+import secrets
 from django.utils import timezone
 
+# random secret used in a profile's calendar subscription url
+def new_calendar_token():
+    return secrets.token_urlsafe(32)
+
 # Profile model # 
 class Profile(models.Model):
     '''Encapsulate the idea of a Profile.'''
@@ -27,6 +39,13 @@ class Profile(models.Model):
     email_address = models.TextField(blank=False) # person's email attribute
     profile_photo = models.ImageField(blank=True)
     timezone = models.CharField(max_length=10)
+    calendar_version = models.PositiveIntegerField(default=0, editable=False) # bumped whenever this profile's calendar changes (see signals.py)
+    calendar_token = models.CharField(max_length=43, unique=True, default=new_calendar_token, editable=False) # secret for the ics subscription url
+    invites_version = models.PositiveIntegerField(default=0, editable=False) # bumped when the invites this profile received change (cached fragments, see fragments.py)
+
+    # only ever bumped with F() updates, so a full save must not write back the values it loaded
+    # (that would undo a bump made in the meantime and the feed would answer 304 with old data)
+    VERSION_FIELDS = ('calendar_version', 'invites_version')
 
     # override str function
     def __str__(self):
@@ -36,22 +55,46 @@ class Profile(models.Model):
     def get_name(self):
         ''' Returns the first and last name of a given Profile'''
         return f"{self.first_name} {self.last_name}"
+    def save(self, *args, **kwargs):
+        ''' a full save of an existing profile writes every column but the version counters'''
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.VERSION_FIELDS]
+        super().save(*args, **kwargs)
+
+    # custom function to invalidate the old calendar subscription url
+    def reset_calendar_token(self):
+        ''' Gives the profile a new calendar token, so the old subscription url stops working'''
+        self.calendar_token = new_calendar_token()
+        self.save(update_fields=['calendar_token'])
     def add_collaborator(self, other, collaborator_type):
+        # accept either a Profile or its User
+        if isinstance(other, User):
+            other = other.project_profile
+
         # edge case check
         if other == self:
             return "Error: Can't collaborate with yourself."
         
         # reference the profiles
-        profile1 = self.profile 
-        profile2 = other.profile
-        collaborator1 = Collaborator.objects.filter(inviter=profile1, invitee=profile2, collaborator_type=collaborator_type)
-        collaborator2 = Collaborator.objects.filter(inviter=profile2, invitee=profile1, collaborator_type=collaborator_type)
+        profile1 = self
+        profile2 = other
 
-        # edge case
-        if collaborator1.exists() or collaborator2.exists():
+        # accepted relationships come from the adjacency index, a pending invite the other way is one query
+        from .collaborators import are_collaborators
+        if are_collaborators(profile1, profile2, collaborator_type) or Collaborator.objects.filter(
+                inviter=profile2, invitee=profile1, collaborator_type=collaborator_type, invite_status='pending').exists():
             return "Error: Already collaborators or pending request exists."
-        # Otherwise, create collaborator relationship
-        Collaborator.objects.create(inviter=profile1,invitee=profile2,collaborator_type=collaborator_type,invite_status='pending')
+
+        # one row per inviter, invitee and type: the insert itself settles two clicks racing each other
+        from .invites import reopen_collaborator_invite
+        try:
+            with transaction.atomic():
+                Collaborator.objects.create(inviter=profile1,invitee=profile2,collaborator_type=collaborator_type,invite_status='pending')
+        except IntegrityError:
+            # a rejected invite can be sent again, a pending or accepted one can't
+            if not reopen_collaborator_invite(profile1, profile2, collaborator_type):
+                return "Error: Already collaborators or pending request exists."
 
         return "Collaborator request sent!"
     
@@ -59,63 +102,109 @@ class Profile(models.Model):
     def accept_collaborator(self, other, collaborator_type):
         ''' Returns confirmation of whether or not a collaborator request was accepted'''
 
-        profile1 = other.profile
-        profile2 = self.profile
+        # accept either a Profile or its User
+        if isinstance(other, User):
+            other = other.project_profile
 
-        # find all pending invites
-        pending_invites = Collaborator.objects.filter(inviter=profile1, invitee=profile2, collaborator_type=collaborator_type, invite_status='pending')
-
-        # if any pending invites for the profile exists, accept
-        if pending_invites.exists():
-            collaborator = pending_invites.first()
-            collaborator.invite_status = 'accepted'
-            collaborator.save()
+        # one conditional UPDATE, only a still pending invite is accepted
+        from .invites import settle_collaborator_invites
+        invites = Collaborator.objects.filter(inviter=other, invitee=self, collaborator_type=collaborator_type)
+        if settle_collaborator_invites(invites, 'accept'):
             return "Collaborator request accepted."
         # else, no pending collaborator invites
         else:
             return "No pending collaborator request."
         
+    # the outcomes of an event invite and the message shown for each
+    EVENT_INVITE_MESSAGES = {
+        'sent': "Event invite sent!",
+        'self': "Error: Can't invite yourself to an event.",
+        'already_invited': "Invite already sent for this event.",
+        'already_collaborator': "User is already a collaborator for this event.",
+        'not_found': "Error: No such profile.",
+    }
+
     # custom function to add a collaborator to an event
     def add_event_collaborator(self, event, other, role='attendee'):
         """Send an event invitation to another user (friend/work contact)"""
-
-        profile1 = self
-        profile2 = other
-
-        # edge case, cant friend yourself
-        if profile1 == profile2:
-            return "Error: Can't invite yourself to an event."
-
-        # Prevent duplicates
-        existing_invite = EventInvite.objects.filter(event=event, invitee=profile2)
-        existing_collab = EventCollaborator.objects.filter(event=event, collaborator=profile2)
-
-        # if an event invite was already sent to the invitee, return error message
-        if existing_invite.exists():
-            return "Invite already sent for this event."
-        # if a collaborator invite was already sent to the invitee, return error message
-        if existing_collab.exists():
-            return "User is already a collaborator for this event."
-
-        # Send the invite
-        EventInvite.objects.create(event=event, inviter=profile1, invitee=profile2, invite_status='pending')
-        return "Event invite sent!"
+        # accept either a Profile or its User
+        if isinstance(other, User):
+            other = other.project_profile
+        outcome = self.add_event_collaborators(event, [other])[other.pk]
+        return self.EVENT_INVITE_MESSAGES[outcome]
+
+    # how many times add_event_collaborators looks again when a racing request invites the same people
+    EVENT_INVITE_ATTEMPTS = 3
+
+    def _sort_event_invitees(self, event, invitee_ids, outcomes):
+        """
+        One query: which of the invitees exist, and are they already invited or collaborating.
+        Fills in their outcomes and returns the EventInvites to insert for the rest.
+        """
+        candidates = (
+            Profile.objects
+            .filter(pk__in=[pk for pk in invitee_ids if pk != self.pk])
+            .annotate(
+                already_invited=models.Exists(EventInvite.objects.filter(event=event, invitee=models.OuterRef('pk'))),
+                already_collaborator=models.Exists(EventCollaborator.objects.filter(event=event, collaborator=models.OuterRef('pk'))),
+            )
+            .values_list('pk', 'already_invited', 'already_collaborator')
+        )
+        new_invites = []
+        for pk, already_invited, already_collaborator in candidates:
+            if already_invited:
+                outcomes[pk] = 'already_invited'
+            elif already_collaborator:
+                outcomes[pk] = 'already_collaborator'
+            else:
+                outcomes[pk] = 'sent'
+                new_invites.append(EventInvite(event=event, inviter=self, invitee_id=pk, invite_status='pending'))
+        return new_invites
+
+    # custom function to invite many profiles to an event at once
+    def add_event_collaborators(self, event, others):
+        """
+        Send event invitations to a list of profiles (or profile pks) in one transaction.
+        Existing invites and collaborators are filtered out with one set-based query and
+        the rest are inserted with a single bulk_create (looked at again if a racing request got there first).
+        Returns {profile pk: outcome}, see EVENT_INVITE_MESSAGES for the outcomes.
+        """
+        # keep the order, drop repeats
+        invitee_ids = list(dict.fromkeys(getattr(other, 'pk', other) for other in others))
+        outcomes = {pk: 'not_found' for pk in invitee_ids}
+
+        # edge case, cant invite yourself
+        if self.pk in outcomes:
+            outcomes[self.pk] = 'self'
+
+        from .signals import bump_calendar_versions
+        from .push import notify_event_invites
+        from .fragments import bump_invites_versions, bump_members_versions
+        with transaction.atomic():
+            for attempt in range(self.EVENT_INVITE_ATTEMPTS):
+                new_invites = self._sort_event_invitees(event, invitee_ids, outcomes)
+                try:
+                    with transaction.atomic():
+                        EventInvite.objects.bulk_create(new_invites)
+                    break
+                except IntegrityError:
+                    # a racing request invited some of them after we looked (unique_event_invite), look again
+                    if attempt == self.EVENT_INVITE_ATTEMPTS - 1:
+                        raise
+            if new_invites:
+                # bulk_create skips the post_save signals, so bump the versions and send the live updates here
+                bump_calendar_versions([self.pk] + [invite.invitee_id for invite in new_invites])
+                bump_members_versions([event.pk])
+                bump_invites_versions(invite.invitee_id for invite in new_invites)
+                notify_event_invites(new_invites)
+        return outcomes
 
     # custom function to accept an invite to an event
     def accept_event_collaborator(self, event):
         """Accept an invitation to an event and become a collaborator"""
-        profile = self
-
-        # find all pending invites
-        pending_invite = EventInvite.objects.filter(event=event, invitee=profile, invite_status='pending')
-
-        # if any pending invites for the profile exists, accept
-        if pending_invite.exists():
-            invite = pending_invite.first()
-            invite.invite_status = 'accepted'
-            invite.save()
-
-            EventCollaborator.objects.create(event=event, collaborator=profile, role='attendee')
+        # one conditional UPDATE, only a still pending invite is accepted (and adds the collaborator)
+        from .invites import settle_event_invites
+        if settle_event_invites(EventInvite.objects.filter(event=event, invitee=self), 'accept'):
             return "Event invite accepted!"
         # else, there are no pending invites
         else:
@@ -127,12 +216,41 @@ class EventQuerySet(models.QuerySet):
     # function to order events based on time for edge cases like when event_start_time is given but not end time
     def ordered_by_event_time(self):
         return self.annotate(event_time=Coalesce('event_start_time', 'event_end_time')).order_by('event_date', 'event_time')
-    
+
+    # function to get every event a profile can see (created or collaborating) in one query
+    def visible_to(self, profile, start=None, end=None):
+        '''
+        Returns the events the profile created or collaborates on, without duplicates
+        (optionally only the ones happening in [start, end), see in_window).
+        One range scan of the EventMembership (profile, event_date) index.
+        '''
+        # one membership row per (profile, event), so the join never doubles an event
+        return self.filter(membership_window(start, end, prefix='memberships__'), memberships__profile=profile)
+
+    # function to limit events to a date window, like the start/end range fullcalendar sends
+    def in_window(self, start=None, end=None):
+        '''
+        Returns the events that happen on or after start and before end (end is exclusive).
+        Recurring events are included when their series overlaps the window,
+        use Event.occurrences_between to get the actual dates.
+        '''
+        single = models.Q(recurrence_frequency='')
+        recurring = ~models.Q(recurrence_frequency='')
+        if start is not None:
+            single &= models.Q(event_date__gte=start)
+            recurring &= models.Q(recurrence_until__isnull=True) | models.Q(recurrence_until__gte=start)
+        if end is not None:
+            single &= models.Q(event_date__lt=end)
+            recurring &= models.Q(event_date__lt=end)
+        return self.filter(single | recurring)
+
 # Event Model # 
 class Event(models.Model):
     ''' encapsulates the idea of an Event'''
 
     EVENT_TYPES = [('self', 'Self'), ('friends', 'Friends'), ('work', 'Work')] # Types of events
+    RECURRENCE_FREQUENCIES = [('', 'Does not repeat'), (recurrence.DAILY, 'Daily'),
+                              (recurrence.WEEKLY, 'Weekly'), (recurrence.MONTHLY, 'Monthly')] # How often an event repeats
     event_title = models.CharField(max_length=60) # Event title
     event_description = models.TextField(blank=True) # Event description, text field because we will allow long event descriptions
     event_start_time = models.TimeField(null = True, blank = True) # Event start time, optional
@@ -141,6 +259,16 @@ class Event(models.Model):
     event_creator = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='created_events') # Creator of the event
     event_type = models.CharField(max_length=7, choices=EVENT_TYPES) # type of event
 
+    # Recurrence rule, stored once; the event_date is the first occurrence
+    recurrence_frequency = models.CharField(max_length=7, choices=RECURRENCE_FREQUENCIES, blank=True, default='') # blank = single event
+    recurrence_interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)]) # every N days/weeks/months
+    recurrence_until = models.DateField(null=True, blank=True) # last possible date of the series, optional
+    recurrence_count = models.PositiveIntegerField(null=True, blank=True, validators=[MinValueValidator(1)]) # number of occurrences, optional
+    recurrence_exceptions = models.JSONField(default=list, blank=True) # iso dates that are skipped
+    external_uid = models.CharField(max_length=255, blank=True, default='', editable=False) # UID of an event imported from an .ics file
+    posts_version = models.PositiveIntegerField(default=0) # bumped when the event's posts change (cached fragments, see fragments.py)
+    members_version = models.PositiveIntegerField(default=0) # bumped when its collaborators or invites change
+
     objects = EventQuerySet.as_manager() # to use custom event ordering function
 
     # override the built in str function
@@ -154,12 +282,82 @@ class Event(models.Model):
             return f'{self.event_title} (Ends at: {self.event_end_time} on {self.event_date})'
         else:
             return f'{self.event_title} on {self.event_date}'
-        
+
+    # validate the recurrence rule
+    def clean(self):
+        super().clean()
+        if self.recurrence_until and self.event_date and self.recurrence_until < self.event_date:
+            raise ValidationError({'recurrence_until': 'The series must end on or after the event date.'})
+        if not self.recurrence_frequency and (self.recurrence_until or self.recurrence_count or self.recurrence_exceptions):
+            raise ValidationError({'recurrence_frequency': 'Pick how often the event repeats.'})
+
+    @property
+    def is_recurring(self):
+        ''' Returns whether this event has a recurrence rule'''
+        return bool(self.recurrence_frequency)
+
+    # custom function to get the dates this event happens on
+    def occurrences_between(self, start=None, end=None):
+        ''' Returns the dates of this event inside [start, end), expanded lazily for recurring events'''
+        return recurrence.occurrence_dates(self, start, end)
+
+    # custom function to get the next date this event happens on
+    def next_occurrence(self, on_or_after=None):
+        ''' Returns the first date of this event on or after the given day (today by default), or None'''
+        on_or_after = on_or_after or date.today()
+        dates = self.occurrences_between(on_or_after, on_or_after + recurrence.DEFAULT_HORIZON)
+        return dates[0] if dates else None
+
     class Meta:
         # Meta class to provide ordering details"
         ordering = ['event_date', 'event_start_time'] # Default sorting behavior, but will use Coalesce when needed 
                                                       # (if event_start_time is given but not end time_)
+        indexes = [
+            # per-profile date range lookups (calendar feed)
+            models.Index(fields=['event_creator', 'event_date'], name='event_creator_date_idx'),
+        ]
+        constraints = [
+            # an .ics UID is imported once per creator (its index makes re-imports a cheap lookup)
+            models.UniqueConstraint(fields=['event_creator', 'external_uid'], condition=~models.Q(external_uid=''),
+                                    name='unique_event_external_uid'),
+        ]
         
+# Event Post Query Set #
+class EventPostQuerySet(models.QuerySet):
+
+    # function to get one page of an event's feed, newest first
+    def feed_page(self, event, cursor=None, page_size=20):
+        '''
+        Returns (posts, next_cursor) using keyset pagination on (timestamp, id),
+        so every page is an index range scan no matter how deep the feed goes.
+        next_cursor is None on the last page. Raises ValueError for a bad cursor.
+        '''
+        qs = self.filter(event=event)
+        if cursor:
+            timestamp, pk = decode_feed_cursor(cursor)
+            qs = qs.filter(models.Q(timestamp__lt=timestamp) | models.Q(timestamp=timestamp, pk__lt=pk))
+        # one extra row tells us whether there is another page
+        posts = list(qs.order_by('-timestamp', '-pk')[:page_size + 1])
+        next_cursor = None
+        if len(posts) > page_size:
+            posts = posts[:page_size]
+            next_cursor = encode_feed_cursor(posts[-1])
+        return posts, next_cursor
+
+def encode_feed_cursor(post):
+    ''' Returns an opaque cursor pointing just after the given post'''
+    raw = f"{post.timestamp.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_feed_cursor(cursor):
+    ''' Returns (timestamp, pk) from a cursor made by encode_feed_cursor, raises ValueError if it is invalid'''
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, pk = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
 class EventPost(models.Model):
     ''' encapsulates the idea of a post on a specific Event'''
 
@@ -175,13 +373,24 @@ class EventPost(models.Model):
     # autogenerated timestamp of the post
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = EventPostQuerySet.as_manager() # to use keyset pagination
+
     # override the custom str function
     def __str__(self):
         return f'Post by: {self.post_author.get_name()}, at {self.timestamp}'
+
+    class Meta:
+        indexes = [
+            # keyset pagination of an event's feed on (timestamp, id)
+            models.Index(fields=['event', 'timestamp', 'id'], name='eventpost_feed_idx'),
+        ]
     
 
 class EventPostMedia(models.Model):
     ''' class for the media contents of an EventPost'''
+
+    # The possible states of the derived renditions (made off the request path, see renditions.py)
+    RENDITION_STATUSES = [('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')]
     
     # The specific event post that this media content is assigned to
     post = models.ForeignKey(EventPost, on_delete=models.CASCADE, related_name='media')
@@ -189,10 +398,57 @@ class EventPostMedia(models.Model):
     # The actual media file/content
     post_media = models.ImageField()
 
+    # whether the small/medium/large renditions exist yet
+    renditions_status = models.CharField(max_length=7, choices=RENDITION_STATUSES, default='pending')
+
     # override the custom str function
     def __str__(self):
         return f"Media Content for Post {self.post.id} by {self.post.post_author.get_name()}"
 
+    # custom function to get the url the feed should show
+    def display_url(self):
+        ''' Returns the medium rendition url once the renditions are ready, else the original'''
+        if self.renditions_status == 'ready':
+            for rendition in self.renditions.all(): # uses the prefetched renditions
+                if rendition.size == 'medium':
+                    return rendition.image.url
+        return self.post_media.url
+
+    # custom function to build the srcset attribute
+    def srcset(self):
+        ''' Returns "url 320w, url 800w, ..." for the ready renditions, or an empty string'''
+        if self.renditions_status != 'ready':
+            return ''
+        # a small original gives sizes of the same width (they are never upscaled), list each width once
+        widths = {}
+        for rendition in self.renditions.all():
+            widths.setdefault(rendition.width, rendition)
+        return ', '.join(f'{widths[width].image.url} {width}w' for width in sorted(widths))
+
+class EventPostMediaRendition(models.Model):
+    ''' a resized, re-encoded and EXIF-stripped copy of an EventPostMedia image'''
+
+    # The possible rendition sizes (the longest side in pixels lives in renditions.py)
+    SIZES = [('small', 'Small'), ('medium', 'Medium'), ('large', 'Large')]
+
+    # the original media this was made from
+    media = models.ForeignKey(EventPostMedia, on_delete=models.CASCADE, related_name='renditions')
+    # which size this is
+    size = models.CharField(max_length=6, choices=SIZES)
+    # the derived image and its real dimensions (for srcset)
+    image = models.ImageField(upload_to='renditions/')
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+
+    # override the custom str function
+    def __str__(self):
+        return f"{self.size} rendition ({self.width}x{self.height}) of media {self.media_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['media', 'size'], name='unique_media_rendition_size'),
+        ]
+
 class Collaborator(models.Model):
     ''' encapsulates the idea of a collaborator '''
     
@@ -224,6 +480,80 @@ class Collaborator(models.Model):
         else:
             return f"{inviter_name}'s collaboration invite to {invitee_name} of type [{self.collaborator_type}] is REJECTED"
 
+    class Meta:
+        constraints = [
+            # one invite per direction and type, so two clicks can't make two pending rows (see invites.py)
+            models.UniqueConstraint(fields=['inviter', 'invitee', 'collaborator_type'], name='unique_collaborator_invite'),
+        ]
+        indexes = [
+            # a profile's pending invites (dashboard)
+            models.Index(fields=['invitee', 'invite_status'], name='collab_invitee_status_idx'),
+        ]
+
+# Collaborator Link Query Set #
+class CollaboratorLinkQuerySet(models.QuerySet):
+
+    # function to store an accepted Collaborator relationship in both directions
+    def link(self, collaborator):
+        ''' Adds the two directed rows for an accepted Collaborator (no-op if they already exist)'''
+        self.link_all([collaborator])
+
+    # function to store many accepted Collaborator relationships with one insert
+    def link_all(self, collaborators):
+        ''' Adds the two directed rows of every given accepted Collaborator (no-op for existing ones)'''
+        self.bulk_create([
+            link
+            for collaborator in collaborators
+            for link in (
+                CollaboratorLink(profile_id=collaborator.inviter_id, other_id=collaborator.invitee_id,
+                                 collaborator_type=collaborator.collaborator_type, is_inviter=True),
+                CollaboratorLink(profile_id=collaborator.invitee_id, other_id=collaborator.inviter_id,
+                                 collaborator_type=collaborator.collaborator_type, is_inviter=False),
+            )
+        ], ignore_conflicts=True)
+
+    # function to remove both directions of a Collaborator relationship
+    def unlink(self, collaborator):
+        ''' Deletes the two directed rows for a Collaborator that is no longer accepted'''
+        self.filter(
+            models.Q(profile_id=collaborator.inviter_id, other_id=collaborator.invitee_id) |
+            models.Q(profile_id=collaborator.invitee_id, other_id=collaborator.inviter_id),
+            collaborator_type=collaborator.collaborator_type,
+        ).delete()
+
+class CollaboratorLink(models.Model):
+    '''
+    symmetric adjacency index of accepted collaborators.
+    Every accepted Collaborator is stored once per direction, so "is A a collaborator of B"
+    and "B's collaborators of a type" are both a single indexed lookup on `profile`.
+    Kept in sync with Collaborator by signals (see signals.py), never edit it by hand.
+    '''
+
+    # the profile whose neighbor list this row belongs to
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='collaborator_links')
+    # the collaborating profile
+    other = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='+')
+    # the collaborator type of the relationship
+    collaborator_type = models.CharField(max_length=6, choices=Collaborator.COLLABORATOR_TYPES)
+    # whether `profile` sent the original invite
+    is_inviter = models.BooleanField(default=False)
+
+    objects = CollaboratorLinkQuerySet.as_manager() # to use link/unlink
+
+    # override the custom str function
+    def __str__(self):
+        return f"{self.profile_id} <-> {self.other_id} [{self.collaborator_type}]"
+
+    class Meta:
+        constraints = [
+            # also serves (profile, other) membership checks
+            models.UniqueConstraint(fields=['profile', 'other', 'collaborator_type'], name='unique_collaborator_link'),
+        ]
+        indexes = [
+            # listing a profile's collaborators by type
+            models.Index(fields=['profile', 'collaborator_type'], name='collablink_profile_type_idx'),
+        ]
+
 class EventInvite(models.Model):
     ''' encapsulates the idea of an invitation to an event'''
 
@@ -245,6 +575,17 @@ class EventInvite(models.Model):
     # override the custom str function
     def __str__(self):
         return f"{self.inviter.get_name()} invited {self.invitee.get_name()} to '{self.event.event_title}' [{self.invite_status}]"
+
+    class Meta:
+        constraints = [
+            # one invite per person and event
+            models.UniqueConstraint(fields=['event', 'invitee'], name='unique_event_invite'),
+        ]
+        indexes = [
+            # a profile's pending invites (dashboard)
+            models.Index(fields=['invitee', 'invite_status'], name='eventinvite_invitee_status_idx'),
+        ]
+
 class EventCollaborator(models.Model):
     ''' encapsulates the idea of a Collaborator for an Event'''
 
@@ -259,6 +600,60 @@ class EventCollaborator(models.Model):
     def __str__(self):
         return f"{self.collaborator.get_name()} ({self.role}) is attending event: {self.event.event_title}"
 
+    class Meta:
+        indexes = [
+            # lookup of the events a profile collaborates on
+            models.Index(fields=['collaborator', 'event'], name='eventcollab_collab_event_idx'),
+        ]
+        constraints = [
+            # accepting an invite twice can't add the collaborator twice
+            models.UniqueConstraint(fields=['event', 'collaborator'], name='unique_event_collaborator'),
+        ]
+
+def membership_window(start=None, end=None, prefix=''):
+    '''
+    Q for the EventMembership rows whose event happens in [start, end) (end exclusive),
+    the same rule as EventQuerySet.in_window: single events by their date, recurring ones
+    when their series overlaps. prefix is the path to the memberships, ex. "memberships__".
+    '''
+    window = models.Q()
+    if end is not None:
+        window &= models.Q(**{f'{prefix}event_date__lt': end})
+    if start is not None:
+        window &= models.Q(**{f'{prefix}last_date__gte': start}) | models.Q(**{f'{prefix}last_date__isnull': True})
+    return window
+
+class EventMembership(models.Model):
+    '''
+    denormalized index of which events a profile can see: one row per (profile, event)
+    for the creator and every collaborator, with the event's dates copied in,
+    so a profile's events (in a date window, in date order) are one range scan on (profile, event_date).
+    Kept in sync with Event and EventCollaborator by signals (see memberships.py), never edit it by hand.
+    '''
+
+    ROLES = [('creator', 'Creator')] + EventCollaborator.ROLE_TYPES # creator, or the collaborator's role
+
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='event_memberships') # who can see the event
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='memberships') # the event
+    role = models.CharField(max_length=10, choices=ROLES) # how the profile is on the event
+    event_date = models.DateField() # copy of Event.event_date (first occurrence)
+    last_date = models.DateField(null=True, blank=True) # last possible date: event_date, the series' until, or null (repeats forever)
+    event_type = models.CharField(max_length=7, choices=Event.EVENT_TYPES) # copy of Event.event_type
+
+    # override the built in str function
+    def __str__(self):
+        return f"{self.profile_id} on event {self.event_id} ({self.role})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'event'], name='unique_event_membership'),
+        ]
+        indexes = [
+            # a profile's events by date. last_date and event_type ride along for the window filter
+            # and the per-day grouping of density.py
+            models.Index(fields=['profile', 'event_date', 'last_date', 'event_type'], name='membership_profile_date_idx'),
+        ]
+
 class WorkLog(models.Model):
     # Encapsulates the idea of a Work Log Calendar"
     CATEGORY_CHOICES = [
@@ -279,14 +674,62 @@ class WorkLog(models.Model):
         #to string function 
         return f"{self.category} activity on {self.date} for {self.duration} hours, logged at {self.log_time}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # remember what the rollups currently count for this row
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_state = instance.rollup_state()
+        return instance
+
+    # custom function to get the part of this log the rollups care about
+    def rollup_state(self):
+        ''' Returns (date, category, duration) as counted in WorkLogRollup'''
+        return (self.date, self.category, self.duration)
+
+    @staticmethod
+    def compute_duration(log_date, start_time, end_time):
+        ''' Returns the hours between start_time and end_time (wrapping past midnight), or None if either is missing'''
+        if not (start_time and end_time):
+            return None
+        log_date = log_date if log_date else date.today()
+        start = datetime.combine(log_date, start_time)
+        end = datetime.combine(log_date, end_time)
+        if end < start:
+            end += timedelta(days=1)
+        #calculate duration
+        dur = end - start
+        return dur.total_seconds() / 3600
+
     def save(self, *args, **kwargs):
         if self.start_time and self.end_time:
-            log_date = self.date if self.date else date.today()
-            start = datetime.combine(log_date, self.start_time)
-            end = datetime.combine(log_date, self.end_time)
-            if end < start:
-                end += timedelta(days=1)
-            #calculate duration
-            dur = end - start
-            self.duration = dur.total_seconds() / 3600
-        super().save(*args, **kwargs) # save to db
+            self.duration = self.compute_duration(self.date, self.start_time, self.end_time)
+        with transaction.atomic():
+            super().save(*args, **kwargs) # save to db
+            # move this log's hours in the daily/weekly/monthly rollups
+            from .worklog_rollups import replace_in_rollups
+            new_state = self.rollup_state()
+            replace_in_rollups(getattr(self, '_rollup_state', None), new_state)
+            self._rollup_state = new_state
+
+class WorkLogRollup(models.Model):
+    '''
+    running totals of WorkLog.duration per category for each day, week (starting monday) and month.
+    Updated incrementally by WorkLog.save and deletes (see worklog_rollups.py),
+    rebuilt from scratch with the rebuild_worklog_rollups command.
+    '''
+    PERIODS = [('day', 'Day'), ('week', 'Week'), ('month', 'Month')]
+
+    period = models.CharField(max_length=5, choices=PERIODS) # size of the bucket
+    period_start = models.DateField() # first day of the bucket
+    category = models.CharField(max_length=3, choices=WorkLog.CATEGORY_CHOICES) # same categories as WorkLog
+    total_duration = models.DecimalField(max_digits=12, decimal_places=1, default=0) # hours
+    entry_count = models.PositiveIntegerField(default=0) # number of logs
+
+    def __str__(self):
+        return f"{self.category} {self.period} of {self.period_start}: {self.total_duration} hours over {self.entry_count} logs"
+
+    class Meta:
+        constraints = [
+            # also serves the reporting range scans on (period, period_start)
+            models.UniqueConstraint(fields=['period', 'period_start', 'category'], name='unique_worklog_rollup'),
+        ]
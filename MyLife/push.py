@@ -0,0 +1,137 @@
+# File: push.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: pub/sub behind the live updates stream (server-sent events), with a pluggable broker,
+#              and the notifications for invites, invite answers and new posts
+
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+# messages a slow subscriber can fall behind before the oldest ones are dropped
+QUEUE_SIZE = 100
+
+
+class InProcessBroker:
+    '''
+    Broker of one server process: publish() hands a message to the subscribers of a channel
+    that are connected to this same process. That is enough for a single ASGI worker (and is
+    the local stand-in). With several processes, plug in a broker with the same publish/subscribe
+    methods that goes through a shared pub/sub (ex. redis), see MYLIFE_PUSH_BROKER.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # channel -> {(event loop, queue)}
+
+    def publish(self, channel, message):
+        ''' Send a message (a dict) to a channel, from any thread'''
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                # signal handlers run on the request's thread, the queue belongs to the stream's event loop
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                pass  # that loop is closed, its stream is going away
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        ''' async with broker.subscribe(channel) as messages: message = await messages.get()'''
+        entry = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+def _offer(queue, message):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    ''' Returns the MYLIFE_PUSH_BROKER of this process (made once)'''
+    return _load_broker(getattr(settings, 'MYLIFE_PUSH_BROKER', 'MyLife.push.InProcessBroker'))
+
+
+def profile_channel(profile_id):
+    return f'profile:{profile_id}'
+
+
+def notify(profile_ids, kind, **data):
+    '''
+    Publish {"type": kind, ...data} to the streams of the given profiles
+    once the current transaction commits (so nobody is told about a rolled back row).
+    '''
+    profile_ids = {pid for pid in profile_ids if pid is not None}
+    if not profile_ids:
+        return
+    message = {'type': kind, **data}
+
+    def publish():
+        broker = get_broker()
+        for profile_id in profile_ids:
+            broker.publish(profile_channel(profile_id), message)
+    transaction.on_commit(publish)
+
+
+def format_event(message):
+    ''' Returns a message as a server-sent event (the type is the event name)'''
+    return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+
+
+### notifications, sent from the signal handlers (and the bulk paths that skip the signals) ###
+
+def notify_collaborator_invite(collab, created):
+    ''' a new collaborator invite goes to the invitee, an answer to the inviter'''
+    if created and collab.invite_status == 'pending':
+        notify([collab.invitee_id], 'collab_invite', id=collab.pk, list='collab-invites-received',
+               text=f'From {collab.inviter.get_name()} ({collab.collaborator_type})', url=reverse('user_dashboard'))
+    elif not created and collab.invite_status in ('accepted', 'rejected'):
+        notify([collab.inviter_id], 'collab_response', id=collab.pk, status=collab.invite_status,
+               text=f'{collab.invitee.get_name()} {collab.invite_status} your collaborator invite',
+               url=reverse('user_dashboard'))
+
+
+def notify_event_invites(invites):
+    ''' tell the invitees about new event invites'''
+    for invite in invites:
+        notify([invite.invitee_id], 'event_invite', id=invite.pk, event_id=invite.event_id,
+               list='event-invites-received',
+               text=f'From {invite.inviter.get_name()} — Event: {invite.event.event_title}',
+               url=reverse('event_details', args=[invite.event_id]))
+
+
+def notify_event_invite_response(invite):
+    ''' tell the inviter that an event invite was accepted or rejected'''
+    notify([invite.inviter_id], 'event_invite_response', id=invite.pk, event_id=invite.event_id,
+           status=invite.invite_status,
+           text=f'{invite.invitee.get_name()} {invite.invite_status} your invite to {invite.event.event_title}',
+           url=reverse('event_details', args=[invite.event_id]))
+
+
+def notify_event_post(post, collaborator_ids):
+    ''' a new post goes to the event's creator and collaborators, but not its author'''
+    event = post.event
+    notify(({event.event_creator_id} | set(collaborator_ids)) - {post.post_author_id}, 'event_post',
+           id=post.pk, event_id=event.pk, text=f'{post.post_author.get_name()} posted in {event.event_title}',
+           url=reverse('event_details', args=[event.pk]))
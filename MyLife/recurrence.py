@@ -0,0 +1,102 @@
+# File: recurrence.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: expands recurring events into the dates they happen on, only inside a requested window
+
+from datetime import date, timedelta
+from functools import lru_cache
+import calendar
+
+# the supported recurrence frequencies (stored on Event.recurrence_frequency)
+DAILY = 'daily'
+WEEKLY = 'weekly'
+MONTHLY = 'monthly'
+
+# how far to look ahead when a series never ends and no window end was asked for
+DEFAULT_HORIZON = timedelta(days=365)
+
+
+def _add_months(start, months):
+    ''' Returns start moved forward by the given number of months, or None if that day does not exist (ex. Feb 30)'''
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    if start.day > calendar.monthrange(year, month)[1]:
+        return None
+    return date(year, month, start.day)
+
+
+@lru_cache(maxsize=4096)
+def _expand(dtstart, frequency, interval, until, count, exceptions, window_start, window_end):
+    '''
+    Returns a tuple of the occurrence dates of one rule inside [window_start, window_end).
+    Cached per rule + window, so flipping back to a month that was already shown costs nothing.
+    Exceptions are skipped but still count towards count, like EXDATE in icalendar.
+    '''
+    occurrences = []
+
+    if frequency == MONTHLY:
+        # months have different lengths so walk from the start, monthly series stay small anyway
+        n = 0
+        produced = 0
+        while True:
+            current = _add_months(dtstart, n * interval)
+            n += 1
+            if current is None:
+                # skipped months don't count as an occurrence
+                continue
+            if count is not None and produced >= count:
+                break
+            if until is not None and current > until:
+                break
+            if current >= window_end:
+                break
+            produced += 1
+            if current >= window_start and current not in exceptions:
+                occurrences.append(current)
+        return tuple(occurrences)
+
+    # daily and weekly are a fixed step, so jump straight to the first occurrence in the window
+    step = timedelta(days=interval * (7 if frequency == WEEKLY else 1))
+    n = 0
+    if window_start > dtstart:
+        n = -(-(window_start - dtstart).days // step.days) # ceiling division
+    current = dtstart + n * step
+    while current < window_end:
+        if count is not None and n >= count:
+            break
+        if until is not None and current > until:
+            break
+        if current not in exceptions:
+            occurrences.append(current)
+        n += 1
+        current += step
+    return tuple(occurrences)
+
+
+def occurrence_dates(event, window_start=None, window_end=None):
+    '''
+    Returns the dates an event happens on inside [window_start, window_end).
+    Single (non recurring) events just return their own date if it is in the window.
+    '''
+    return rule_dates(event.event_date, event.recurrence_frequency, event.recurrence_interval,
+                      event.recurrence_until, event.recurrence_count, event.recurrence_exceptions,
+                      window_start, window_end)
+
+
+def rule_dates(event_date, frequency, interval, until, count, exceptions, window_start=None, window_end=None):
+    ''' occurrence_dates from the raw columns, for rows read as tuples (see the events json feed)'''
+    if window_start is None:
+        window_start = event_date
+    if not frequency:
+        inside = event_date >= window_start and (window_end is None or event_date < window_end)
+        return (event_date,) if inside else ()
+    if window_end is None:
+        # never expand an endless series forever
+        window_end = max(window_start, event_date) + DEFAULT_HORIZON
+    exceptions = frozenset(date.fromisoformat(d) for d in (exceptions or []))
+    return _expand(event_date, frequency, interval or 1, until, count, exceptions, window_start, window_end)
+
+
+def clear_cache():
+    ''' Empties the occurrence cache (used by tests and data loads)'''
+    _expand.cache_clear()
@@ -0,0 +1,107 @@
+# File: renditions.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: makes small/medium/large copies of uploaded post images on a local worker pool
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePath
+import logging
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from PIL import Image, ImageOps
+
+from .fragments import bump_posts_versions
+from .models import EventPostMedia, EventPostMediaRendition
+
+logger = logging.getLogger(__name__)
+
+# longest side in pixels of each rendition
+RENDITION_SIZES = {'small': 320, 'medium': 800, 'large': 1600}
+
+# re-encoding settings (webp keeps transparency and is much smaller than the originals)
+RENDITION_FORMAT = 'WEBP'
+RENDITION_QUALITY = 80
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    ''' Return the shared worker pool, created on first use'''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'MYLIFE_RENDITION_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mylife-renditions')
+        return _executor
+
+
+def schedule_renditions(media_id):
+    '''
+    Queue rendition generation for a media row once the current transaction commits.
+    With MYLIFE_RENDITION_WORKERS = 0 the renditions are made inline (handy for tests and commands).
+    '''
+    if getattr(settings, 'MYLIFE_RENDITION_WORKERS', 2) == 0:
+        transaction.on_commit(lambda: generate_renditions(media_id))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, media_id))
+
+
+def _run_in_worker(media_id):
+    ''' worker entry point, the worker thread has its own db connection to look after'''
+    close_old_connections()
+    try:
+        generate_renditions(media_id)
+    finally:
+        close_old_connections()
+
+
+def _encode(image, longest_side):
+    ''' Return (encoded bytes, (width, height)) of a resized copy (never upscaled), without any EXIF metadata'''
+    copy = image.copy()
+    copy.thumbnail((longest_side, longest_side), Image.Resampling.LANCZOS)
+    if copy.mode not in ('RGB', 'RGBA'):
+        copy = copy.convert('RGBA' if 'A' in copy.getbands() else 'RGB')
+    buffer = BytesIO()
+    # no exif= argument, so none of the original metadata (gps, camera...) is written
+    copy.save(buffer, RENDITION_FORMAT, quality=RENDITION_QUALITY, method=4)
+    return buffer.getvalue(), copy.size
+
+
+def generate_renditions(media_id):
+    ''' Make every rendition of one EventPostMedia and mark it ready (or failed)'''
+    try:
+        media = EventPostMedia.objects.get(pk=media_id)
+    except EventPostMedia.DoesNotExist:
+        return  # the post was deleted before the worker got to it
+
+    try:
+        with media.post_media.open('rb') as original:
+            image = Image.open(original)
+            # apply the camera orientation before the exif is dropped
+            image = ImageOps.exif_transpose(image)
+            image.load()
+
+        stem = PurePath(media.post_media.name).stem
+        existing = {rendition.size: rendition for rendition in media.renditions.all()}
+        with transaction.atomic():
+            for size, longest_side in RENDITION_SIZES.items():
+                data, (width, height) = _encode(image, longest_side)
+                rendition = existing.get(size) or EventPostMediaRendition(media=media, size=size)
+                if rendition.image:
+                    rendition.image.delete(save=False) # replace an older copy
+                rendition.width, rendition.height = width, height
+                rendition.image.save(f'{stem}_{size}.{RENDITION_FORMAT.lower()}', ContentFile(data), save=True)
+    except Exception:
+        logger.exception('Could not make renditions for media %s', media_id)
+        EventPostMedia.objects.filter(pk=media_id).update(renditions_status='failed')
+        return
+
+    # update() so the post_save signal doesn't queue the work again
+    EventPostMedia.objects.filter(pk=media_id).update(renditions_status='ready')
+    # the cached feed still points at the original
+    bump_posts_versions(EventPostMedia.objects.filter(pk=media_id).values('post__event_id'))
@@ -0,0 +1,160 @@
+# File: search.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: full text search over events and posts, backed by an SQLite FTS5 table kept in sync by signals
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Event, EventPost
+
+# the FTS5 table (made by migration 0013_search_index)
+SEARCH_TABLE = 'mylife_search'
+
+# bm25 weight of each column (kind, object_id, event_id, title, body), title matches count most
+RANK_WEIGHTS = (0.0, 0.0, 0.0, 10.0, 1.0)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# rows per insert when rebuilding
+REBUILD_BATCH_SIZE = 1000
+
+# words in a query, everything else (quotes, operators...) is dropped
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def is_available():
+    ''' the index only exists on SQLite, other databases fall back to a plain scan'''
+    return connection.vendor == 'sqlite'
+
+
+# events and posts share the table, so they get separate rowid ranges (even / odd)
+def _event_rowid(pk):
+    return pk * 2
+
+
+def _post_rowid(pk):
+    return pk * 2 + 1
+
+
+def build_match_query(text):
+    '''
+    Turn what the user typed into a safe FTS5 query: every word must match,
+    and the last one as a prefix so results show up while typing.
+    Returns "" when there is nothing to search for.
+    '''
+    words = _TOKEN.findall(text or '')
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _write(rows):
+    ''' replace the index rows of (rowid, kind, object_id, event_id, title, body) tuples'''
+    if not rows or not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, event_id, title, body) VALUES (%s, %s, %s, %s, %s, %s)',
+            rows)
+
+
+def _remove(rowids):
+    if not rowids or not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(rowid,) for rowid in rowids])
+
+
+def index_events(events):
+    ''' (re)index events, for bulk inserts that skip the signals'''
+    _write([(_event_rowid(event.pk), 'event', event.pk, event.pk, event.event_title, event.event_description)
+            for event in events])
+
+
+def index_posts(posts):
+    _write([(_post_rowid(post.pk), 'post', post.pk, post.event_id, '', post.post_text_content)
+            for post in posts])
+
+
+def remove_event(pk):
+    _remove([_event_rowid(pk)])
+
+
+def remove_post(pk):
+    _remove([_post_rowid(pk)])
+
+
+def rebuild_index():
+    '''
+    Empty the index and fill it again from the Event and EventPost tables.
+    Returns the number of rows indexed.
+    '''
+    if not is_available():
+        return 0
+    count = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        batch = []
+        for pk, title, description in Event.objects.order_by().values_list(
+                'pk', 'event_title', 'event_description').iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append((_event_rowid(pk), 'event', pk, pk, title, description))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                _write(batch)
+                count, batch = count + len(batch), []
+        for pk, event_id, text in EventPost.objects.order_by().values_list(
+                'pk', 'event_id', 'post_text_content').iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append((_post_rowid(pk), 'post', pk, event_id, '', text))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                _write(batch)
+                count, batch = count + len(batch), []
+        _write(batch)
+        count += len(batch)
+        with connection.cursor() as cursor:
+            # merge the index segments once everything is in
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def search(profile, text, limit=DEFAULT_LIMIT):
+    '''
+    Returns the best matches for the text among the events the profile created or collaborates on
+    (and the posts on those events), as a list of
+    {"kind": "event"|"post", "id": pk, "event_id": pk, "title": event title, "snippet": text}.
+    '''
+    limit = max(1, min(limit, MAX_LIMIT))
+    match = build_match_query(text)
+    if not match:
+        return []
+    visible = Event.objects.visible_to(profile).order_by().values('pk')
+
+    if not is_available():
+        return _scan(visible, text, limit)
+
+    visible_sql, visible_params = visible.query.sql_with_params()
+    t = SEARCH_TABLE
+    sql = (f'SELECT {t}.kind, {t}.object_id, {t}.event_id, e.event_title, '
+           f"snippet({t}, -1, '', '', '...', 12) "
+           f'FROM {t} JOIN {Event._meta.db_table} e ON e.id = {t}.event_id '
+           f'WHERE {t} MATCH %s AND {t}.event_id IN ({visible_sql}) '
+           f'ORDER BY bm25({t}, {", ".join(str(w) for w in RANK_WEIGHTS)}) LIMIT %s')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *visible_params, limit])
+        rows = cursor.fetchall()
+    return [{'kind': kind, 'id': object_id, 'event_id': event_id, 'title': title, 'snippet': snippet}
+            for kind, object_id, event_id, title, snippet in rows]
+
+
+def _scan(visible, text, limit):
+    ''' slow fallback without FTS: events whose title or description contain every word'''
+    events = Event.objects.filter(pk__in=visible).order_by('-event_date')
+    for word in _TOKEN.findall(text):
+        events = events.filter(Q(event_title__icontains=word) | Q(event_description__icontains=word))
+    return [{'kind': 'event', 'id': event.pk, 'event_id': event.pk, 'title': event.event_title,
+             'snippet': event.event_description[:120]} for event in events[:limit]]
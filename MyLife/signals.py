@@ -0,0 +1,169 @@
+# File: signals.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: model signal handlers that keep derived per-profile state in sync
+
+from django.db.models import F, Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Profile, Event, EventCollaborator, EventInvite, Collaborator, EventPost, EventPostMedia, WorkLog
+from . import collaborators, fragments, memberships, push, renditions, search, worklog_rollups
+
+
+def bump_calendar_versions(profile_ids):
+    ''' Bump the calendar version of the given profiles in one UPDATE (used for the feed ETag)'''
+    profile_ids = {pid for pid in profile_ids if pid is not None}
+    if profile_ids:
+        Profile.objects.filter(pk__in=profile_ids).update(calendar_version=F('calendar_version') + 1)
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, **kwargs):
+    ''' an event changed, so the creator and every collaborator see a new calendar'''
+    collaborator_ids = EventCollaborator.objects.filter(event_id=instance.pk).values('collaborator_id')
+    Profile.objects.filter(
+        Q(pk=instance.event_creator_id) | Q(pk__in=collaborator_ids)
+    ).update(calendar_version=F('calendar_version') + 1)
+
+
+@receiver(post_save, sender=Event)
+def event_saved_fragments(sender, instance, created, **kwargs):
+    ''' the invite lists of its invitees show the title'''
+    if not created:
+        fragments.bump_invites_versions(fragments.event_invitees(instance.pk))
+        # the save wrote back the versions it was loaded with, move past any bump it overwrote
+        fragments.bump_posts_versions([instance.pk])
+        fragments.bump_members_versions([instance.pk])
+
+
+@receiver(post_save, sender=Event)
+def event_saved_memberships(sender, instance, created, **kwargs):
+    ''' the creator's membership row, and the dates copied into every row'''
+    memberships.event_saved(instance, created)
+
+
+@receiver(post_save, sender=Event)
+def event_saved_search(sender, instance, **kwargs):
+    ''' keep the search index in step with the title/description'''
+    search.index_events([instance])
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted_search(sender, instance, **kwargs):
+    search.remove_event(instance.pk)
+
+
+@receiver(post_save, sender=EventPost)
+def event_post_saved_search(sender, instance, **kwargs):
+    search.index_posts([instance])
+
+
+@receiver([post_save, post_delete], sender=EventPost)
+def event_post_changed_fragments(sender, instance, **kwargs):
+    fragments.bump_posts_versions([instance.event_id])
+
+
+@receiver([post_save, post_delete], sender=EventPostMedia)
+def event_post_media_changed_fragments(sender, instance, **kwargs):
+    fragments.bump_posts_versions(EventPost.objects.filter(pk=instance.post_id).values('event_id'))
+
+
+@receiver(post_save, sender=EventPost)
+def event_post_saved_push(sender, instance, created, **kwargs):
+    ''' live update for the people on the event'''
+    if created:
+        push.notify_event_post(instance, EventCollaborator.objects.filter(event_id=instance.event_id)
+                               .values_list('collaborator_id', flat=True))
+
+
+@receiver(post_delete, sender=EventPost)
+def event_post_deleted_search(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=EventCollaborator)
+def event_collaborator_changed(sender, instance, **kwargs):
+    ''' joining or leaving an event changes the collaborator's calendar'''
+    bump_calendar_versions([instance.collaborator_id])
+
+
+@receiver([post_save, post_delete], sender=EventCollaborator)
+def event_collaborator_changed_fragments(sender, instance, **kwargs):
+    fragments.bump_members_versions([instance.event_id])
+
+
+@receiver(post_save, sender=EventCollaborator)
+def event_collaborator_saved_memberships(sender, instance, created, **kwargs):
+    memberships.collaborator_saved(instance, created)
+
+
+@receiver(post_delete, sender=EventCollaborator)
+def event_collaborator_deleted_memberships(sender, instance, **kwargs):
+    # (deleting the event deletes its memberships too, by cascade)
+    memberships.collaborator_removed(instance)
+
+
+@receiver([post_save, post_delete], sender=EventInvite)
+def event_invite_changed(sender, instance, **kwargs):
+    ''' invites show up for both sides'''
+    bump_calendar_versions([instance.inviter_id, instance.invitee_id])
+
+
+@receiver([post_save, post_delete], sender=EventInvite)
+def event_invite_changed_fragments(sender, instance, **kwargs):
+    ''' the event's pending invite list and the invitee's own invite list'''
+    fragments.bump_members_versions([instance.event_id])
+    fragments.bump_invites_versions([instance.invitee_id])
+
+
+@receiver(post_save, sender=EventInvite)
+def event_invite_saved_push(sender, instance, created, **kwargs):
+    ''' live update for the invitee (new invite) or the inviter (answer)'''
+    if created and instance.invite_status == 'pending':
+        push.notify_event_invites([instance])
+    elif not created and instance.invite_status in ('accepted', 'rejected'):
+        push.notify_event_invite_response(instance)
+
+
+@receiver([post_save, post_delete], sender=Collaborator)
+def collaborator_changed_fragments(sender, instance, **kwargs):
+    fragments.bump_invites_versions([instance.invitee_id])
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved_fragments(sender, instance, created, update_fields=None, **kwargs):
+    ''' a save that writes the names may be a rename (the token reset and version bumps only touch their own columns)'''
+    if not created and (update_fields is None or {'first_name', 'last_name'} & set(update_fields)):
+        fragments.profile_renamed(instance)
+
+
+@receiver(post_save, sender=Collaborator)
+def collaborator_saved_push(sender, instance, created, **kwargs):
+    push.notify_collaborator_invite(instance, created)
+
+
+@receiver(post_save, sender=Collaborator)
+def collaborator_saved(sender, instance, created, **kwargs):
+    ''' accepting adds the pair to the adjacency index, rejecting removes it'''
+    if created and instance.invite_status != 'accepted':
+        return  # a new pending invite can't be in the index yet
+    collaborators.sync_collaborator(instance)
+
+
+@receiver(post_delete, sender=Collaborator)
+def collaborator_deleted(sender, instance, **kwargs):
+    collaborators.sync_collaborator(instance, deleted=True)
+
+
+@receiver(post_save, sender=EventPostMedia)
+def event_post_media_saved(sender, instance, created, **kwargs):
+    ''' new uploads get their renditions made by the worker pool, off the request path'''
+    if created:
+        renditions.schedule_renditions(instance.pk)
+
+
+@receiver(post_delete, sender=WorkLog)
+def worklog_deleted(sender, instance, **kwargs):
+    ''' take a deleted log out of the rollups (WorkLog.save handles inserts and edits)'''
+    state = getattr(instance, '_rollup_state', None) or instance.rollup_state()
+    worklog_rollups.replace_in_rollups(state, None)
@@ -0,0 +1,227 @@
+# File: synthetic.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: deterministic generator of large, realistic looking datasets for benchmarks
+
+from array import array
+from datetime import date, time, timedelta
+from decimal import Decimal
+import random
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import (Profile, Event, EventInvite, EventCollaborator, EventPost, EventPostMedia,
+                     Collaborator, CollaboratorLink, WorkLog)
+from .memberships import rebuild_memberships
+from .search import rebuild_index
+from .worklog_rollups import rebuild_rollups
+
+# preset sizes, pick one with --scale and override single numbers with the other options
+SCALES = {
+    'tiny': {'profiles': 50, 'events_per_profile': 10, 'links_per_profile': 3, 'worklogs': 500},
+    'small': {'profiles': 500, 'events_per_profile': 20, 'links_per_profile': 4, 'worklogs': 5000},
+    'medium': {'profiles': 5000, 'events_per_profile': 40, 'links_per_profile': 5, 'worklogs': 100000},
+    'large': {'profiles': 20000, 'events_per_profile': 60, 'links_per_profile': 6, 'worklogs': 1000000},
+}
+
+# rows per bulk_create
+BATCH_SIZE = 2000
+
+# every generated user has this prefix, so a second run can tell them apart
+USERNAME_PREFIX = 'synthetic'
+
+# share of the generated events/invites/... that get each option
+RECURRING_SHARE = 0.05
+TIMED_SHARE = 0.8
+COLLABORATORS_PER_EVENT = 2
+INVITES_PER_EVENT = 1
+POSTS_PER_EVENT = 0.5
+MEDIA_PER_POST = 0.3
+
+_FIRST_NAMES = ['Ada', 'Ben', 'Chloe', 'Dev', 'Ema', 'Finn', 'Gia', 'Hugo', 'Ines', 'Jun', 'Kai', 'Lena',
+                'Milo', 'Nia', 'Omar', 'Pia', 'Quinn', 'Rosa', 'Sam', 'Tara', 'Uma', 'Vic', 'Wen', 'Yara']
+_LAST_NAMES = ['Kim', 'Park', 'Lee', 'Smith', 'Garcia', 'Chen', 'Nguyen', 'Silva', 'Khan', 'Novak',
+               'Rossi', 'Haddad', 'Okafor', 'Tanaka', 'Muller', 'Cohen']
+_EVENT_WORDS = ['Lunch', 'Standup', 'Study group', 'Gym', 'Birthday', 'Review', 'Planning', 'Dinner',
+                'Hike', 'Call', 'Workshop', 'Movie night', 'Dentist', 'Sync', 'Concert', 'Retro']
+_DURATIONS = [Decimal('0.5'), Decimal('1.0'), Decimal('1.5'), Decimal('2.0'), Decimal('3.0')]
+_POST_WORDS = ['great time', 'see you there', 'running late', 'photos from today', 'who is bringing snacks',
+               'moved to room B', 'thanks everyone', 'notes attached']
+
+
+def scale_options(scale, **overrides):
+    ''' Returns the sizes of a preset, with the given (non None) numbers swapped in'''
+    options = dict(SCALES[scale])
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return options
+
+
+def _bulk_insert(model, rows, on_saved=None):
+    '''
+    bulk_create an iterable of unsaved rows in BATCH_SIZE chunks without keeping them all in memory.
+    on_saved(batch) is called with each saved batch (their pks are set). Returns the row count.
+    '''
+    count, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            saved = model.objects.bulk_create(batch)
+            if on_saved:
+                on_saved(saved)
+            count, batch = count + len(batch), []
+    if batch:
+        saved = model.objects.bulk_create(batch)
+        if on_saved:
+            on_saved(saved)
+        count += len(batch)
+    return count
+
+
+def preferential_attachment(count, links_per_node, rng):
+    '''
+    Returns undirected edges (a, b) between node indexes 0..count-1 of a Barabasi-Albert graph:
+    new nodes link to existing ones with a chance proportional to their degree,
+    so a few people end up with very many collaborators (a power-law degree distribution).
+    '''
+    edges = set()
+    # every node appears here once per edge it has, so picking uniformly from it follows the degrees
+    ends = []
+    for node in range(count):
+        targets = set()
+        wanted = min(links_per_node, node)
+        while len(targets) < wanted:
+            targets.add(rng.choice(ends) if ends and rng.random() < 0.9 else rng.randrange(node))
+        for target in targets:
+            edges.add((target, node))
+            ends += [target, node]
+    return sorted(edges)
+
+
+def generate(profiles, events_per_profile, links_per_profile, worklogs, seed=0, start=date(2025, 1, 1), days=730,
+             log=print):
+    '''
+    Fill the database with a synthetic dataset. The same arguments (and seed) always give the same rows.
+    Signal-maintained tables (collaborator links, search index, rollups, event memberships) are filled directly,
+    since bulk_create skips the signals. Returns {table: rows created}.
+    '''
+    rng = random.Random(seed)
+    created = {}
+
+    with transaction.atomic():
+        log(f'{profiles} users and profiles')
+        users = []
+        _bulk_insert(User, (User(username=f'{USERNAME_PREFIX}{i:06d}', password='!') for i in range(profiles)),
+                     users.extend)
+
+        def profile_rows():
+            for i, user in enumerate(users):
+                first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+                yield Profile(user=user, first_name=first, last_name=last, timezone='EST',
+                              email_address=f'{first.lower()}.{last.lower()}{i}@example.com',
+                              calendar_token=f'synthetic-{seed}-{i:06d}')
+        profile_ids = []
+        created['profiles'] = _bulk_insert(Profile, profile_rows(),
+                                           lambda saved: profile_ids.extend(profile.pk for profile in saved))
+        del users
+
+        log('collaborator graph')
+        neighbors = {pk: [] for pk in profile_ids}
+        collaborators, links = [], []
+        for a, b in preferential_attachment(len(profile_ids), links_per_profile, rng):
+            inviter, invitee = profile_ids[b], profile_ids[a]
+            status = rng.choices(['accepted', 'pending', 'rejected'], weights=[85, 10, 5])[0]
+            ctype = rng.choice(['friend', 'work'])
+            collaborators.append(Collaborator(inviter_id=inviter, invitee_id=invitee,
+                                              invite_status=status, collaborator_type=ctype))
+            if status == 'accepted':
+                neighbors[inviter].append(invitee)
+                neighbors[invitee].append(inviter)
+                links.append(CollaboratorLink(profile_id=inviter, other_id=invitee, collaborator_type=ctype, is_inviter=True))
+                links.append(CollaboratorLink(profile_id=invitee, other_id=inviter, collaborator_type=ctype, is_inviter=False))
+        created['collaborators'] = _bulk_insert(Collaborator, collaborators)
+        created['collaborator_links'] = _bulk_insert(CollaboratorLink, links)
+        del collaborators, links
+
+        log(f'{profiles * events_per_profile} events')
+
+        def event_rows():
+            for creator in profile_ids:
+                for _ in range(events_per_profile):
+                    event = Event(event_creator_id=creator, event_date=start + timedelta(days=rng.randrange(days)),
+                                  event_title=f'{rng.choice(_EVENT_WORDS)} {rng.randrange(1000)}',
+                                  event_description=rng.choice(['', 'Bring a laptop.', 'At the usual place.']),
+                                  event_type=rng.choice(['self', 'friends', 'work']))
+                    if rng.random() < TIMED_SHARE:
+                        hour = rng.randrange(7, 21)
+                        event.event_start_time = time(hour, rng.choice([0, 15, 30, 45]))
+                        event.event_end_time = time(min(hour + rng.randrange(1, 3), 23), event.event_start_time.minute)
+                    if rng.random() < RECURRING_SHARE:
+                        event.recurrence_frequency = rng.choice(['daily', 'weekly', 'monthly'])
+                        event.recurrence_count = rng.randrange(2, 30)
+                    yield event
+
+        # compact (event pk, creator pk) columns for the rows that point at events
+        event_ids, event_creators = array('q'), array('q')
+
+        def keep_events(saved):
+            event_ids.extend(event.pk for event in saved)
+            event_creators.extend(event.event_creator_id for event in saved)
+        created['events'] = _bulk_insert(Event, event_rows(), keep_events)
+
+        log('event collaborators and invites')
+
+        def event_members():
+            for event_id, creator in zip(event_ids, event_creators):
+                friends = neighbors[creator]
+                for other in rng.sample(friends, min(len(friends), COLLABORATORS_PER_EVENT)):
+                    yield EventCollaborator(event_id=event_id, collaborator_id=other,
+                                            role=rng.choice(['attendee', 'attendee', 'editor']))
+
+        def event_invites():
+            for event_id, creator in zip(event_ids, event_creators):
+                for _ in range(INVITES_PER_EVENT):
+                    invitee = rng.choice(profile_ids)
+                    if invitee != creator:
+                        yield EventInvite(event_id=event_id, inviter_id=creator, invitee_id=invitee,
+                                          invite_status=rng.choices(['pending', 'accepted', 'rejected'], weights=[60, 30, 10])[0])
+
+        created['event_collaborators'] = _bulk_insert(EventCollaborator, event_members())
+        created['event_invites'] = _bulk_insert(EventInvite, event_invites())
+
+        log('posts and media stubs')
+
+        def post_rows():
+            for event_id, creator in zip(event_ids, event_creators):
+                for _ in range(int(POSTS_PER_EVENT) + (rng.random() < POSTS_PER_EVENT % 1)):
+                    yield EventPost(event_id=event_id, post_author_id=creator, post_text_content=rng.choice(_POST_WORDS))
+
+        media_count = [0]
+
+        def add_media(saved):
+            # stubs point at a file that isn't there, so nothing tries to make renditions for them
+            media = EventPostMedia.objects.bulk_create(
+                EventPostMedia(post_id=post.pk, post_media=f'synthetic/{post.pk}.jpg', renditions_status='failed')
+                for post in saved if rng.random() < MEDIA_PER_POST)
+            media_count[0] += len(media)
+        created['posts'] = _bulk_insert(EventPost, post_rows(), add_media)
+        created['media'] = media_count[0]
+
+        log(f'{worklogs} work logs')
+
+        def worklog_rows():
+            categories = [code for code, _ in WorkLog.CATEGORY_CHOICES]
+            for _ in range(worklogs):
+                yield WorkLog(date=start + timedelta(days=rng.randrange(days)), start_time=time(rng.randrange(6, 22)),
+                              duration=rng.choice(_DURATIONS), category=rng.choice(categories),
+                              description=rng.choice(['', 'focused work', 'meetings', 'reading']))
+        created['worklogs'] = _bulk_insert(WorkLog, worklog_rows())
+
+    log('rollups, search index and event memberships')
+    created['worklog_rollups'] = rebuild_rollups()
+    created['search_rows'] = rebuild_index()
+    created['event_memberships'] = rebuild_memberships()
+    return created
+
+
+def has_synthetic_data():
+    return User.objects.filter(username__startswith=USERNAME_PREFIX).exists()
@@ -1,3 +1,1161 @@
 from django.test import TestCase
 
 # Create your tests here.
+
+# File: tests.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: tests for my app
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+import contextvars
+import io
+import json
+import tempfile
+import threading
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from . import memberships, metrics, push, recurrence, search
+from .benchmarks import hot_views
+from .db import ReplicaRouter, gather_queries, replica_reads
+from .density import daily_counts
+from .ics_import import NOT_UTF8, import_events
+from .worklog_io import export_worklogs, import_worklogs, read_rows
+from .worklog_rollups import rebuild_rollups
+from .freebusy import BusyIndex, common_free_slots, find_conflicts
+from .fragments import fragment_cache
+from .middleware import get_request_profile
+
+from .models import (Profile, Event, EventCollaborator, EventInvite, EventMembership, EventPost, EventPostMedia,
+                     Collaborator, CollaboratorLink, WorkLog, WorkLogRollup)
+
+
+def make_profile(username):
+    ''' helper to create a User and its Profile'''
+    user = User.objects.create(username=username)
+    return Profile.objects.create(user=user, first_name=username, last_name='Test',
+                                  email_address=f'{username}@example.com', timezone='EST')
+
+
+def populate(profile, size):
+    ''' give a profile `size` of every kind of row the dashboard shows'''
+    start = date(2026, 1, 1)
+    for i in range(size):
+        other = make_profile(f'other{size}_{i}')
+        Event.objects.create(event_title=f'mine {i}', event_date=start + timedelta(days=i),
+                             event_creator=profile, event_type='self')
+        theirs = Event.objects.create(event_title=f'theirs {i}', event_date=start + timedelta(days=i),
+                                      event_creator=other, event_type='friends')
+        EventCollaborator.objects.create(event=theirs, collaborator=profile)
+        invited_to = Event.objects.create(event_title=f'invite {i}', event_date=start,
+                                          event_creator=other, event_type='work')
+        EventInvite.objects.create(event=invited_to, inviter=other, invitee=profile)
+        EventInvite.objects.create(event=theirs, inviter=profile, invitee=other)
+        Collaborator.objects.create(inviter=profile, invitee=other,
+                                    collaborator_type='friend', invite_status='accepted')
+        Collaborator.objects.create(inviter=other, invitee=profile,
+                                    collaborator_type='work', invite_status='pending')
+
+
+def streamed_json(response):
+    ''' the json body of a streamed response (the async views stream from an async iterator)'''
+    if response.is_async:
+        async def read():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return json.loads(async_to_sync(read)())
+    return json.loads(b''.join(response.streaming_content))
+
+
+class DashboardQueryBudgetTests(TestCase):
+    ''' the dashboard must cost the same number of queries however busy the profile is'''
+
+    # session + user + profile + the 4 snapshot queries
+    QUERY_BUDGET = 7
+
+    def setUp(self):
+        self.profile = make_profile('owner')
+        self.client.force_login(self.profile.user)
+
+    def test_query_count_is_constant(self):
+        populate(self.profile, 2)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            small = self.client.get(reverse('user_dashboard'))
+        populate(self.profile, 40)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            large = self.client.get(reverse('user_dashboard'))
+        self.assertEqual(len(small.context['events']), 4)
+        self.assertEqual(len(large.context['events']), 84)
+
+    def test_snapshot_splits_directions(self):
+        populate(self.profile, 3)
+        response = self.client.get(reverse('user_dashboard'))
+        self.assertEqual(len(response.context['pending_event_invites_received']), 3)
+        self.assertEqual(len(response.context['pending_event_invites_sent']), 3)
+        self.assertEqual(len(response.context['collaborators']), 3)
+        self.assertEqual(len(response.context['pending_collab_invites_sent']), 0)
+        self.assertEqual(len(response.context['pending_collab_invites_received']), 3)
+        self.assertContains(response, 'other3_0 Test')
+
+
+class QueryMetricsTests(TestCase):
+    ''' the metrics middleware counts queries per view and enforces the query budgets'''
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.profile = make_profile('owner')
+        self.client.force_login(self.profile.user)
+
+    def test_queries_are_counted_by_view(self):
+        self.client.get(reverse('user_dashboard'))
+        self.client.get(reverse('user_dashboard'))
+        self.assertEqual(metrics.registry.requests['user_dashboard'], 2)
+        self.assertEqual(metrics.registry.queries['user_dashboard'], 2 * DashboardQueryBudgetTests.QUERY_BUDGET)
+
+    @override_settings(MYLIFE_QUERY_BUDGETS={'user_dashboard': 2}, MYLIFE_QUERY_BUDGET_STRICT=True)
+    def test_over_budget_fails_in_tests(self):
+        with self.assertRaises(metrics.QueryBudgetExceeded):
+            self.client.get(reverse('user_dashboard'))
+
+    @override_settings(MYLIFE_QUERY_BUDGETS={'user_dashboard': 2}, MYLIFE_QUERY_BUDGET_STRICT=False)
+    def test_over_budget_is_counted_in_production(self):
+        with self.assertLogs('MyLife.metrics', 'WARNING'):
+            response = self.client.get(reverse('user_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.registry.budget_exceeded['user_dashboard'], 1)
+
+    @override_settings(MYLIFE_QUERY_BUDGETS={'events_json': 1}, MYLIFE_QUERY_BUDGET_STRICT=True)
+    def test_streamed_queries_count(self):
+        url = f"{reverse('events_json')}?start=2026-01-01&end=2026-02-01"
+        response = self.client.get(url)
+        # the events are read while the body streams, the budget is checked after that
+        with self.assertRaises(metrics.QueryBudgetExceeded):
+            b''.join(response.streaming_content)
+        metrics.registry.reset()
+        with override_settings(MYLIFE_QUERY_BUDGET_STRICT=False), self.assertLogs('MyLife.metrics', 'WARNING'):
+            with CaptureQueriesContext(connection) as queries:
+                b''.join(self.client.get(url).streaming_content)
+        self.assertEqual(metrics.registry.queries['events_json'], len(queries))
+        self.assertIn('MyLife_eventmembership', queries[-1]['sql'])
+
+    def test_repeated_queries_are_flagged(self):
+        recorder = metrics.QueryRecorder()
+        for pk in range(6):
+            recorder.shapes[metrics.fingerprint(f'SELECT * FROM "MyLife_event" WHERE "id" = {pk}')] += 1
+        self.assertEqual(len(recorder.repeated(5)), 1)
+
+    def test_batched_inserts_are_not_flagged(self):
+        recorder = metrics.QueryRecorder()
+        rows = ', '.join(['(%s, %s)'] * 3)
+        for _ in range(6):
+            recorder(lambda *args: None, f'INSERT INTO "MyLife_worklog" ("date", "category") VALUES {rows}', [], False, {})
+            recorder(lambda *args: None, 'INSERT INTO "MyLife_worklog" ("date") VALUES (%s)', [], True, {})
+        self.assertEqual((recorder.count, recorder.repeated(5)), (12, []))
+        self.assertEqual(metrics.fingerprint(f'INSERT INTO "t" ("a", "b") VALUES {rows}'),
+                         'INSERT INTO "t" ("a", "b") VALUES (...)')
+        for _ in range(6):
+            recorder(lambda *args: None, 'INSERT INTO "MyLife_worklog" ("date") VALUES (%s)', [], False, {})
+        self.assertEqual(len(recorder.repeated(5)), 1)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('user_dashboard'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.profile.user.is_staff = True
+        self.profile.user.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(response, 'mylife_request_duration_seconds_count{view="user_dashboard"} 1')
+        self.assertContains(response, 'mylife_sql_queries_total{view="user_dashboard"}')
+
+    @override_settings(MYLIFE_METRICS_TOKEN='s3cret')
+    def test_metrics_endpoint_token(self):
+        self.client.logout()
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cre').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer sécret').status_code, 403)
+
+
+class AsyncViewTests(TestCase):
+    ''' the async views (served when MYLIFE_ASYNC_VIEWS is on) answer like the sync ones'''
+
+    def setUp(self):
+        self.profile = make_profile('owner')
+        self.client.force_login(self.profile.user)
+        populate(self.profile, 3)
+        self.event = Event.objects.filter(event_creator=self.profile).first()
+
+    def get_both(self, url):
+        ''' returns the (sync, async) responses of a url'''
+        sync = self.client.get(url)
+        with hot_views(use_async=True):
+            return sync, self.client.get(url)
+
+    def test_dashboard(self):
+        sync, async_ = self.get_both(reverse('user_dashboard'))
+        for name in ('events', 'pending_event_invites_received', 'collaborators', 'pending_collab_invites_received'):
+            self.assertEqual(async_.context[name], sync.context[name])
+        with hot_views(use_async=True), self.assertNumQueries(DashboardQueryBudgetTests.QUERY_BUDGET):
+            self.client.get(reverse('user_dashboard'))
+
+    def test_event_details_and_feed(self):
+        sync, async_ = self.get_both(reverse('event_details', args=[self.event.pk]))
+        self.assertEqual(async_.status_code, 200)
+        self.assertEqual(async_.context['event'], self.event)
+        self.assertTrue(async_.context['can_post'])
+        feed = f"{reverse('events_json')}?start=2026-01-01&end=2026-02-01"
+        sync, async_ = self.get_both(feed)
+        items = streamed_json(async_)
+        self.assertEqual(items, streamed_json(sync))
+        self.assertEqual(len(items), 6)
+
+    def test_login_and_404(self):
+        with hot_views(use_async=True):
+            self.assertEqual(self.client.get(reverse('event_details', args=[0])).status_code, 404)
+            self.client.logout()
+            self.assertEqual(self.client.get(reverse('events_json')).status_code, 302)
+
+
+@override_settings(MYLIFE_ASYNC_CONCURRENT_QUERIES=True)
+class ConcurrentQueryTests(TransactionTestCase):
+    '''
+    the async views with their queries on worker threads (each with its own connection, so the rows
+    have to be committed: no TestCase transaction here) answer like the sync views, with the same routing
+    '''
+
+    def setUp(self):
+        self.profile = make_profile('owner')
+        self.client.force_login(self.profile.user)
+        populate(self.profile, 3)
+
+    def test_views_answer_the_same(self):
+        event = Event.objects.filter(event_creator=self.profile).first()
+        for url in (reverse('user_dashboard'), reverse('event_details', args=[event.pk])):
+            sync = self.client.get(url)
+            with hot_views(use_async=True):
+                async_ = self.client.get(url)
+            self.assertEqual(async_.status_code, 200)
+            for name in ('events', 'pending_event_invites_received', 'collaborators', 'event', 'can_post'):
+                if name in sync.context:
+                    self.assertEqual(async_.context[name], sync.context[name])
+
+    @override_settings(MYLIFE_REPLICA_ALIAS='default')
+    def test_routing_reaches_the_worker_threads(self):
+        router = ReplicaRouter()
+
+        def route():
+            return router.db_for_read(Event), threading.get_ident()
+
+        @replica_reads
+        async def read_view():
+            return await gather_queries(route, route)
+
+        async def plain_view():
+            return await gather_queries(route)
+
+        def run(view):
+            # a clean routing state, like the start of a request (the setUp writes pinned this thread to the primary)
+            return contextvars.Context().run(async_to_sync(view))
+
+        main = threading.get_ident()
+        routes = run(read_view)
+        # the routing context is copied to every worker thread, and they really are other threads
+        self.assertEqual([alias for alias, _ in routes], ['default', 'default'])
+        self.assertNotIn(main, [thread for _, thread in routes])
+        self.assertEqual(run(plain_view)[0][0], None)
+        with override_settings(MYLIFE_ASYNC_CONCURRENT_QUERIES=False):
+            self.assertEqual(run(read_view), [('default', main)] * 2)
+
+
+class RecordingBroker:
+    ''' broker that keeps what was published, for the tests'''
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class LiveUpdatesTests(TestCase):
+    ''' invites, answers and new posts are pushed to the profiles they concern'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.friend = make_profile('friend')
+        self.event = Event.objects.create(event_title='Picnic', event_date=date(2026, 5, 1),
+                                          event_creator=self.owner, event_type='friends')
+
+    @override_settings(MYLIFE_PUSH_BROKER='MyLife.tests.RecordingBroker')
+    def test_signals_publish_after_commit(self):
+        published = push.get_broker().published
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.add_event_collaborators(self.event, [self.friend])
+        self.assertEqual([(c, m['type']) for c, m in published],
+                         [(push.profile_channel(self.friend.pk), 'event_invite')])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.friend.accept_event_collaborator(self.event)
+            EventPost.objects.create(event=self.event, post_author=self.friend, post_text_content='hi')
+        self.assertEqual([(c, m['type']) for c, m in published[1:]],
+                         [(push.profile_channel(self.owner.pk), 'event_invite_response'),
+                          (push.profile_channel(self.owner.pk), 'event_post')])
+
+    def test_stream_needs_asgi(self):
+        self.client.force_login(self.owner.user)
+        self.assertEqual(self.client.get(reverse('live_updates')).status_code, 501)
+
+    @override_settings(MYLIFE_PUSH_HEARTBEAT_SECONDS=0.2, MYLIFE_PUSH_STREAM_SECONDS=0.5)
+    async def test_stream_delivers_messages(self):
+        await self.async_client.aforce_login(self.owner.user)
+        response = await self.async_client.get(reverse('live_updates'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertIn(b': connected', await anext(stream))
+        push.get_broker().publish(push.profile_channel(self.owner.pk), {'type': 'event_post', 'id': 1})
+        self.assertEqual(await anext(stream), b'event: event_post\ndata: {"type": "event_post", "id": 1}\n\n')
+        # then only keep-alives until the stream ends
+        async for chunk in stream:
+            self.assertEqual(chunk, b': heartbeat\n\n')
+
+
+class EventMembershipTests(TestCase):
+    ''' the membership index follows the events and their collaborators'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.friend = make_profile('friend')
+        self.event = Event.objects.create(event_title='Picnic', event_date=date(2026, 5, 1),
+                                          event_creator=self.owner, event_type='friends')
+
+    def rows(self):
+        return set(EventMembership.objects.values_list('profile__user__username', 'role', 'event_date'))
+
+    def test_signals_keep_rows_in_step(self):
+        self.assertEqual(self.rows(), {('owner', 'creator', date(2026, 5, 1))})
+        member = EventCollaborator.objects.create(event=self.event, collaborator=self.friend, role='attendee')
+        self.event.event_date = date(2026, 5, 2)
+        self.event.save()
+        self.assertEqual(self.rows(), {('owner', 'creator', date(2026, 5, 2)), ('friend', 'attendee', date(2026, 5, 2))})
+        member.delete()
+        self.assertEqual(self.rows(), {('owner', 'creator', date(2026, 5, 2))})
+        # the rebuild gives back what the signals made
+        self.assertEqual(memberships.rebuild_memberships(), 1)
+        self.assertEqual(self.rows(), {('owner', 'creator', date(2026, 5, 2))})
+
+    def test_visible_to_window(self):
+        weekly = Event.objects.create(event_title='Run', event_date=date(2026, 1, 5), event_creator=self.friend,
+                                      event_type='self', recurrence_frequency='weekly',
+                                      recurrence_until=date(2026, 3, 1))
+        EventCollaborator.objects.create(event=weekly, collaborator=self.owner)
+        EventCollaborator.objects.create(event=self.event, collaborator=self.owner)  # listed twice, one row
+        self.assertEqual(list(Event.objects.visible_to(self.owner).order_by('pk')), [self.event, weekly])
+        self.assertEqual(list(Event.objects.visible_to(self.owner, date(2026, 2, 1), date(2026, 3, 1))), [weekly])
+        self.assertEqual(list(Event.objects.visible_to(self.owner, date(2026, 4, 1), date(2026, 6, 1))), [self.event])
+        self.assertEqual(list(Event.objects.visible_to(self.friend, date(2026, 4, 1), date(2026, 6, 1))), [])
+
+
+class InviteStateTests(TestCase):
+    ''' an invite is settled once, however often it is answered, and the bulk endpoint does many in one go'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.friend = make_profile('friend')
+        self.event = Event.objects.create(event_title='Picnic', event_date=date(2026, 5, 1),
+                                          event_creator=self.owner, event_type='friends')
+
+    def test_accepting_twice_settles_once(self):
+        self.owner.add_event_collaborator(self.event, self.friend)
+        self.assertEqual(self.friend.accept_event_collaborator(self.event), "Event invite accepted!")
+        self.assertEqual(self.friend.accept_event_collaborator(self.event), "No pending invite.")
+        self.assertEqual(EventCollaborator.objects.filter(event=self.event, collaborator=self.friend).count(), 1)
+        self.assertTrue(EventMembership.objects.filter(event=self.event, profile=self.friend, role='attendee').exists())
+
+        self.assertEqual(self.owner.add_collaborator(self.friend, 'friend'), "Collaborator request sent!")
+        self.assertEqual(self.owner.add_collaborator(self.friend, 'friend'),
+                         "Error: Already collaborators or pending request exists.")
+        self.assertEqual(self.friend.accept_collaborator(self.owner, 'friend'), "Collaborator request accepted.")
+        self.assertEqual(self.friend.accept_collaborator(self.owner, 'friend'), "No pending collaborator request.")
+        self.assertEqual(CollaboratorLink.objects.count(), 2)
+
+    def test_rejected_invite_can_be_sent_again(self):
+        self.owner.add_collaborator(self.friend, 'work')
+        invite = Collaborator.objects.get()
+        self.client.force_login(self.friend.user)
+        self.client.get(reverse('respond_collab_invite', args=[invite.pk, 'reject']))
+        self.assertEqual(self.owner.add_collaborator(self.friend, 'work'), "Collaborator request sent!")
+        self.assertEqual(list(Collaborator.objects.values_list('pk', 'invite_status')), [(invite.pk, 'pending')])
+
+    def test_bulk_respond(self):
+        stranger = make_profile('stranger')
+        self.owner.add_collaborator(self.friend, 'friend')
+        stranger.add_collaborator(self.owner, 'work')  # not the friend's to answer
+        self.owner.add_event_collaborators(self.event, [self.friend, stranger])
+        collabs = list(Collaborator.objects.order_by('pk').values_list('pk', flat=True))
+        invites = list(EventInvite.objects.order_by('pk').values_list('pk', flat=True))
+        self.client.force_login(self.friend.user)
+        url = reverse('respond_invites')
+        response = self.client.post(url, {'decision': 'accept', 'collab': collabs, 'event_invite': invites})
+        self.assertEqual(response.json(), {'collab': collabs[:1], 'event_invite': invites[:1]})
+        # answering again changes nothing
+        response = self.client.post(url, {'decision': 'reject', 'collab': collabs, 'event_invite': invites},
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {'collab': [], 'event_invite': []})
+        self.assertEqual(self.client.post(url, {'decision': 'maybe', 'collab': collabs}).status_code, 400)
+        response = self.client.post(url, {'decision': 'reject', 'collab': str(collabs[0])}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(EventInvite.objects.order_by('pk').values_list('invite_status', flat=True)),
+                         ['accepted', 'pending'])
+        self.assertTrue(EventCollaborator.objects.filter(event=self.event, collaborator=self.friend).exists())
+
+    def test_racing_bulk_invites(self):
+        rival = make_profile('rival')
+        other = make_profile('other')
+        EventCollaborator.objects.create(event=self.event, collaborator=rival)
+        look = Profile._sort_event_invitees
+
+        def raced(profile, *args):
+            # another request invites the friend between the check and the insert
+            new_invites = look(profile, *args)
+            if not EventInvite.objects.filter(invitee=self.friend).exists():
+                EventInvite.objects.create(event=self.event, inviter=rival, invitee=self.friend)
+            return new_invites
+
+        with mock.patch.object(Profile, '_sort_event_invitees', raced):
+            outcomes = self.owner.add_event_collaborators(self.event, [self.friend, other])
+        self.assertEqual(outcomes, {self.friend.pk: 'already_invited', other.pk: 'sent'})
+        self.assertEqual(sorted(EventInvite.objects.values_list('invitee_id', 'inviter_id')),
+                         [(self.friend.pk, rival.pk), (other.pk, self.owner.pk)])
+
+
+class FragmentCacheTests(TestCase):
+    ''' unchanged page sections come from the cache without their queries, a change shows up right away'''
+
+    def setUp(self):
+        # test rows reuse pks (and start at version 0), so start from an empty cache
+        fragment_cache().clear()
+        self.owner = make_profile('owner')
+        self.friend = make_profile('friend')
+        self.event = Event.objects.create(event_title='Picnic', event_date=date(2026, 5, 1),
+                                          event_creator=self.owner, event_type='friends')
+        self.client.force_login(self.owner.user)
+
+    def section_queries(self, url):
+        ''' the queries of a page that read the cached sections'''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        tables = ('"MyLife_eventpost"', '"MyLife_eventcollaborator"', '"MyLife_eventinvite"')
+        return response, [query['sql'] for query in queries if any(table in query['sql'] for table in tables)]
+
+    def test_event_page(self):
+        url = reverse('event_details', args=[self.event.pk])
+        EventPost.objects.create(event=self.event, post_author=self.owner, post_text_content='first post')
+        self.assertTrue(self.section_queries(url)[1])
+        for use_async in (False, True):
+            with hot_views(use_async=use_async):
+                response, queries = self.section_queries(url)
+            self.assertContains(response, 'first post')
+            self.assertEqual(queries, [])
+
+        EventPost.objects.create(event=self.event, post_author=self.friend, post_text_content='second post')
+        self.owner.add_event_collaborator(self.event, self.friend)
+        with hot_views(use_async=True):
+            response = self.client.get(url)
+        self.assertContains(response, 'second post')
+        self.assertContains(response, 'To friend Test')
+
+    def test_profile_invites(self):
+        url = reverse('show_profile')
+        self.friend.add_event_collaborator(Event.objects.create(
+            event_title='Hike', event_date=date(2026, 6, 1), event_creator=self.friend, event_type='friends'), self.owner)
+        self.assertContains(self.client.get(url), 'Hike')
+        hike = Event.objects.get(event_title='Hike')
+        hike.event_title = 'Long hike'
+        hike.save()
+        self.assertContains(self.client.get(url), 'Long hike')
+        self.owner.accept_event_collaborator(hike)
+        self.assertContains(self.client.get(url), 'No outstanding event invites.')
+
+
+class CalendarFeedTests(TestCase):
+    ''' the streamed json feed gives the same items the model methods describe'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.client.force_login(self.owner.user)
+
+    def test_items_and_chunks(self):
+        single = Event.objects.create(event_title='Say "hi" — café', event_date=date(2026, 3, 2),
+                                      event_start_time=time(9, 30), event_creator=self.owner, event_type='self')
+        weekly = Event.objects.create(event_title='Run', event_date=date(2026, 2, 23), event_end_time=time(7, 0),
+                                      event_creator=self.owner, event_type='self', recurrence_frequency='weekly',
+                                      recurrence_exceptions=['2026-03-09'])
+        Event.objects.create(event_title='Later', event_date=date(2026, 4, 1), event_creator=self.owner, event_type='self')
+
+        expected = [{'id': single.pk, 'title': single.event_title, 'start': '2026-03-02T09:30:00',
+                     'end': '2026-03-02T23:59:59.999999', 'url': reverse('event_details', args=[single.pk])}]
+        for day in weekly.occurrences_between(date(2026, 3, 1), date(2026, 3, 20)):
+            expected.append({'id': f'{weekly.pk}-{day}', 'title': 'Run', 'start': f'{day}T00:00:00',
+                             'end': f'{day}T07:00:00', 'url': reverse('event_details', args=[weekly.pk]),
+                             'groupId': weekly.pk})
+        url = f"{reverse('events_json')}?start=2026-03-01&end=2026-03-20"
+        with mock.patch('MyLife.views.CALENDAR_FEED_CHUNK_ITEMS', 1):
+            response = self.client.get(url)
+            chunks = list(response.streaming_content)
+        self.assertEqual(len(expected), 3)
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(sorted(json.loads(b''.join(chunks)), key=str), sorted(expected, key=str))
+        self.assertEqual(streamed_json(self.client.get(f"{reverse('events_json')}?start=2025-01-01&end=2025-02-01")), [])
+
+    def test_conditional_get(self):
+        event = Event.objects.create(event_title='Lunch', event_date=date(2026, 3, 2), event_creator=self.owner,
+                                     event_type='self')
+        url = f"{reverse('events_json')}?start=2026-03-01&end=2026-03-20"
+        first = self.client.get(url)
+        self.assertEqual([item['title'] for item in streamed_json(first)], ['Lunch'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        event.event_title = 'Brunch'
+        event.save()
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([item['title'] for item in streamed_json(second)], ['Brunch'])
+
+        # saving the profile form must not put the old version (and so the old etag) back
+        version = Profile.objects.get(pk=self.owner.pk).calendar_version
+        self.client.post(reverse('update_profile'), {'email_address': 'new@example.com', 'timezone': 'PST'})
+        self.assertEqual(Profile.objects.get(pk=self.owner.pk).calendar_version, version)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304)
+
+    def test_profile_edit_keeps_the_calendar_version(self):
+        loaded = Profile.objects.get(pk=self.owner.pk)
+        # an event changes while the edit form is open
+        Event.objects.create(event_title='New', event_date=date(2026, 3, 2), event_creator=self.owner, event_type='self')
+        version = Profile.objects.get(pk=self.owner.pk).calendar_version
+        self.assertGreater(version, loaded.calendar_version)
+        loaded.timezone = 'PST'
+        loaded.save()
+        self.client.post(reverse('update_profile'), {'email_address': 'new@example.com', 'timezone': 'PST'})
+        saved = Profile.objects.get(pk=self.owner.pk)
+        self.assertEqual((saved.calendar_version, saved.email_address, saved.timezone), (version, 'new@example.com', 'PST'))
+
+
+class CalendarSubscriptionTests(TestCase):
+    ''' the ics subscription url: 304s without event queries, a fresh feed after a change, a dead url after a reset'''
+
+    def setUp(self):
+        # test rows reuse pks (and start at version 0), so start from an empty cache
+        cache.clear()
+        self.owner = make_profile('owner')
+        self.event = Event.objects.create(event_title='Dentist', event_date=date.today(), event_creator=self.owner,
+                                          event_type='self')
+
+    def url(self):
+        return reverse('calendar_subscription', args=[Profile.objects.get(pk=self.owner.pk).calendar_token])
+
+    def test_unknown_token(self):
+        self.assertEqual(self.client.get(reverse('calendar_subscription', args=['nope'])).status_code, 404)
+
+    def test_not_modified_without_event_queries(self):
+        response = self.client.get(self.url())
+        self.assertIn('Dentist', b''.join(response.streaming_content).decode())
+        url = self.url()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"MyLife_profile"', queries[0]['sql'])
+
+    def test_edit_changes_the_cache_key(self):
+        first = self.client.get(self.url())
+        b''.join(first.streaming_content)
+        # the second fetch is the cached copy
+        self.assertIn('Dentist', self.client.get(self.url()).content.decode())
+        self.event.event_title = 'Doctor'
+        self.event.save()
+        second = self.client.get(self.url(), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        feed = b''.join(second.streaming_content).decode()
+        self.assertIn('Doctor', feed)
+        self.assertNotIn('Dentist', feed)
+
+    def test_reset_token(self):
+        old = self.url()
+        self.assertEqual(self.client.get(old).status_code, 200)
+        self.client.force_login(self.owner.user)
+        self.client.post(reverse('reset_calendar_token'))
+        self.assertEqual(self.client.get(old).status_code, 404)
+        self.assertNotEqual(self.url(), old)
+        self.assertEqual(self.client.get(self.url()).status_code, 200)
+
+    def test_bad_window(self):
+        for params in ({'past': '-1'}, {'future': '-5'}, {'past': 'abc'}, {'future': '1.5'}):
+            self.assertEqual(self.client.get(self.url(), params).status_code, 400, params)
+        self.assertEqual(self.client.get(self.url(), {'past': '0', 'future': '99999'}).status_code, 200)
+
+
+class EventDensityTests(TestCase):
+    ''' the per-day counts match the events feed, in a fixed number of queries'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.friend = make_profile('friend')
+        self.client.force_login(self.owner.user)
+
+    def test_counts_by_day_and_type(self):
+        for event_type in ('self', 'work', 'work'):
+            Event.objects.create(event_title='Busy', event_date=date(2026, 3, 2), event_creator=self.owner,
+                                 event_type=event_type)
+        Event.objects.create(event_title='Run', event_date=date(2026, 2, 23), event_creator=self.owner,
+                             event_type='self', recurrence_frequency='weekly', recurrence_exceptions=['2026-03-09'])
+        Event.objects.create(event_title='Once', event_date=date(2026, 3, 4), event_creator=self.owner,
+                             event_type='friends', recurrence_frequency='daily', recurrence_until=date(2026, 3, 4))
+        theirs = Event.objects.create(event_title='Party', event_date=date(2026, 3, 4), event_creator=self.friend,
+                                      event_type='friends')
+        Event.objects.create(event_title='Not mine', event_date=date(2026, 3, 3), event_creator=self.friend,
+                             event_type='work')
+        EventCollaborator.objects.create(event=theirs, collaborator=self.owner)
+        # a one day series whose day is excepted never happens
+        Event.objects.create(event_title='Cancelled', event_date=date(2026, 3, 5), event_creator=self.owner,
+                             event_type='work', recurrence_frequency='daily', recurrence_until=date(2026, 3, 5),
+                             recurrence_exceptions=['2026-03-05'])
+
+        query = "?start=2026-03-01&end=2026-03-20"
+        # one grouped query for the single events, one for the series
+        with self.assertNumQueries(2):
+            daily_counts(self.owner, date(2026, 3, 1), date(2026, 3, 20))
+        days = self.client.get(reverse('event_density') + query).json()['days']
+        self.assertEqual(days, [
+            {'date': '2026-03-02', 'total': 4, 'self': 2, 'friends': 0, 'work': 2},
+            {'date': '2026-03-04', 'total': 2, 'self': 0, 'friends': 2, 'work': 0},
+            {'date': '2026-03-16', 'total': 1, 'self': 1, 'friends': 0, 'work': 0},
+        ])
+        # the same days and totals as the feed
+        feed = streamed_json(self.client.get(reverse('events_json') + query))
+        self.assertEqual(sorted(item['start'][:10] for item in feed),
+                         [day['date'] for day in days for _ in range(day['total'])])
+        self.assertEqual(self.client.get(reverse('event_density') + "?start=2020-01-01&end=2030-01-01").status_code, 400)
+
+    def test_etag_covers_the_default_range(self):
+        url = reverse('event_density')
+        today = date.today()
+        bare = self.client.get(url)
+        explicit = self.client.get(url, {'start': today.isoformat(), 'end': (today + timedelta(days=365)).isoformat()})
+        self.assertEqual(bare['ETag'], explicit['ETag'])
+        # yesterday's etag doesn't match today's range
+        yesterday = self.client.get(url, {'start': (today - timedelta(days=1)).isoformat()})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=yesterday['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=bare['ETag']).status_code, 304)
+
+
+class BulkInviteTests(TestCase):
+    ''' the bulk invite endpoint sends each invite once and only takes lists of ids'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.event = Event.objects.create(event_title='Picnic', event_date=date(2026, 5, 1),
+                                          event_creator=self.owner, event_type='friends')
+        self.client.force_login(self.owner.user)
+
+    def test_invitees_must_be_a_list(self):
+        friends = [make_profile(f'friend{i}') for i in range(3)]
+        url = reverse('bulk_event_invite', args=[self.event.pk])
+        digits = ''.join(str(friend.pk) for friend in friends)
+        response = self.client.post(url, {'invitees': digits}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EventInvite.objects.exists())
+        response = self.client.post(url, {'invitees': [friend.pk for friend in friends]}, content_type='application/json')
+        self.assertEqual([result['outcome'] for result in response.json()['results']], ['sent'] * 3)
+
+
+class RecurrenceTests(SimpleTestCase):
+    ''' the occurrence dates of the recurrence rules, clipped to the window (end exclusive)'''
+
+    def setUp(self):
+        recurrence.clear_cache()
+
+    def dates(self, event_date, frequency, window_start=None, window_end=None,
+              interval=1, until=None, count=None, exceptions=()):
+        return recurrence.rule_dates(event_date, frequency, interval, until, count, list(exceptions),
+                                     window_start, window_end)
+
+    def test_single_event(self):
+        day = date(2026, 3, 2)
+        self.assertEqual(self.dates(day, '', date(2026, 3, 1), date(2026, 3, 2)), ())
+        self.assertEqual(self.dates(day, '', date(2026, 3, 2), date(2026, 3, 3)), (day,))
+        event = Event(event_date=day)
+        self.assertEqual(recurrence.occurrence_dates(event, date(2026, 3, 1), date(2026, 4, 1)), (day,))
+
+    def test_interval_and_window(self):
+        start = date(2026, 1, 1)
+        self.assertEqual(self.dates(start, 'daily', date(2026, 1, 4), date(2026, 1, 10), interval=2),
+                         (date(2026, 1, 5), date(2026, 1, 7), date(2026, 1, 9)))
+        self.assertEqual(self.dates(start, 'daily', date(2026, 1, 4), date(2026, 1, 9), interval=2),
+                         (date(2026, 1, 5), date(2026, 1, 7)))
+        self.assertEqual(self.dates(start, 'weekly', date(2026, 1, 2), date(2026, 2, 1), interval=2),
+                         (date(2026, 1, 15), date(2026, 1, 29)))
+        # a series that never ends stops at the default horizon when no window end is given
+        self.assertEqual(len(self.dates(start, 'daily')), recurrence.DEFAULT_HORIZON.days)
+
+    def test_count_until_and_exceptions(self):
+        start, end = date(2026, 3, 2), date(2027, 1, 1)
+        self.assertEqual(self.dates(start, 'weekly', start, end, count=3),
+                         (date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)))
+        # count is from the start of the series, not the window
+        self.assertEqual(self.dates(start, 'weekly', date(2026, 3, 10), end, count=3), (date(2026, 3, 16),))
+        # whichever of until and count ends the series first wins
+        self.assertEqual(self.dates(start, 'weekly', start, end, count=3, until=date(2026, 3, 10)),
+                         (date(2026, 3, 2), date(2026, 3, 9)))
+        self.assertEqual(self.dates(start, 'weekly', start, end, count=2, until=date(2026, 12, 31)),
+                         (date(2026, 3, 2), date(2026, 3, 9)))
+        # an exception is skipped but still used up one of the count
+        self.assertEqual(self.dates(start, 'weekly', start, end, count=3, exceptions=['2026-03-09']),
+                         (date(2026, 3, 2), date(2026, 3, 16)))
+
+    def test_monthly_end_of_month(self):
+        # months without the day are skipped and don't count
+        self.assertEqual(self.dates(date(2026, 1, 31), 'monthly', date(2026, 1, 1), date(2027, 1, 1),
+                                    until=date(2026, 8, 31)),
+                         (date(2026, 1, 31), date(2026, 3, 31), date(2026, 5, 31), date(2026, 7, 31), date(2026, 8, 31)))
+        self.assertEqual(self.dates(date(2026, 1, 31), 'monthly', date(2026, 4, 1), date(2026, 8, 1)),
+                         (date(2026, 5, 31), date(2026, 7, 31)))
+        self.assertEqual(self.dates(date(2026, 1, 29), 'monthly', date(2026, 1, 1), date(2027, 1, 1), count=3),
+                         (date(2026, 1, 29), date(2026, 3, 29), date(2026, 4, 29)))
+        self.assertEqual(self.dates(date(2028, 1, 29), 'monthly', date(2028, 1, 1), date(2029, 1, 1), count=3),
+                         (date(2028, 1, 29), date(2028, 2, 29), date(2028, 3, 29)))
+        self.assertEqual(self.dates(date(2026, 1, 30), 'monthly', date(2026, 1, 1), date(2027, 1, 1),
+                                    interval=12, count=2),
+                         (date(2026, 1, 30),))
+
+
+class FreeBusyTests(TestCase):
+    ''' busy lookups, conflicts and common free time of a few profiles'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.friend = make_profile('friend')
+        self.day = date(2026, 3, 2)
+
+    def event(self, creator, title, start, end, **kwargs):
+        return Event.objects.create(event_title=title, event_date=kwargs.pop('event_date', self.day),
+                                    event_start_time=time(*start), event_end_time=time(*end),
+                                    event_creator=creator, event_type='work', **kwargs)
+
+    def at(self, hour, minute=0, day=None):
+        return datetime.combine(day or self.day, time(hour, minute))
+
+    def test_busy_index(self):
+        late = (self.at(23, day=self.day - timedelta(days=1)), self.at(0, 30), 1, 'late')
+        index = BusyIndex([(self.at(11), self.at(12), 3, 'c'), (self.at(9), self.at(10), 2, 'b'), late,
+                           (self.at(9, 30), self.at(10, 30), 4, 'd')])
+        # an interval from the day before still overlaps the start of this one
+        self.assertEqual(index.overlapping(self.at(0), self.at(1)), [late])
+        self.assertEqual([pk for _, _, pk, _ in index.overlapping(self.at(10), self.at(11, 30))], [4, 3])
+        # end exclusive, back to back isn't an overlap
+        self.assertTrue(index.is_free(self.at(10, 30), self.at(11)))
+        self.assertEqual(index.merged(), [late[:2], (self.at(9), self.at(10, 30)), (self.at(11), self.at(12))])
+
+    def test_common_free_slots(self):
+        self.event(self.owner, 'Standup', (9, 0), (10, 0))
+        lunch = self.event(self.friend, 'Lunch', (12, 0), (13, 0))
+        EventCollaborator.objects.create(event=lunch, collaborator=self.friend)
+        self.event(make_profile('stranger'), 'Not ours', (15, 0), (16, 0))
+        self.event(self.friend, 'Gym', (18, 0), (18, 20), event_date=self.day - timedelta(days=7),
+                   recurrence_frequency='weekly')
+
+        slots = common_free_slots({self.owner.pk, self.friend.pk}, self.day, self.day + timedelta(days=1))
+        self.assertEqual(slots, [(self.at(8), self.at(9)), (self.at(10), self.at(12)),
+                                 (self.at(13), self.at(18)), (self.at(18, 20), self.at(20))])
+        # the 20 free minutes before 8:40 are too short for an hour
+        slots = common_free_slots({self.owner.pk}, self.day, self.day + timedelta(days=1), timedelta(hours=1),
+                                  time(8, 40), time(12))
+        self.assertEqual(slots, [(self.at(10), self.at(12))])
+
+    def test_find_conflicts(self):
+        meeting = self.event(self.owner, 'Meeting', (9, 0), (11, 0))
+        call = self.event(self.friend, 'Call', (10, 0), (12, 0))
+        self.event(self.owner, 'Coffee', (11, 0), (11, 30))  # starts when the meeting ends
+        weekly = self.event(self.owner, 'Review', (10, 30), (10, 45), event_date=self.day - timedelta(days=7),
+                            recurrence_frequency='weekly')
+
+        conflicts = find_conflicts(meeting, {self.owner.pk, self.friend.pk})
+        self.assertEqual(sorted(conflicts), sorted([(self.friend.pk, self.day, call.pk, 'Call'),
+                                                    (self.owner.pk, self.day, weekly.pk, 'Review')]))
+
+    def test_free_slots_view_rejects_huge_lengths(self):
+        self.client.force_login(self.owner.user)
+        response = self.client.get(reverse('free_slots'), {'min_minutes': 10 ** 13})
+        self.assertEqual(response.status_code, 400)
+
+
+ICS_FILE = """BEGIN:VCALENDAR\r
+BEGIN:VEVENT\r
+UID:standup@example.com\r
+DTSTART:20260302T090000\r
+DTEND:20260302T093000\r
+SUMMARY:Stand\\, up folded o\r
+ nto two lines\r
+CATEGORIES:Work\r
+RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=3\r
+EXDATE:20260316T090000\r
+BEGIN:VALARM\r
+SUMMARY:not the event\r
+END:VALARM\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:holiday@example.com\r
+DTSTART;VALUE=DATE:20260704\r
+SUMMARY:Holiday\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:holiday@example.com\r
+DTSTART;VALUE=DATE:20260704\r
+SUMMARY:Holiday again\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:broken@example.com\r
+SUMMARY:No start\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+def ics_lines(text):
+    ''' an uploaded .ics file as the importer reads it'''
+    return io.TextIOWrapper(io.BytesIO(text.encode() if isinstance(text, str) else text), encoding='utf-8', newline='')
+
+
+class IcsImportTests(TestCase):
+    ''' .ics files become events once, however often (or however concurrently) they are imported'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+
+    def test_parse_and_reimport(self):
+        result = import_events(ics_lines(ICS_FILE), self.owner)
+        self.assertEqual((result['imported'], result['duplicates'], result['skipped']), (2, 1, 1))
+        self.assertEqual(result['errors'], ['event 4: no DTSTART'])
+        standup = Event.objects.get(external_uid='standup@example.com')
+        self.assertEqual(standup.event_title, 'Stand, up folded onto two lines')
+        self.assertEqual((standup.event_type, standup.event_start_time, standup.event_end_time),
+                         ('work', time(9), time(9, 30)))
+        self.assertEqual(standup.occurrences_between(date(2026, 3, 1), date(2026, 5, 1)),
+                         (date(2026, 3, 2), date(2026, 3, 30)))
+        holiday = Event.objects.get(external_uid='holiday@example.com')
+        self.assertEqual((holiday.event_title, holiday.event_date, holiday.event_start_time),
+                         ('Holiday', date(2026, 7, 4), None))
+        self.assertEqual(EventMembership.objects.filter(profile=self.owner).count(), 2)
+
+        result = import_events(ics_lines(ICS_FILE), self.owner)
+        self.assertEqual((result['imported'], result['duplicates']), (0, 3))
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_racing_import(self):
+        # another import saves the holiday after this one looked its UIDs up
+        Event.objects.create(event_title='Holiday', event_date=date(2026, 7, 4), event_creator=self.owner,
+                             event_type='self', external_uid='holiday@example.com')
+        lookup, looked = Event.objects.filter, []
+
+        def stale_first_lookup(*args, **kwargs):
+            looked.append(kwargs)
+            return Event.objects.none() if len(looked) == 1 else lookup(*args, **kwargs)
+
+        with mock.patch.object(Event.objects, 'filter', side_effect=stale_first_lookup):
+            result = import_events(ics_lines(ICS_FILE), self.owner)
+        self.assertEqual((result['imported'], result['duplicates']), (1, 2))
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_not_utf8_part_way(self):
+        events = ''.join(f'BEGIN:VEVENT\r\nUID:{n}\r\nDTSTART;VALUE=DATE:20260101\r\nSUMMARY:Day {n}\r\nEND:VEVENT\r\n'
+                         for n in range(200))
+        data = events.encode() + b'BEGIN:VEVENT\r\nSUMMARY:\xff\r\nEND:VEVENT\r\n'
+        result = import_events(ics_lines(data), self.owner, batch_size=10)
+        # the batches before the undecodable part were saved, and are reported
+        self.assertEqual(result['error'], NOT_UTF8)
+        self.assertEqual(result['imported'], Event.objects.count())
+        self.assertGreater(result['imported'], 0)
+
+        self.client.force_login(self.owner.user)
+        response = self.client.post(reverse('import_calendar'), {'file': SimpleUploadedFile('bad.ics', b'\xff\xfe')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['imported'], 0)
+
+
+WORKLOG_CSV = """date,start_time,end_time,duration,category,description
+2026-03-02,22:00,01:30,,DEV,"late night, with a comma"
+2026-03-03,,,2.5,BIZ,taxes
+2026-03-04,,,1,XYZ,unknown category
+not-a-date,,,1,DEV,bad date
+"""
+
+
+class WorkLogImportExportTests(TestCase):
+    ''' work logs survive a CSV and an NDJSON round trip, bad rows are skipped and reported'''
+
+    def export(self, fmt):
+        return ''.join(export_worklogs(fmt))
+
+    def test_round_trip(self):
+        result = import_worklogs(read_rows(io.StringIO(WORKLOG_CSV, newline=''), 'csv'), skip_errors=True)
+        self.assertEqual((result['imported'], result['skipped']), (2, 2))
+        self.assertEqual(result['errors'][0], "record 3: unknown category 'XYZ'")
+        exported = self.export('csv')
+        self.assertEqual(exported.splitlines(), [
+            'date,start_time,end_time,duration,category,description',
+            '2026-03-02,22:00:00,01:30:00,3.5,DEV,"late night, with a comma"',
+            '2026-03-03,,,2.5,BIZ,taxes',
+        ])
+        with self.assertRaises(ValueError):
+            import_worklogs(read_rows(io.StringIO(WORKLOG_CSV, newline=''), 'csv'))
+
+        ndjson = self.export('ndjson')
+        WorkLog.objects.all().delete()
+        result = import_worklogs(read_rows(io.StringIO(ndjson + 'not json\n'), 'ndjson'), skip_errors=True)
+        self.assertEqual((result['imported'], result['errors']), (2, ['record 3: line 3 is not valid JSON']))
+        self.assertEqual(self.export('csv'), exported)
+
+    def test_bad_durations(self):
+        bad = ['Infinity', 'NaN', '-1', '12345']
+        records = [{'date': '2026-03-02', 'category': 'DEV', 'duration': value} for value in bad + ['999.9']]
+        result = import_worklogs(records, skip_errors=True)
+        self.assertEqual((result['imported'], result['skipped']), (1, 4))
+        self.assertEqual(list(WorkLog.objects.values_list('duration', flat=True)), [Decimal('999.9')])
+        for value in bad:
+            with self.assertRaises(ValueError):
+                import_worklogs([{'date': '2026-03-02', 'category': 'DEV', 'duration': value}])
+        self.assertEqual(WorkLog.objects.count(), 1)
+
+    def test_not_utf8_part_way(self):
+        user = make_profile('clerk').user
+        user.user_permissions.add(Permission.objects.get(codename='add_worklog'))
+        self.client.force_login(user)
+        rows = ''.join(f'2026-03-02,,,1,DEV,row {n}\n' for n in range(1500))
+        data = ('date,start_time,end_time,duration,category,description\n' + rows).encode() + b'2026-03-02,,,1,DEV,\xff\n'
+        response = self.client.post(reverse('worklog_import'), {'file': SimpleUploadedFile('logs.csv', data)})
+        # the first chunk was saved before the undecodable part, and is reported with the error
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['imported'], WorkLog.objects.count())
+        self.assertEqual(WorkLog.objects.count(), 1000)
+
+
+class WorkLogRollupTests(TestCase):
+    ''' the rollups kept up to date log by log are the same as rebuilding them from scratch'''
+
+    def rollups(self):
+        rows = WorkLogRollup.objects.values_list('period', 'period_start', 'category', 'total_duration', 'entry_count')
+        # emptied buckets stay behind with nothing in them, a rebuild doesn't write them
+        self.assertFalse([row for row in rows if row[4] == 0 and row[3] != 0])
+        return sorted(row for row in rows if row[4])
+
+    def test_maintained_equals_rebuild(self):
+        def log(day, category, **kwargs):
+            work_log = WorkLog(date=day, category=category, description='', **kwargs)
+            work_log.save()
+            return work_log
+
+        coding = log(date(2026, 3, 2), 'DEV', start_time=time(22), end_time=time(1, 30))
+        admin = log(date(2026, 3, 2), 'BIZ', duration=2)
+        moved = log(date(2026, 3, 31), 'LRN', duration=1.5)
+        gone = log(date(2026, 3, 3), 'DES', duration=4)
+        import_worklogs([{'date': '2026-03-03', 'category': 'DEV', 'duration': '0.5'}] * 3)
+
+        # edits: the category, the date (into another week and month), the hours
+        admin.category = 'DEV'
+        admin.save()
+        moved = WorkLog.objects.get(pk=moved.pk)
+        moved.date = date(2026, 4, 6)
+        moved.save()
+        coding.end_time = time(23)
+        coding.save()
+        admin.save()  # nothing changed
+        gone.delete()
+        WorkLog.objects.filter(duration=Decimal('0.5')).first().delete()
+
+        maintained = self.rollups()
+        self.assertIn(('month', date(2026, 4, 1), 'LRN', Decimal('1.5'), 1), maintained)
+        rebuild_rollups()
+        self.assertEqual(maintained, self.rollups())
+
+
+class SearchTests(TestCase):
+    ''' search over your own events and posts, kept in step with them by the signals'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.event = Event.objects.create(event_title='Hiking trip', event_date=date(2026, 5, 1),
+                                          event_creator=self.owner, event_type='friends',
+                                          event_description='bring water')
+        self.post = EventPost.objects.create(event=self.event, post_author=self.owner,
+                                             post_text_content='the trailhead is north')
+        Event.objects.create(event_title='Hiking secret', event_date=date(2026, 5, 2),
+                             event_creator=make_profile('stranger'), event_type='self')
+
+    def found(self, text):
+        return sorted((result['kind'], result['id']) for result in search.search(self.owner, text))
+
+    def test_only_your_events_with_prefixes(self):
+        self.assertEqual(self.found('hik'), [('event', self.event.pk)])
+        self.assertEqual(self.found('trail'), [('post', self.post.pk)])
+        self.assertEqual(self.found('hiking water'), [('event', self.event.pk)])
+        self.assertEqual(self.found('secret'), [])
+        # quotes and operators are words or nothing, never FTS syntax
+        for text in ('"', 'AND OR NOT', 'NEAR(', '*'):
+            self.assertEqual(search.search(self.owner, text), [])
+        self.assertEqual(self.found('"hik'), [('event', self.event.pk)])
+        self.client.force_login(self.owner.user)
+        response = self.client.get(reverse('search'), {'q': 'hik'})
+        self.assertEqual(response.json()['results'][0]['url'], reverse('event_details', args=[self.event.pk]))
+
+    def test_edits_and_deletes_update_the_index(self):
+        self.event.event_title = 'Kayaking trip'
+        self.event.save()
+        self.assertEqual(self.found('hiking'), [])
+        self.assertEqual(self.found('kayak'), [('event', self.event.pk)])
+        self.post.post_text_content = 'meet at the dock'
+        self.post.save()
+        self.assertEqual(self.found('dock'), [('post', self.post.pk)])
+        self.post.delete()
+        self.assertEqual(self.found('dock'), [])
+        self.event.delete()
+        self.assertEqual(self.found('kayak'), [])
+
+    def test_scan_without_fts(self):
+        with mock.patch('MyLife.search.is_available', return_value=False):
+            self.assertEqual(self.found('hiking WATER'), [('event', self.event.pk)])
+            self.assertEqual(self.found('secret'), [])
+            self.assertEqual(search.search(self.owner, '"'), [])
+
+
+class PostFeedPaginationTests(TestCase):
+    ''' the keyset pages of an event feed cover every post exactly once, even with equal timestamps'''
+
+    def setUp(self):
+        self.owner = make_profile('owner')
+        self.event = Event.objects.create(event_title='Trip', event_date=date(2026, 5, 1),
+                                          event_creator=self.owner, event_type='friends')
+        posts = [EventPost.objects.create(event=self.event, post_author=self.owner, post_text_content=f'post {i}')
+                 for i in range(7)]
+        # two groups of posts made at the very same moment
+        first, second = posts[0].timestamp, posts[0].timestamp + timedelta(seconds=1)
+        EventPost.objects.filter(pk__in=[post.pk for post in posts[:3]]).update(timestamp=first)
+        EventPost.objects.filter(pk__in=[post.pk for post in posts[3:]]).update(timestamp=second)
+        self.newest_first = [post.pk for post in reversed(posts)]
+
+    def test_every_page(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            posts, cursor = EventPost.objects.feed_page(self.event, cursor=cursor, page_size=2)
+            seen += [post.pk for post in posts]
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.newest_first)
+        self.assertEqual(pages, 4)
+
+    def test_feed_view(self):
+        self.client.force_login(self.owner.user)
+        url, pages = reverse('event_post_feed', args=[self.event.pk]), []
+        with mock.patch('MyLife.views.POSTS_PAGE_SIZE', 3):
+            while url:
+                page = self.client.get(url).json()
+                pages.append(page)
+                url = page['next']
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[-1]['next'])
+        self.assertIn('post 0', pages[-1]['html'])
+        for cursor in ('garbage!!', 'bm90IGEgY3Vyc29y', 'eHx5', '%%%'):
+            response = self.client.get(reverse('event_post_feed', args=[self.event.pk]), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MYLIFE_RENDITION_WORKERS=0)
+class RenditionTests(TestCase):
+    ''' uploads get resized copies without their EXIF, a broken upload is marked failed'''
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.owner = make_profile('owner')
+        event = Event.objects.create(event_title='Trip', event_date=date(2026, 5, 1), event_creator=self.owner,
+                                     event_type='friends')
+        self.post = EventPost.objects.create(event=event, post_author=self.owner, post_text_content='photos')
+
+    def upload(self, name, data):
+        ''' save a media row and run the renditions it queues'''
+        with self.captureOnCommitCallbacks(execute=True):
+            media = EventPostMedia.objects.create(post=self.post, post_media=SimpleUploadedFile(name, data))
+        return EventPostMedia.objects.get(pk=media.pk)
+
+    @staticmethod
+    def jpeg(size):
+        ''' a jpeg with a camera make and gps position in its EXIF'''
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera' # make
+        exif[0x8825] = {1: 'N', 2: (42.0, 21.0, 0.0)} # gps
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return buffer.getvalue()
+
+    def test_ready_without_exif(self):
+        media = self.upload('big.jpg', self.jpeg((1000, 500)))
+        self.assertTrue(Image.open(media.post_media.path).getexif())
+        self.assertEqual(media.renditions_status, 'ready')
+        renditions = {rendition.size: rendition for rendition in media.renditions.all()}
+        self.assertEqual({size: (r.width, r.height) for size, r in renditions.items()},
+                         {'small': (320, 160), 'medium': (800, 400), 'large': (1000, 500)})
+        for rendition in renditions.values():
+            with Image.open(rendition.image.path) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertFalse(image.getexif())
+        self.assertEqual(media.display_url(), renditions['medium'].image.url)
+        self.assertEqual(media.srcset(), ', '.join(f"{renditions[size].image.url} {renditions[size].width}w"
+                                                   for size in ('small', 'medium', 'large')))
+
+    def test_small_image_lists_each_width_once(self):
+        media = self.upload('small.jpg', self.jpeg((200, 100)))
+        self.assertEqual(media.renditions.count(), 3)
+        self.assertRegex(media.srcset(), r'^\S+ 200w$')
+
+    def test_broken_upload_fails(self):
+        with self.assertLogs('MyLife.renditions', 'ERROR'):
+            media = self.upload('broken.jpg', b'not an image')
+        self.assertEqual(media.renditions_status, 'failed')
+        self.assertFalse(media.renditions.exists())
+        self.assertEqual(media.srcset(), '')
+        self.assertEqual(media.display_url(), media.post_media.url)
+
+
+class ProfileMiddlewareTests(TestCase):
+    ''' request.profile is looked up once however often the view and template use it'''
+
+    def setUp(self):
+        # the profile page caches sections keyed on request.profile, render them for real
+        fragment_cache().clear()
+        self.owner = make_profile('owner')
+
+    def test_one_lookup_per_request(self):
+        self.client.force_login(self.owner.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('show_profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.profile.pk, self.owner.pk)
+        lookups = [query['sql'] for query in queries
+                   if query['sql'].startswith('SELECT') and 'FROM "MyLife_profile" WHERE "MyLife_profile"."user_id"' in query['sql']]
+        self.assertEqual(len(lookups), 1, lookups)
+
+    def test_anonymous(self):
+        request = self.client.get(reverse('base')).wsgi_request
+        self.assertFalse(request.profile)
+        self.assertIsNone(get_request_profile(request))
+        self.assertIsNone(request._cached_profile)
@@ -5,12 +5,23 @@ from django.urls import path
 from django.contrib.auth import views as auth_views 
 from .views import * # import everything from views
 from . import views # For calendar
+from django.conf import settings
+from . import async_views
+
+# under ASGI the hot read views can be served by their native async versions (see async_views.py)
+if settings.MYLIFE_ASYNC_VIEWS:
+    dashboard_view = async_views.AsyncUserDashboardView
+    event_details_view = async_views.AsyncShowEventDetailsView
+    events_json_view = async_views.AsyncEventJsonFeedView
+else:
+    dashboard_view, event_details_view, events_json_view = ShowUserDashboardView, ShowEventDetailsView, views.EventJsonFeedView
+
 urlpatterns = [
     # map the URL (empty string) to the view
     
     path('', BaseView.as_view(), name='base'), # base view
     path('home', HomeView.as_view(), name='home'), #home view
-    path('dashboard/', ShowUserDashboardView.as_view(), name='user_dashboard'), # user dashboard showing upcoming events and invites
+    path('dashboard/', dashboard_view.as_view(), name='user_dashboard'), # user dashboard showing upcoming events and invites
     # Event and profile views
     path('events/new/', CreateEventView.as_view(), name='create_event'), # event creation form
     path('events/<int:pk>/edit/', UpdateEventView.as_view(), name='update_event'), # event update form
@@ -26,17 +37,34 @@ urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='register'), ## Show the Registration view
 
     # event-detail page
-    path('events/<int:pk>/', ShowEventDetailsView.as_view(), name='event_details'), #shows all event details
+    path('events/<int:pk>/', event_details_view.as_view(), name='event_details'), #shows all event details
     path('events/<int:event_pk>/posts/',CreateEventPostView.as_view(),name='event_posts',), # view for creating a post on a given event by its event pk
+    path('events/<int:pk>/posts/feed/',EventPostFeedView.as_view(),name='event_post_feed'), # json pages of an event feed for infinite scroll
     # MyLife/urls.py
     path('calendar/',views.CalendarView.as_view(), name='calendar'), # page that shows the calendar, # fullcalendar integration
-    path('api/events/',views.EventJsonFeedView.as_view(), name='events_json'), # the json feed that fullcalendar queries
+    path('api/events/',events_json_view.as_view(), name='events_json'), # the json feed that fullcalendar queries
+    path('calendar/<str:token>.ics',CalendarSubscriptionView.as_view(), name='calendar_subscription'), # ics feed other calendar apps subscribe to
+    path('api/events/density/',EventDensityView.as_view(), name='event_density'), # events per day and type, for the year view and heatmap
+    path('api/search/',SearchView.as_view(), name='search'), # ranked search over your events and posts
+    path('api/freebusy/slots/',FreeSlotsView.as_view(), name='free_slots'), # common free time with collaborators
+    path('api/live/',async_views.LiveUpdatesView.as_view(), name='live_updates'), # server-sent events of invites and new posts (ASGI only)
+    path('calendar/import/',ImportCalendarView.as_view(), name='import_calendar'), # upload an .ics file of events
+    path('calendar/reset-link/',ResetCalendarTokenView.as_view(), name='reset_calendar_token'), # make a new subscription url
 
     path('profile/<int:pk>/invite/', send_collab_invite, name='send_collab_invite'), # path for when sending a collaborator invite
     path('collab/<int:cid>/respond/<str:decision>/',respond_collab_invite,name='respond_collab_invite'), # path for when responding to a collaborator invite
 
     # event-invite
     path('events/<int:pk>/invite/',InviteEventCollaboratorView.as_view(),name='send_event_invite',),# path for when sending an event invite
+    path('events/<int:pk>/invite/bulk/',BulkInviteEventCollaboratorsView.as_view(),name='bulk_event_invite'), # json endpoint for inviting many people at once
     path('eventinvite/<int:iid>/respond/<str:decision>/',respond_event_invite,name='respond_event_invite'), # path for when responding to an event invite
+    path('invites/respond/',RespondToInvitesView.as_view(),name='respond_invites'), # json endpoint for accepting/rejecting many invites at once
+
+    # work log reports
+    path('api/worklog/rollups/',WorkLogRollupReportView.as_view(),name='worklog_rollups'), # hours per category per day/week/month
+    path('worklog/import/',WorkLogImportView.as_view(),name='worklog_import'), # upload a csv/ndjson file of work logs
+    path('api/worklog/export/',WorkLogExportView.as_view(),name='worklog_export'), # stream every work log as csv/ndjson
+
+    path('metrics',metrics_view,name='metrics'), # prometheus scrape endpoint
     
 ]
\ No newline at end of file
@@ -1,23 +1,52 @@
 # Imports
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.views.generic import *
 from .models import *
 from .forms import *
 from django.urls import reverse, reverse_lazy
 
-from django.contrib.auth.mixins import LoginRequiredMixin ## for requiring user to be logged in
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin ## for requiring user to be logged in
 from django.views.generic import TemplateView # For logout confirmation redirect page
 from django.contrib.auth.forms import UserCreationForm ## 
 from django.contrib.auth.models import User ## 
 from django.contrib.auth import login # 
 from django.views.generic.base import ContextMixin, View
 
-from datetime import datetime, time  # new
+from datetime import date, datetime, time, timedelta  # new
 from django.views.generic import TemplateView, View   # new
-from django.http import HttpResponseForbidden, JsonResponse  # new
+from django.http import Http404, HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse  # new
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+import hashlib
+import hmac
+from urllib.parse import urlencode
+from itertools import islice
+import io
+import json
 
 from django.contrib import messages 
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from . import ics, recurrence
+from .ics_import import import_events
+from .dashboard import build_dashboard_snapshot
+from .search import search as search_events
+from .metrics import registry as metrics_registry
+from .db import replica_reads
+from .freebusy import common_free_slots, describe_conflicts, find_conflicts
+from .density import daily_counts
+from .invites import DECISIONS, settle_collaborator_invites, settle_event_invites
+from .collaborators import collaborator_ids, list_collaborators
+from .worklog_rollups import hours_report
+from .worklog_io import FORMATS as WORKLOG_FORMATS, export_worklogs, guess_format, import_worklogs, read_rows
+
 # File: views.py
 # Author: Si Yeon Cho (seancho@bu.edu)
 # Description: defines the views that my project will use
@@ -30,29 +59,14 @@ class BaseView(TemplateView):
         '''Return the dictionary of context variables for use in the template.'''
         # get the default context
         context = super().get_context_data(**kwargs)
-        # if the user is logged in, add their Profile object
-        user = self.request.user
-        if user.is_authenticated:
-            # check whether the user already has a profile
-            has_profile = Profile.objects.filter(user=user).exists()
-            context['has_profile'] = has_profile  # for nav logic
-            # only fetch and inject the profile if it truly exists
-            if has_profile:
-                context['profile'] = Profile.objects.get(user=user)
+        # if the user is logged in and has a Profile, add it (has_profile comes from the context processor)
+        if self.request.profile:
+            context['profile'] = self.request.profile
         return context
     
 class HomeView(TemplateView):
-    template_name = 'MyLife/home.html'
-
-    def get_context_data(self, **kwargs):
-        '''Return the dictionary of context variables for use in the template.'''
-        context = super().get_context_data(**kwargs) # default context
-        user = self.request.user
-        context['has_profile'] = (
-            user.is_authenticated
-            and Profile.objects.filter(user=user).exists()
-        )
-        return context
+    template_name = 'MyLife/home.html' # has_profile comes from the context processor
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
 class ShowUserDashboardView(TemplateView):
     '''Show a user's dashboard'''
     model = Profile # retrieve objects of type Profile from the database
@@ -60,61 +74,19 @@ class ShowUserDashboardView(TemplateView):
     context_object_name = 'profile' # how to find the data in the template file
     
     def get_object(self, queryset=None):
-    # always fetch the profile for the logged-in user
-        return Profile.objects.get(user=self.request.user)
+    # always the profile for the logged-in user
+        return self.request.profile
     def get_context_data(self, **kwargs):
         '''Return the dictionary of context variables for use in the template.'''
         context = super().get_context_data(**kwargs) # call superclass
 
-        # try to fetch the logged-in user’s profile
-        try:
-            profile = Profile.objects.get(user=self.request.user)
-            has_profile = True
-        except Profile.DoesNotExist:
-            profile = None
-            has_profile = False
-
-        context['has_profile'] = has_profile
+        # the logged-in user’s profile, loaded once for the whole request (None if there isn't one)
+        profile = self.request.profile or None
         context['profile']= profile
 
-        if has_profile:
-            # === your original DetailView logic, verbatim ===
-
-            # Events created by the user
-            created_events = Event.objects.filter(event_creator=profile)
-            # Events where the user is a collaborator
-            event_collaborator = EventCollaborator.objects.filter(collaborator=profile)
-            events = [ec.event for ec in event_collaborator]
-            # Combine
-            all_events = list(created_events) + events
-
-            # Pending event invites
-            pending_event_invites_received = EventInvite.objects.filter(
-                invitee=profile, invite_status='pending')
-            pending_event_invites_sent = EventInvite.objects.filter(
-                inviter=profile, invite_status='pending')
-
-            # Accepted collaborators
-            sent_accepted = Collaborator.objects.filter(
-                inviter=profile, invite_status='accepted')
-            received_accepted = Collaborator.objects.filter(
-                invitee=profile, invite_status='accepted')
-            accepted_collaborators = list(sent_accepted) + list(received_accepted)
-            # Pending collaborators
-            pending_collab_invites_sent = Collaborator.objects.filter(
-                inviter=profile, invite_status='pending')
-            # Pending invites received
-            pending_collab_invites_received = Collaborator.objects.filter(
-                invitee=profile, invite_status='pending')
-
-            context['events'] = all_events
-            context['pending_event_invites_received'] = pending_event_invites_received
-            context['pending_event_invites_sent'] = pending_event_invites_sent
-            context['collaborators']= accepted_collaborators
-            context['pending_collab_invites_sent']= pending_collab_invites_sent
-            context['pending_collab_invites_received']= pending_collab_invites_received
-
-            # === end of your old code ===
+        if profile:
+            # events, invites and collaborators in a fixed number of queries
+            context.update(build_dashboard_snapshot(profile))
 
         return context
     
@@ -146,8 +118,7 @@ class CreateProfileView(LoginRequiredMixin, CreateView):
         # calling the superclass method
         context = super().get_context_data(**kwargs)
         # add this form into the context dictionary when needed
-        if (not self.request.user.is_authenticated 
-            or Profile.objects.filter(user=self.request.user).exists()):
+        if not self.request.user.is_authenticated or self.request.profile:
             context['create_user_form'] = UserCreationForm()
         return context
     def get_success_url(self):
@@ -162,9 +133,9 @@ class UpdateProfileView(LoginRequiredMixin, UpdateView):
     def get_login_url(self) -> str:
         return reverse('login')
 
-    def get_object(self):
+    def get_object(self, queryset=None):
         '''Return the Profile belonging to the logged-in user'''
-        return Profile.objects.get(user=self.request.user)
+        return self.request.profile
 
     def form_valid(self, form):
         ''' save updated Profile'''
@@ -175,6 +146,18 @@ class UpdateProfileView(LoginRequiredMixin, UpdateView):
     def get_success_url(self):
         return reverse('show_profile') 
 
+class MemoizedObjectMixin:
+    '''
+    For detail/update views: get_object runs its query once per request,
+    no matter how many times get/get_context_data/other mixins call it.
+    '''
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_memoized_object'):
+            self._memoized_object = super().get_object()
+        return self._memoized_object
+
 class CollaboratorContextMixin:
     """Adds `collaborators` to the context, annotated with a `rel_type` key."""
 
@@ -183,22 +166,8 @@ class CollaboratorContextMixin:
         Return a list of dicts:
         Only accepted relationships are included.
         '''
-        # Outgoing
-        sent = Collaborator.objects.filter(
-            inviter=profile, invite_status="accepted"
-        ).select_related("invitee")
-
-        # Incoming
-        received = Collaborator.objects.filter(
-            invitee=profile, invite_status="accepted"
-        ).select_related("inviter")
-
-        normalized = [
-            {"profile": coll.invitee, "rel_type": "inviter"} for coll in sent
-        ] + [
-            {"profile": coll.inviter, "rel_type": "invitee"} for coll in received
-        ]
-        return normalized
+        # one indexed lookup on the symmetric adjacency index
+        return list_collaborators(profile)
 
     def get_context_data(self, **kwargs):
         '''Return the dictionary of context variables for use in the template.'''
@@ -210,21 +179,21 @@ class CollaboratorContextMixin:
 ### Show DetailView to show one Profile:
 # MyLife/views.py
 #SHOW PROFILE PAGE VIEW:
-class ShowProfilePageView(CollaboratorContextMixin, DetailView):
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
+class ShowProfilePageView(MemoizedObjectMixin, CollaboratorContextMixin, DetailView):
     '''Show the details for one profile.'''
     model = Profile # retrieve objects of type Profile from the database
     template_name = 'MyLife/show_profile.html' # show_profile_page template
     context_object_name = 'profile' # how to find the data in the template file
     def get_object(self, queryset=None):
-        pk = self.kwargs.get("pk") # the key
-        # pick self profile or other profile
-        if pk is not None:
-            return Profile.objects.get(pk=pk)
-        # default: my own profile
-        return Profile.objects.get(user=self.request.user)
+        # default: my own profile, already loaded for this request
+        if self.kwargs.get("pk") is None:
+            return self.request.profile
+        # other profile by pk (looked up once, see MemoizedObjectMixin)
+        return super().get_object(queryset)
     def dispatch(self, request, *args, **kwargs):
         '''redirect to create if no Profile exists yet'''
-        if not Profile.objects.filter(user=request.user).exists():
+        if not request.profile:
             return redirect('create_profile')
         return super().dispatch(request, *args, **kwargs)
     def get_context_data(self, **kwargs):
@@ -233,20 +202,17 @@ class ShowProfilePageView(CollaboratorContextMixin, DetailView):
         context = super().get_context_data(**kwargs)
         profile = self.get_object()
 
-        created = Event.objects.filter(event_creator=profile)
-        collab   = EventCollaborator.objects.filter(collaborator=profile)
-        events   = list(created) + [c.event for c in collab]
-
-        # combine & deduplicate 
-        context["events"] = events
-        # nav-bar helper
-        context["has_profile"] = True
-        sent_accepted = Collaborator.objects.filter(
-            inviter=profile, invite_status='accepted')
-        received_accepted = Collaborator.objects.filter(
-            invitee=profile, invite_status='accepted')
-
-        context['collaborators'] = list(sent_accepted) + list(received_accepted)
+        # created and collaborator events, no duplicates, by date (one scan of the membership index)
+        context["events"] = Event.objects.visible_to(profile)
+        # the viewer's pending invites, cached as fragments keyed by their invites_version,
+        # these querysets only run when a fragment has to be rendered again
+        viewer = self.request.profile
+        context["pending_event_invites"] = (EventInvite.objects.filter(invitee=viewer, invite_status='pending')
+                                            .select_related('event', 'inviter'))
+        context["pending_collab_invites"] = (Collaborator.objects.filter(invitee=viewer, invite_status='pending')
+                                             .select_related('inviter'))
+        context["fragment_seconds"] = settings.MYLIFE_FRAGMENT_CACHE_SECONDS
+        # collaborators come from CollaboratorContextMixin
         return context
 class CreateEventView(LoginRequiredMixin, CreateView):
     ''' view for creating an event '''
@@ -259,13 +225,18 @@ class CreateEventView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         '''Attach the logged-in user’s Profile as creator, then save'''
         print(f'CreateEventView: form.cleaned_data={form.cleaned_data}')
-        form.instance.event_creator = Profile.objects.get(user=self.request.user)
-        return super().form_valid(form)
+        form.instance.event_creator = self.request.profile
+        response = super().form_valid(form)
+        # warn (but still create) when it clashes with something already on the calendar
+        warning = describe_conflicts(find_conflicts(self.object, [self.object.event_creator_id]))
+        if warning:
+            messages.warning(self.request, warning)
+        return response
     def get_success_url(self):
         return reverse('event_details', kwargs={'pk': self.object.pk})
 
 ### Update Event View ###
-class UpdateEventView(LoginRequiredMixin, UpdateView):
+class UpdateEventView(LoginRequiredMixin, MemoizedObjectMixin, UpdateView):
     ''' A view to handle updating an existing Event.'''
     model = Event
     form_class = UpdateEventForm
@@ -315,9 +286,62 @@ class UserRegistrationView(CreateView):
         # 3) send them to the dashboard instead of create_profile
         return redirect('user_dashboard')
     
-class ShowEventDetailsView(LoginRequiredMixin, DetailView):
+# how many posts an event feed page shows
+POSTS_PAGE_SIZE = 20
+
+def feed_page_url(event, cursor):
+    ''' url of the next feed page, or None when there is no next page'''
+    if cursor is None:
+        return None
+    return f"{reverse('event_post_feed', args=[event.pk])}?{urlencode({'cursor': cursor})}"
+
+def event_details_loaders(event):
+    '''
+    the queries of the event page's cached sections, as functions by fragment name (see fragments.py).
+    They only run when their fragment isn't cached (the async view runs the missing ones all at once)
+    '''
+    return {
+        # accepted collaborators, with the profile the template prints
+        'event_collaborators': lambda: list(event.collaborators.select_related('collaborator')),
+        # pending invites for this event
+        'event_pending_invites': lambda: list(EventInvite.objects.filter(event=event, invite_status='pending').select_related('invitee')),
+        # first page of the feed, newest first, later pages come from EventPostFeedView
+        'event_posts': lambda: EventPost.objects.select_related('post_author').prefetch_related('media__renditions').feed_page(event, page_size=POSTS_PAGE_SIZE),
+    }
+
+def event_viewer_role(event, profile):
+    ''' the profile's role on the event (creator, attendee, editor) or None, one lookup in the membership index'''
+    if not profile:
+        return None
+    return EventMembership.objects.filter(event=event, profile=profile).values_list('role', flat=True).first()
+
+def event_details_context(event, profile, role, loaded=None):
+    '''
+    the event details context. loaded has the rows of the sections that were loaded up front
+    ({fragment name: rows}), the others are lazy and only queried if the template renders their fragment
+    '''
+    loaded = loaded or {}
+    sections = {name: loaded[name] if name in loaded else SimpleLazyObject(load)
+                for name, load in event_details_loaders(event).items()}
+    posts_page = sections['event_posts']
+    # the viewer's role comes from the membership index, so it doesn't need the collaborator rows
+    is_creator = getattr(profile, 'pk', None) is not None and profile.pk == event.event_creator_id
+    return {
+        'collaborators': sections['event_collaborators'],
+        'pending_invites': sections['event_pending_invites'],
+        'posts': SimpleLazyObject(lambda: posts_page[0]),
+        'next_posts_url': SimpleLazyObject(lambda: feed_page_url(event, posts_page[1])),
+        'fragment_seconds': settings.MYLIFE_FRAGMENT_CACHE_SECONDS,
+        # helper flags for the template
+        'can_post': is_creator or role is not None,
+        'can_invite': is_creator or role in ("attendee", "editor"),
+    }
+
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
+class ShowEventDetailsView(LoginRequiredMixin, MemoizedObjectMixin, DetailView):
     '''Display the full details for a single Event object.'''
     model = Event
+    queryset = Event.objects.select_related('event_creator__user') # the template shows the creator
     template_name = 'MyLife/show_event_details.html'
     context_object_name = 'event'
 
@@ -326,20 +350,9 @@ class ShowEventDetailsView(LoginRequiredMixin, DetailView):
 
         context = super().get_context_data(**kwargs)
         event = self.get_object()
-
-        # accepted collaborators
-        context['collaborators']= event.collaborators.all()
-
-        # pending invites for this event
-        context['pending_invites'] = (EventInvite.objects.filter(event=event, invite_status='pending'))
-
-                # newest first
-        context['posts'] = event.posts.select_related('post_author').prefetch_related('media').order_by("timestamp")
-        # helper flag for the template
-        profile = self.request.user.project_profile
-        context['can_post'] = (profile == event.event_creator or event.collaborators.filter(collaborator=profile).exists())
-        context["can_invite"] = (profile == event.event_creator or event.collaborators.filter(collaborator=profile, role__in=["attendee","editor"]).exists()
-        )
+        # the sections stay lazy, a cached fragment never runs its queries
+        role = event_viewer_role(event, self.request.profile)
+        context.update(event_details_context(event, self.request.profile, role))
         return context
 class CreateEventPostView(LoginRequiredMixin, CreateView):
     '''
@@ -352,7 +365,7 @@ class CreateEventPostView(LoginRequiredMixin, CreateView):
 
     def dispatch(self, request, *args, **kwargs):
         self.event = Event.objects.get(pk=self.kwargs["event_pk"])
-        profile = request.user.project_profile  # you already have this prop
+        profile = request.profile  # you already have this prop
         allowed = (profile == self.event.event_creator or self.event.collaborators.filter(collaborator=profile).exists())
         if not allowed:
             return HttpResponseForbidden("Not allowed")
@@ -365,20 +378,21 @@ class CreateEventPostView(LoginRequiredMixin, CreateView):
         context["event"] = self.event
         context["media_formset"] = kwargs.get("media_formset",EventPostMediaFormSet())
 
-        posts = (
+        # only the newest page, never the whole history
+        posts, next_cursor = (
             EventPost.objects
-            .filter(event=self.object)
             .select_related('post_author')
-            .prefetch_related('media')# use the related name
-            .order_by('timestamp')
+            .prefetch_related('media__renditions')# use the related name
+            .feed_page(self.event, page_size=POSTS_PAGE_SIZE)
         )
         context['posts'] = posts
+        context['next_posts_url'] = feed_page_url(self.event, next_cursor)
         return context
     
 
     def form_valid(self, form):
         form.instance.event = self.event
-        form.instance.post_author = self.request.user.project_profile
+        form.instance.post_author = self.request.profile
         # we need the object before saving the formset
         response = super().form_valid(form)
 
@@ -399,6 +413,29 @@ class CreateEventPostView(LoginRequiredMixin, CreateView):
     def get_success_url(self):
         return reverse("event_details", args=[self.event.pk])
 
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
+class EventPostFeedView(LoginRequiredMixin, View):
+    '''
+    json endpoint for infinite scroll of an event feed
+    GET ?cursor=... returns {"html": rendered posts, "next": url of the next page or null}
+    '''
+    def get(self, request, pk):
+        try:
+            event = Event.objects.get(pk=pk)
+        except Event.DoesNotExist:
+            return JsonResponse({"error": "Event not found."}, status=404)
+        try:
+            posts, next_cursor = (
+                EventPost.objects
+                .select_related('post_author')
+                .prefetch_related('media__renditions')
+                .feed_page(event, cursor=request.GET.get("cursor"), page_size=POSTS_PAGE_SIZE)
+            )
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        html = render_to_string("MyLife/event_post_items.html", {"posts": posts}, request=request)
+        return JsonResponse({"html": html, "next": feed_page_url(event, next_cursor)})
+
 ### CALENDAR IMPLEMENTATION ###
 
 class CalendarView(LoginRequiredMixin, TemplateView):
@@ -409,24 +446,10 @@ class CalendarView(LoginRequiredMixin, TemplateView):
     template_name = "MyLife/calendar.html"
 
     # fetch events from events_json
+    @staticmethod
     def events_json(request):
-        # get the profile for the current user
-        profile = request.user.project_profile
-        # grab events created by user
-        created = Event.objects.filter(event_creator=profile)
-        # grab events where user is a collaborator
-        collab = EventCollaborator.objects.filter(collaborator=profile)
-        # combine both lists
-        events = list(created) + [c.event for c in collab]
-        data = []
-        for ev in events:
-            data.append({
-                "id":    ev.pk,
-                "title": ev.event_title,
-                "start": ev.event_date.isoformat(), # fullcalendar needs iso string
-                "url": reverse("event_details", args=[ev.pk]),# link back to event page
-            })
-        return JsonResponse(data, safe=False)
+        # same feed as the api/events/ endpoint, so both honor the requested window
+        return EventJsonFeedView.as_view()(request)
 
     def get_context_data(self, **kwargs):
         '''Return the dictionary of context variables for use in the template.'''
@@ -434,43 +457,368 @@ class CalendarView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs) # default context by calling superclass
         # link back to user dashboard
         context["dashboard_url"] = reverse_lazy("user_dashboard")
-        user = self.request.user
-        # flag if user has a profile
-        context["has_profile"] = (
-            user.is_authenticated
-            and Profile.objects.filter(user=user).exists()
-        )
         # get all events sorted by date and time
         events = Event.objects.ordered_by_event_time()
         context["events"] = events
 
         return context
 
+def parse_calendar_window(request):
+    '''
+    read the start/end range fullcalendar sends (?start=...&end=...)
+    returns (start_date, end_date) with end exclusive, either may be None
+    raises ValueError if a value can't be parsed
+    '''
+    window = []
+    for key in ("start", "end"):
+        raw = request.GET.get(key)
+        if not raw:
+            window.append(None)
+            continue
+        # fullcalendar sends full iso datetimes, but plain dates are fine too
+        parsed = parse_datetime(raw.replace(" ", "+")) or parse_date(raw)
+        if parsed is None:
+            raise ValueError(f"Invalid {key} value: {raw}")
+        if isinstance(parsed, datetime):
+            # an end in the middle of a day still has to include that day
+            day = parsed.date()
+            if key == "end" and parsed.time() != time.min:
+                day += timedelta(days=1)
+            parsed = day
+        window.append(parsed)
+    start, end = window
+    if start and end and end < start:
+        raise ValueError("end must not be before start")
+    return start, end
+
+def calendar_feed_etag(request, *args, **kwargs):
+    '''
+    etag for the events feed, built from the profile's calendar version
+    (bumped by signals on Event/EventCollaborator/EventInvite writes) and the query string,
+    so answering a matching If-None-Match never touches the event tables
+    '''
+    profile = request.profile
+    query = hashlib.md5(request.META.get("QUERY_STRING", "").encode()).hexdigest()[:12]
+    return f"cal-{profile.pk}-{profile.calendar_version}-{query}"
+
+def calendar_feed_events(profile, window_start, window_end):
+    ''' created and collaborator events in the window, in a single query'''
+    return Event.objects.visible_to(profile, window_start, window_end).order_by()
+
+# the columns the events feed reads, as tuples (no model instances)
+CALENDAR_FEED_COLUMNS = ('pk', 'event_title', 'event_date', 'event_start_time', 'event_end_time',
+                         'recurrence_frequency', 'recurrence_interval', 'recurrence_until', 'recurrence_count',
+                         'recurrence_exceptions')
+# rows per database fetch, and feed items per streamed chunk
+CALENDAR_FEED_FETCH_ROWS = 2000
+CALENDAR_FEED_CHUNK_ITEMS = 500
+# a pk no event has, the event url is reversed with it once and the real pks are put in its place
+EVENT_URL_PLACEHOLDER = 2147483647
+
+def calendar_feed_rows(profile, window_start, window_end):
+    ''' the feed's events in the window as tuples of CALENDAR_FEED_COLUMNS, in a single query'''
+    rows = calendar_feed_events(profile, window_start, window_end).values_list(*CALENDAR_FEED_COLUMNS)
+    # pick the database now (the replica inside replica_reads), the rows are read while the response streams
+    return rows.using(rows.db)
+
+class CalendarFeedEncoder:
+    '''
+    turns feed rows into the fullcalendar json array, {id,title,start,end,url} per occurrence
+    (recurring events are expanded only inside the window, and get "<pk>-<date>" ids and a groupId).
+    Items are written straight to json text: no Event instances, no datetime objects and one
+    reverse() per request instead of one per event. add() returns a chunk every CALENDAR_FEED_CHUNK_ITEMS items.
+    '''
+    def __init__(self, window_start, window_end):
+        self.window_start, self.window_end = window_start, window_end
+        # the quoted url around the pk: url_open + pk + url_close
+        before, after = reverse("event_details", args=[EVENT_URL_PLACEHOLDER]).split(str(EVENT_URL_PLACEHOLDER))
+        self.url_open, self.url_close = json.dumps(before)[:-1], json.dumps(after)[1:]
+        self.items = []
+        self.separator = "["
+
+    def add(self, row):
+        pk, title, day, start_time, end_time, frequency, interval, until, count, exceptions = row
+        title = json.dumps(title)
+        url = f'{self.url_open}{pk}{self.url_close}'
+        # the time part of the iso datetimes is the same for every occurrence
+        starts = f'T{(start_time or time.min).isoformat()}"'
+        ends = f'T{(end_time or time.max).isoformat()}"'
+        if not frequency:
+            # the query only returns single events inside the window
+            day = day.isoformat()
+            self.items.append(f'{{"id": {pk}, "title": {title}, "start": "{day}{starts}, "end": "{day}{ends}, "url": {url}}}')
+        else:
+            for day in recurrence.rule_dates(day, frequency, interval, until, count, exceptions,
+                                             self.window_start, self.window_end):
+                day = day.isoformat()
+                self.items.append(f'{{"id": "{pk}-{day}", "title": {title}, "start": "{day}{starts}, '
+                                  f'"end": "{day}{ends}, "url": {url}, "groupId": {pk}}}')
+        if len(self.items) >= CALENDAR_FEED_CHUNK_ITEMS:
+            chunk = self.separator + ", ".join(self.items)
+            self.items, self.separator = [], ", "
+            return chunk
+        return None
+
+    def end(self):
+        ''' the rest of the array'''
+        if self.items:
+            return self.separator + ", ".join(self.items) + "]"
+        return "[]" if self.separator == "[" else "]"
+
+def calendar_feed_chunks(rows, encoder):
+    ''' the feed as json text chunks, reading the rows as it goes'''
+    for row in rows:
+        chunk = encoder.add(row)
+        if chunk:
+            yield chunk
+    yield encoder.end()
+
+async def acalendar_feed_chunks(rows, encoder):
+    ''' the same for the async view, rows (a queryset) are read a batch at a time on the sync thread'''
+    rows = rows.iterator(chunk_size=CALENDAR_FEED_FETCH_ROWS)
+    next_batch = sync_to_async(lambda: list(islice(rows, CALENDAR_FEED_FETCH_ROWS)))
+    while batch := await next_batch():
+        for row in batch:
+            chunk = encoder.add(row)
+            if chunk:
+                yield chunk
+    yield encoder.end()
+
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
 class EventJsonFeedView(LoginRequiredMixin, View):
     '''
     give a json feed of events for fullcalendar
-    returns a list of {title,start,end,id,url}
+    returns a list of {title,start,end,id,url}, streamed (see CalendarFeedEncoder)
     '''
+    # the browser must revalidate every time, then gets a 304 when nothing changed
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=calendar_feed_etag))
     def get(self, request, *args, **kwargs):
-        profile = request.user.project_profile
-
-        # grab both created and collaborator events
-        created = Event.objects.filter(event_creator=profile)
-        collab_qs = EventCollaborator.objects.filter(collaborator=profile)
-        events = list(created) + [c.event for c in collab_qs]
-
-        data = []
-        for ev in events:
-            start = datetime.combine(ev.event_date, ev.event_start_time or time.min)
-            end   = datetime.combine(ev.event_date, ev.event_end_time or time.max)
-            data.append({
-                "id":    ev.pk,
-                "title": ev.event_title,
-                "start": start.isoformat(),
-                "end":   end.isoformat(),
-                "url":   reverse("event_details", args=[ev.pk]),
-            })
-        return JsonResponse(data, safe=False)
+        profile = request.profile
+
+        # only the range fullcalendar is showing
+        try:
+            window_start, window_end = parse_calendar_window(request)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        # streamed, the whole window is never held as one list or one json string
+        rows = calendar_feed_rows(profile, window_start, window_end).iterator(chunk_size=CALENDAR_FEED_FETCH_ROWS)
+        return StreamingHttpResponse(calendar_feed_chunks(rows, CalendarFeedEncoder(window_start, window_end)),
+                                     content_type="application/json")
+
+# longest range the per-day counts can be asked for
+DENSITY_MAX_DAYS = 5 * 366
+
+def event_density_window(request):
+    ''' the range of the per-day counts: ?start=&end=, by default the year from start (or today)'''
+    start, end = parse_calendar_window(request)
+    start = start or date.today()
+    return start, end or start + timedelta(days=365)
+
+def event_density_etag(request, *args, **kwargs):
+    '''
+    etag for the per-day counts, like the feed's but built from the resolved range
+    (a request without one covers a different year tomorrow)
+    '''
+    try:
+        start, end = event_density_window(request)
+    except ValueError:
+        return None
+    profile = request.profile
+    return f"density-{profile.pk}-{profile.calendar_version}-{start.isoformat()}-{end.isoformat()}"
+
+@method_decorator(replica_reads, name="dispatch") # read only, may use the replica
+class EventDensityView(LoginRequiredMixin, View):
+    '''
+    how many events you have per day, by type, for the year view and the heatmap
+    GET ?start=YYYY-MM-DD&end=YYYY-MM-DD (end exclusive, defaults to the year from start or today)
+    returns {"start": iso, "end": iso, "days": [{"date": iso, "total": n, "self": n, "friends": n, "work": n}, ...]},
+    only the days with events in them
+    '''
+    # same caching as the events feed, the etag covers the calendar version and the range
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=event_density_etag))
+    def get(self, request, *args, **kwargs):
+        try:
+            start, end = event_density_window(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        if (end - start).days > DENSITY_MAX_DAYS:
+            return JsonResponse({"error": "Ask for fewer days."}, status=400)
+        return JsonResponse({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": daily_counts(request.profile, start, end),
+        })
+
+# ics subscription window, in days around today (?past=..&future=..)
+ICS_DEFAULT_PAST_DAYS = 90
+ICS_DEFAULT_FUTURE_DAYS = 365
+ICS_MAX_DAYS = 5 * 365
+# rendered feeds up to this size are kept in the cache until the calendar changes
+ICS_CACHE_MAX_BYTES = 512 * 1024
+ICS_CACHE_TIMEOUT = 60 * 60 * 24
+
+def subscription_profile(request, token):
+    ''' the profile a calendar token belongs to (looked up once per request), or None'''
+    if not hasattr(request, "_subscription_profile"):
+        request._subscription_profile = (Profile.objects
+                                         .only("pk", "first_name", "last_name", "calendar_version")
+                                         .filter(calendar_token=token).first())
+    return request._subscription_profile
+
+def parse_subscription_window(request):
+    '''
+    read ?past=<days>&future=<days>, capped at ICS_MAX_DAYS
+    returns (past, future), raises ValueError for bad values
+    '''
+    window = []
+    for key, default in (("past", ICS_DEFAULT_PAST_DAYS), ("future", ICS_DEFAULT_FUTURE_DAYS)):
+        raw = request.GET.get(key)
+        try:
+            days = default if raw in (None, "") else int(raw)
+        except ValueError:
+            raise ValueError(f"Invalid {key} value: {raw}")
+        if days < 0:
+            raise ValueError(f"{key} must not be negative")
+        window.append(min(days, ICS_MAX_DAYS))
+    return tuple(window)
+
+def calendar_subscription_cache_key(request, profile):
+    ''' the window moves with today, so the day is part of the key as well as the calendar version'''
+    try:
+        past, future = parse_subscription_window(request)
+    except ValueError:
+        past, future = "bad", "bad"
+    return f"cal-ics-{profile.pk}-{profile.calendar_version}-{date.today().isoformat()}-{past}-{future}"
+
+def calendar_subscription_etag(request, token, *args, **kwargs):
+    ''' etag of the ics feed, no event queries needed to answer a 304'''
+    profile = subscription_profile(request, token)
+    if profile is None:
+        return None
+    return hashlib.md5(calendar_subscription_cache_key(request, profile).encode()).hexdigest()
+
+class CalendarSubscriptionView(View):
+    '''
+    iCalendar feed of a profile's created and collaborator events,
+    for subscribing from other calendar apps. The secret token in the url is the login.
+    '''
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=calendar_subscription_etag))
+    def get(self, request, token, *args, **kwargs):
+        profile = subscription_profile(request, token)
+        if profile is None:
+            raise Http404("No such calendar.")
+        try:
+            past, future = parse_subscription_window(request)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        content_type = "text/calendar; charset=utf-8"
+        key = calendar_subscription_cache_key(request, profile)
+        cached = cache.get(key)
+        if cached is not None:
+            return HttpResponse(cached, content_type=content_type)
+
+        today = date.today()
+        window_start, window_end = today - timedelta(days=past), today + timedelta(days=future + 1)
+        events = (Event.objects.visible_to(profile, window_start, window_end)
+                  .order_by("event_date", "pk")
+                  .iterator(chunk_size=500))
+        lines = ics.iter_calendar(events, f"MyLife - {profile.get_name()}",
+                                  url_for=lambda ev: request.build_absolute_uri(reverse("event_details", args=[ev.pk])))
+        return StreamingHttpResponse(self.stream_and_cache(lines, key), content_type=content_type)
+
+    @staticmethod
+    def stream_and_cache(lines, key):
+        ''' pass the feed through, keeping a copy for the cache only while it is small enough'''
+        kept, size = [], 0
+        for line in lines:
+            chunk = line.encode("utf-8")
+            if kept is not None:
+                size += len(chunk)
+                if size <= ICS_CACHE_MAX_BYTES:
+                    kept.append(chunk)
+                else:
+                    kept = None
+            yield chunk
+        if kept is not None:
+            cache.set(key, b"".join(kept), ICS_CACHE_TIMEOUT)
+
+# limits of the free slot search
+FREE_SLOTS_MAX_DAYS = 366
+FREE_SLOTS_MAX_PROFILES = 100
+
+class FreeSlotsView(LoginRequiredMixin, View):
+    '''
+    common free time of the logged in profile and some of their accepted collaborators
+    GET ?profiles=1,2,3&start=YYYY-MM-DD&end=YYYY-MM-DD (end exclusive)
+        &min_minutes=30&day_start=08:00&day_end=20:00
+    returns {"slots": [{"start": iso, "end": iso}, ...]}
+    '''
+    def get(self, request, *args, **kwargs):
+        profile = request.profile
+        try:
+            start, end = parse_calendar_window(request)
+            wanted = {int(pk) for pk in request.GET.get("profiles", "").split(",") if pk.strip()}
+            min_length = timedelta(minutes=int(request.GET.get("min_minutes", 30)))
+            day_start = time.fromisoformat(request.GET.get("day_start", "08:00"))
+            day_end = time.fromisoformat(request.GET.get("day_end", "20:00"))
+        except (ValueError, OverflowError) as e:
+            # OverflowError: a min_minutes too large for a timedelta
+            return JsonResponse({"error": str(e) or "Invalid parameters."}, status=400)
+        start = start or date.today()
+        end = end or start + timedelta(days=7)
+        if (end - start).days > FREE_SLOTS_MAX_DAYS or len(wanted) > FREE_SLOTS_MAX_PROFILES:
+            return JsonResponse({"error": "Ask for fewer days or people."}, status=400)
+        if min_length <= timedelta(0) or day_end <= day_start:
+            return JsonResponse({"error": "Invalid parameters."}, status=400)
+
+        # only your own calendar and those of accepted collaborators can be looked at
+        wanted.discard(profile.pk)
+        if not wanted <= collaborator_ids(profile):
+            return JsonResponse({"error": "You can only compare calendars with your collaborators."}, status=403)
+        slots = common_free_slots(wanted | {profile.pk}, start, end, min_length, day_start, day_end)
+        return JsonResponse({"slots": [{"start": s.isoformat(), "end": e.isoformat()} for s, e in slots]})
+
+class SearchView(LoginRequiredMixin, View):
+    '''
+    search-as-you-type over your events and their posts
+    GET ?q=<text>&limit=<n>, returns {"results": [{kind,id,event_id,title,snippet,url}, ...]} best first
+    '''
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get("limit", 20))
+        except ValueError:
+            return JsonResponse({"error": "limit must be a number."}, status=400)
+        results = search_events(request.profile, request.GET.get("q", ""), limit)
+        for result in results:
+            result["url"] = reverse("event_details", args=[result["event_id"]])
+        return JsonResponse({"results": results})
+
+class ResetCalendarTokenView(LoginRequiredMixin, View):
+    ''' give the logged in profile a new calendar subscription url (the old one stops working)'''
+    def post(self, request, *args, **kwargs):
+        request.profile.reset_calendar_token()
+        messages.success(request, "Your calendar subscription link was reset.")
+        return redirect("show_profile")
+
+class ImportCalendarView(LoginRequiredMixin, View):
+    '''
+    upload an .ics file (POST field "file") into the logged in profile's calendar
+    the upload is parsed line by line and written in batches, events already imported are skipped
+    '''
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return JsonResponse({"error": "No file uploaded."}, status=400)
+        # decode the upload line by line instead of reading it into memory
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        result = import_events(lines, request.profile)
+        # a file that stops being UTF-8 part way is an error, with the counts of what was imported before it
+        return JsonResponse(result, status=400 if "error" in result else 200)
 
 def send_collab_invite(request, pk):
     ''' allow a user to invite someone as a collaborator '''
@@ -484,7 +832,7 @@ def send_collab_invite(request, pk):
         form = CollaboratorInviteForm(request.POST)
         if form.is_valid():
             # send invite from current user to target
-            result = request.user.project_profile.add_collaborator(target.user, form.cleaned_data["collaborator_type"])
+            result = request.profile.add_collaborator(target.user, form.cleaned_data["collaborator_type"])
             messages.success(request, result)
             return redirect("show_person", pk=target.pk)
     else:
@@ -501,18 +849,16 @@ def respond_collab_invite(request, cid, decision):
         messages.error(request, "Invite not found.")
         return redirect("show_profile")
 
-    if invite.invitee != request.user.project_profile:
+    if invite.invitee != request.profile:
         messages.error(request, "That invite isn’t for you.")
         return redirect("show_profile")
 
-    if decision == "accept":
-        invite.invite_status = "accepted"
-        invite.save()
-        messages.success(request, "Collaborator request accepted.")
-    elif decision == "reject":
-        invite.invite_status = "rejected"
-        invite.save()
-        messages.success(request, "Collaborator request rejected.")
+    if decision in DECISIONS:
+        # only a still pending invite can be answered (a second click does nothing)
+        if settle_collaborator_invites(Collaborator.objects.filter(pk=invite.pk), decision):
+            messages.success(request, f"Collaborator request {DECISIONS[decision]}.")
+        else:
+            messages.error(request, "That invite was already answered.")
     return redirect("show_profile")
 
 def send_event_invite(request, event_id):
@@ -523,21 +869,19 @@ def send_event_invite(request, event_id):
         messages.error(request, "Event not found.")
         return redirect("calendar")
 
-    if event.event_creator != request.user.project_profile:
+    if event.event_creator != request.profile:
         messages.error(request, "Only the creator can invite.")
         return redirect("event_details", pk=event.pk)
 
     form = EventInviteForm(request.POST or None)
-    # only show people who are already accepted collaborators
-    accepted = Collaborator.objects.filter(
-        inviter=request.user.project_profile, invite_status="accepted"
-    ).values_list("invitee", flat=True)
+    # only show people who are already accepted collaborators (either direction)
+    accepted = collaborator_ids(request.profile)
     form.fields["invitee_id"].queryset = Profile.objects.filter(pk__in=accepted)
 
     if request.method == "POST" and form.is_valid():
         invitee = form.cleaned_data["invitee_id"]
         # send the event invite
-        msg = request.user.project_profile.add_event_collaborator(
+        msg = request.profile.add_event_collaborator(
             event, invitee.user
         )
         messages.success(request, msg)
@@ -554,19 +898,69 @@ def respond_event_invite(request, iid, decision):
         messages.error(request, "Invite not found.")
         return redirect("calendar")
 
-    if invite.invitee != request.user.project_profile:
+    if invite.invitee != request.profile:
         messages.error(request, "That invite isn’t for you.")
         return redirect("calendar")
 
-    if decision == "accept":
-        request.user.project_profile.accept_event_collaborator(invite.event)
-        messages.success(request, "You’re now on the event!")
-    elif decision == "reject":
-        invite.invite_status = "rejected"
-        invite.save()
-        messages.success(request, "Invite rejected.")
+    if decision in DECISIONS:
+        # only a still pending invite can be answered (a second click does nothing)
+        if not settle_event_invites(EventInvite.objects.filter(pk=invite.pk), decision):
+            messages.error(request, "That invite was already answered.")
+        elif decision == "accept":
+            messages.success(request, "You’re now on the event!")
+            warning = describe_conflicts(find_conflicts(invite.event, [request.profile.pk]))
+            if warning:
+                messages.warning(request, warning)
+        else:
+            messages.success(request, "Invite rejected.")
     return redirect("event_details", pk=invite.event.pk)
 
+class RespondToInvitesView(LoginRequiredMixin, View):
+    """
+    json endpoint to accept or reject many invites at once, all in one transaction
+    POST decision=accept|reject&collab=1&collab=2&event_invite=3... or a json body
+    {"decision": "accept", "collab": [1, 2], "event_invite": [3]}
+    returns the ids that were settled, {"collab": [...], "event_invite": [...]}
+    (invites that aren't yours or were already answered are left out)
+    """
+    # the most invites that can be answered in one request
+    max_invites = 500
+
+    def post(self, request, *args, **kwargs):
+        # read the decision and ids from either a json body or form values
+        if request.content_type == "application/json":
+            try:
+                body = json.loads(request.body or b"{}")
+                decision, raw_collab, raw_event = body.get("decision"), body.get("collab", []), body.get("event_invite", [])
+            except (ValueError, AttributeError):
+                return JsonResponse({"error": "Invalid JSON body."}, status=400)
+        else:
+            decision = request.POST.get("decision")
+            raw_collab, raw_event = request.POST.getlist("collab"), request.POST.getlist("event_invite")
+        if decision not in DECISIONS:
+            return JsonResponse({"error": "decision must be accept or reject."}, status=400)
+        # a string would be read one character at a time ("12" -> 1, 2)
+        if not isinstance(raw_collab, list) or not isinstance(raw_event, list):
+            return JsonResponse({"error": "Invites must be lists of ids."}, status=400)
+        try:
+            collab_ids = [int(value) for value in raw_collab]
+            event_invite_ids = [int(value) for value in raw_event]
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invites must be ids."}, status=400)
+        if not collab_ids and not event_invite_ids:
+            return JsonResponse({"error": "No invites given."}, status=400)
+        if len(collab_ids) + len(event_invite_ids) > self.max_invites:
+            return JsonResponse({"error": f"At most {self.max_invites} invites per request."}, status=400)
+
+        profile = request.profile
+        with transaction.atomic():
+            collabs = settle_collaborator_invites(
+                Collaborator.objects.filter(pk__in=collab_ids, invitee=profile), decision) if collab_ids else []
+            event_invites = settle_event_invites(
+                EventInvite.objects.filter(pk__in=event_invite_ids, invitee=profile), decision) if event_invite_ids else []
+        return JsonResponse({"collab": sorted(invite.pk for invite in collabs),
+                             "event_invite": sorted(invite.pk for invite in event_invites)})
+
 class InviteEventCollaboratorView(LoginRequiredMixin, View):
     """
     view to show a list of profiles and send event invites
@@ -580,7 +974,7 @@ class InviteEventCollaboratorView(LoginRequiredMixin, View):
     def get(self, request, pk):
         event = self.get_event(pk)
         # choose all other profiles as candidates
-        candidates = Profile.objects.exclude(pk=request.user.project_profile.pk)
+        candidates = Profile.objects.exclude(pk=request.profile.pk)
         return render(request, self.template_name, {
             "event": event,
             "candidates": candidates,
@@ -588,11 +982,10 @@ class InviteEventCollaboratorView(LoginRequiredMixin, View):
 
     def post(self, request, pk):
         event = self.get_event(pk)
-        inviter_profile = request.user.project_profile
-        invitee_pk = request.POST.get("invitee_pk")
-        try:
-            invitee = Profile.objects.get(pk=invitee_pk)
-        except Profile.DoesNotExist:
+        inviter_profile = request.profile
+        # one or many people can be picked
+        invitee_pks = [value for value in request.POST.getlist("invitee_pk") if value.isdigit()]
+        if not invitee_pks:
             # re-show form with error
             return render(request, self.template_name, {
                 "event": event,
@@ -600,6 +993,137 @@ class InviteEventCollaboratorView(LoginRequiredMixin, View):
                 "error": "Selected user not found.",
             })
 
-        # send the invite and go back to event page
-        inviter_profile.add_event_collaborator(event, invitee)
-        return redirect("event_details", pk=pk)
\ No newline at end of file
+        # send all the invites in one go and report each outcome
+        outcomes = inviter_profile.add_event_collaborators(event, [int(value) for value in invitee_pks])
+        for outcome in outcomes.values():
+            if outcome == 'sent':
+                continue
+            messages.warning(request, Profile.EVENT_INVITE_MESSAGES[outcome])
+        sent = sum(1 for outcome in outcomes.values() if outcome == 'sent')
+        if sent:
+            messages.success(request, f"{sent} event invite(s) sent!")
+        # go back to event page
+        return redirect("event_details", pk=pk)
+
+class BulkInviteEventCollaboratorsView(LoginRequiredMixin, View):
+    """
+    json endpoint to invite many profiles to an event at once
+    POST invitee_pk=1&invitee_pk=2... or a json body {"invitees": [1, 2, ...]}
+    returns {"results": [{"profile": pk, "outcome": ..., "message": ...}, ...]}
+    """
+    # the most people that can be invited in one request
+    max_invitees = 500
+
+    def post(self, request, pk):
+        try:
+            event = Event.objects.get(pk=pk)
+        except Event.DoesNotExist:
+            return JsonResponse({"error": "Event not found."}, status=404)
+
+        # same rule as the event page's invite button
+        profile = request.profile
+        if event.event_creator_id != profile.pk and not event.collaborators.filter(collaborator=profile).exists():
+            return JsonResponse({"error": "Not allowed"}, status=403)
+
+        # read the invitee pks from either a json body or form values
+        if request.content_type == "application/json":
+            try:
+                raw = json.loads(request.body or b"{}").get("invitees", [])
+            except (ValueError, AttributeError):
+                return JsonResponse({"error": "Invalid JSON body."}, status=400)
+        else:
+            raw = request.POST.getlist("invitee_pk")
+        # a string would be read one character at a time ("123" -> 1, 2, 3)
+        if not isinstance(raw, list):
+            return JsonResponse({"error": "Invitees must be a list of profile ids."}, status=400)
+        try:
+            invitee_pks = [int(value) for value in raw]
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invitees must be profile ids."}, status=400)
+        if not invitee_pks:
+            return JsonResponse({"error": "No invitees given."}, status=400)
+        if len(invitee_pks) > self.max_invitees:
+            return JsonResponse({"error": f"At most {self.max_invitees} invitees per request."}, status=400)
+
+        outcomes = profile.add_event_collaborators(event, invitee_pks)
+        results = [
+            {"profile": invitee_pk, "outcome": outcome, "message": Profile.EVENT_INVITE_MESSAGES[outcome]}
+            for invitee_pk, outcome in outcomes.items()
+        ]
+        return JsonResponse({"results": results})
+
+### WORK LOG REPORTS ###
+
+class WorkLogRollupReportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    '''
+    hours per category per day/week/month, read from the WorkLogRollup table
+    GET ?period=week&start=YYYY-MM-DD&end=YYYY-MM-DD (defaults to the last year)
+    '''
+    permission_required = "MyLife.view_worklog"
+
+    def get(self, request, *args, **kwargs):
+        period = request.GET.get("period", "week")
+        if period not in dict(WorkLogRollup.PERIODS):
+            return JsonResponse({"error": "period must be day, week or month."}, status=400)
+        try:
+            start, end = parse_calendar_window(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        end = end or date.today() + timedelta(days=1)
+        start = start or end - timedelta(days=365)
+        return JsonResponse({
+            "period": period,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "rows": hours_report(period, start, end),
+        })
+
+class WorkLogImportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    '''
+    upload a CSV/NDJSON file of work logs (POST field "file", optional "format")
+    the upload is streamed into WorkLog in chunked transactions, bad rows are skipped and reported
+    '''
+    permission_required = "MyLife.add_worklog"
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return JsonResponse({"error": "No file uploaded."}, status=400)
+        fmt = request.POST.get("format") or guess_format(upload.name)
+        if fmt not in WORKLOG_FORMATS:
+            return JsonResponse({"error": "format must be csv or ndjson."}, status=400)
+        # decode the upload line by line instead of reading it into memory
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        result = import_worklogs(read_rows(lines, fmt), skip_errors=True)
+        # a file that stops being UTF-8 part way is an error, with the counts of what was imported before it
+        return JsonResponse(result, status=400 if "error" in result else 200)
+
+class WorkLogExportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    '''
+    stream every work log as CSV or NDJSON (GET ?format=csv|ndjson)
+    '''
+    permission_required = "MyLife.view_worklog"
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get("format", "csv")
+        if fmt not in WORKLOG_FORMATS:
+            return JsonResponse({"error": "format must be csv or ndjson."}, status=400)
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(export_worklogs(fmt), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="worklogs.{fmt}"'
+        return response
+
+def metrics_view(request):
+    '''
+    per-view request/SQL metrics of this process in the Prometheus text format
+    readable by staff, or with "Authorization: Bearer <MYLIFE_METRICS_TOKEN>"
+    '''
+    token = getattr(settings, "MYLIFE_METRICS_TOKEN", None)
+    authorized = request.user.is_authenticated and request.user.is_staff
+    # constant time, so the token can't be guessed a character at a time (bytes, a header may not be ascii)
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if token and hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+        authorized = True
+    if not authorized:
+        return HttpResponseForbidden("Not allowed")
+    return HttpResponse(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,192 @@
+# File: worklog_io.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: streaming CSV/NDJSON import and export of WorkLog rows
+
+from datetime import date, time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+import csv
+import json
+
+from django.db import transaction
+
+from .models import WorkLog
+from .worklog_rollups import add_to_rollups
+
+# the columns of an import/export, in order
+WORKLOG_COLUMNS = ['date', 'start_time', 'end_time', 'duration', 'category', 'description']
+
+# the supported file formats
+FORMATS = ('csv', 'ndjson')
+
+# rows per bulk_create / transaction
+DEFAULT_BATCH_SIZE = 1000
+
+# how many bad rows are reported back in detail
+MAX_REPORTED_ERRORS = 50
+
+# the error of an import that stopped part way because the rest of the file isn't text
+NOT_UTF8 = 'The file must be UTF-8 text.'
+
+_CATEGORIES = {code for code, _ in WorkLog.CATEGORY_CHOICES}
+# the largest duration WorkLog.duration (4 digits, one decimal) can hold
+MAX_DURATION = Decimal('999.9')
+
+
+def guess_format(filename, default='csv'):
+    ''' Returns the format from a file name's extension'''
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_rows(lines, fmt):
+    '''
+    Yield one dict per record from an iterable of text lines, never holding the whole file.
+    CSV needs a header row naming the WORKLOG_COLUMNS it has.
+    '''
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+    elif fmt == 'ndjson':
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # still yield something so the bad line is counted and reported
+                record = {'__error__': f'line {number} is not valid JSON'}
+            if not isinstance(record, dict):
+                record = {'__error__': f'line {number} is not a JSON object'}
+            yield record
+    else:
+        raise ValueError(f'Unknown format: {fmt}')
+
+
+def _optional(record, key):
+    ''' Returns a stripped string value, or None for missing/blank values'''
+    value = record.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def build_worklog(record):
+    '''
+    Turn one imported record into an unsaved WorkLog with its duration filled in,
+    the same way WorkLog.save would (including the overnight wrap).
+    Raises ValueError with a readable message for bad records.
+    '''
+    if '__error__' in record:
+        raise ValueError(record['__error__'])
+
+    raw_date = _optional(record, 'date')
+    log_date = date.fromisoformat(raw_date) if raw_date else date.today()
+    raw_start = _optional(record, 'start_time')
+    raw_end = _optional(record, 'end_time')
+    start_time = time.fromisoformat(raw_start) if raw_start else None
+    end_time = time.fromisoformat(raw_end) if raw_end else None
+
+    category = _optional(record, 'category')
+    if category not in _CATEGORIES:
+        raise ValueError(f'unknown category {category!r}')
+
+    duration = WorkLog.compute_duration(log_date, start_time, end_time)
+    if duration is None and _optional(record, 'duration') is not None:
+        duration = _optional(record, 'duration')
+    if duration is not None:
+        try:
+            duration = Decimal(str(duration)).quantize(Decimal('0.1'))
+        except InvalidOperation:
+            # not a number, or Infinity
+            raise ValueError(f'invalid duration {record.get("duration")!r}')
+        # NaN, negative, or too wide for the column (the insert would fail and take the whole chunk with it)
+        if not duration.is_finite() or not 0 <= duration <= MAX_DURATION:
+            raise ValueError(f'duration {record.get("duration")!r} is not between 0 and {MAX_DURATION}')
+
+    return WorkLog(date=log_date, start_time=start_time, end_time=end_time, duration=duration,
+                   category=category, description=_optional(record, 'description') or '')
+
+
+def import_worklogs(records, batch_size=DEFAULT_BATCH_SIZE, skip_errors=False):
+    '''
+    Insert records in chunked transactions (one bulk_create + one rollup update per chunk).
+    With skip_errors, bad records are counted and reported instead of stopping the import;
+    otherwise the first bad record raises ValueError (earlier chunks stay committed).
+    Returns {"imported": n, "skipped": n, "errors": [messages]}, plus "error" when the file
+    turned out not to be UTF-8 part way (the chunks before that stay imported).
+    '''
+    result = {'imported': 0, 'skipped': 0, 'errors': []}
+    records = iter(records)
+    number = 0
+    while True:
+        try:
+            chunk = list(islice(records, batch_size))
+        except UnicodeDecodeError:
+            # lines are decoded as they are read, so this can come after chunks were saved
+            result['error'] = NOT_UTF8
+            result['errors'].append(f'the file is not UTF-8 text after record {number}, the rest was not imported')
+            break
+        if not chunk:
+            break
+        logs = []
+        for record in chunk:
+            number += 1
+            try:
+                logs.append(build_worklog(record))
+            except (ValueError, TypeError) as e:
+                message = f'record {number}: {e}'
+                if not skip_errors:
+                    raise ValueError(message)
+                result['skipped'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append(message)
+        if not logs:
+            continue
+        with transaction.atomic():
+            WorkLog.objects.bulk_create(logs)
+            # bulk_create skips WorkLog.save, so update the rollups for the whole chunk here
+            add_to_rollups(log.rollup_state() for log in logs)
+        result['imported'] += len(logs)
+    return result
+
+
+class _Echo:
+    ''' file-like object for csv.writer that just hands back what is written'''
+    def write(self, value):
+        return value
+
+
+def _format_value(value):
+    ''' Returns a value as export text (iso dates/times, blank for None)'''
+    if value is None:
+        return ''
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def export_worklogs(fmt, queryset=None, chunk_size=2000):
+    '''
+    Yield the export of every WorkLog (or the given queryset) line by line.
+    Rows are read with a server side iterator, so memory stays flat for millions of rows.
+    '''
+    queryset = WorkLog.objects.all() if queryset is None else queryset
+    rows = queryset.order_by('pk').values_list(*WORKLOG_COLUMNS).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(WORKLOG_COLUMNS)
+        for row in rows:
+            yield writer.writerow([_format_value(value) for value in row])
+    elif fmt == 'ndjson':
+        for row in rows:
+            record = {column: (_format_value(value) if value is not None else None)
+                      for column, value in zip(WORKLOG_COLUMNS, row)}
+            yield json.dumps(record) + '\n'
+    else:
+        raise ValueError(f'Unknown format: {fmt}')
@@ -0,0 +1,140 @@
+# File: worklog_rollups.py
+# Author: Si Yeon Cho (seancho@bu.edu)
+# Description: keeps the daily/weekly/monthly WorkLog totals per category up to date
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import WorkLog, WorkLogRollup
+
+# rollups are stored with one decimal, like WorkLog.duration
+ONE_DECIMAL = Decimal('0.1')
+
+
+def _as_date(value):
+    ''' WorkLog.date defaults to timezone.now, which is a datetime until the row is reloaded'''
+    if isinstance(value, datetime):
+        # same conversion DateField does when it saves an aware datetime
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _as_hours(value):
+    ''' Returns a duration as a one decimal Decimal (0 when unknown)'''
+    if value is None:
+        return Decimal('0.0')
+    return Decimal(str(value)).quantize(ONE_DECIMAL)
+
+
+def period_starts(day):
+    ''' Returns {period: first day of the bucket} for the day, week (monday) and month a date falls in'''
+    day = _as_date(day)
+    return {
+        'day': day,
+        'week': day - timedelta(days=day.weekday()),
+        'month': day.replace(day=1),
+    }
+
+
+def apply_delta(day, category, hours, count):
+    ''' Add hours/count (either may be negative) to the three rollup rows a log belongs to'''
+    for period, start in period_starts(day).items():
+        rows = WorkLogRollup.objects.filter(period=period, period_start=start, category=category)
+        if rows.update(total_duration=F('total_duration') + hours, entry_count=F('entry_count') + count):
+            continue
+        try:
+            # first log in this bucket
+            with transaction.atomic():
+                WorkLogRollup.objects.create(period=period, period_start=start, category=category,
+                                             total_duration=hours, entry_count=count)
+        except IntegrityError:
+            # someone else created the bucket in the meantime
+            rows.update(total_duration=F('total_duration') + hours, entry_count=F('entry_count') + count)
+
+
+def replace_in_rollups(old_state, new_state):
+    '''
+    Move a log from its old (date, category, duration) to the new one.
+    Either state may be None (a new or deleted log).
+    '''
+    if old_state is not None and new_state is not None:
+        old_day, old_category, old_duration = old_state
+        new_day, new_category, new_duration = new_state
+        if (_as_date(old_day), old_category, _as_hours(old_duration)) == (_as_date(new_day), new_category, _as_hours(new_duration)):
+            return  # nothing the rollups count changed
+    if old_state is not None:
+        day, category, duration = old_state
+        apply_delta(day, category, -_as_hours(duration), -1)
+    if new_state is not None:
+        day, category, duration = new_state
+        apply_delta(day, category, _as_hours(duration), 1)
+
+
+def add_to_rollups(states):
+    '''
+    Add many new logs at once (for bulk inserts that skip WorkLog.save).
+    Logs are summed per bucket first, so this is one update per touched bucket, not per log.
+    '''
+    buckets = defaultdict(lambda: [Decimal('0.0'), 0])
+    for day, category, duration in states:
+        for period, start in period_starts(day).items():
+            bucket = buckets[(period, start, category)]
+            bucket[0] += _as_hours(duration)
+            bucket[1] += 1
+    for (period, start, category), (hours, count) in buckets.items():
+        rows = WorkLogRollup.objects.filter(period=period, period_start=start, category=category)
+        if not rows.update(total_duration=F('total_duration') + hours, entry_count=F('entry_count') + count):
+            WorkLogRollup.objects.create(period=period, period_start=start, category=category,
+                                         total_duration=hours, entry_count=count)
+
+
+def rebuild_rollups():
+    '''
+    Recompute every rollup from the raw WorkLog table (backfill / repair).
+    Returns the number of rollup rows written.
+    '''
+    buckets = defaultdict(lambda: [Decimal('0.0'), 0])
+    # the database sums each day, python folds the days into weeks and months
+    daily = (WorkLog.objects.order_by().values('date', 'category')
+             .annotate(hours=Sum('duration'), entries=Count('id')))
+    for row in daily.iterator():
+        for period, start in period_starts(row['date']).items():
+            bucket = buckets[(period, start, row['category'])]
+            bucket[0] += _as_hours(row['hours'])
+            bucket[1] += row['entries']
+    with transaction.atomic():
+        WorkLogRollup.objects.all().delete()
+        WorkLogRollup.objects.bulk_create(
+            [WorkLogRollup(period=period, period_start=start, category=category,
+                           total_duration=hours, entry_count=count)
+             for (period, start, category), (hours, count) in buckets.items()],
+            batch_size=1000,
+        )
+    return len(buckets)
+
+
+def hours_report(period, start, end):
+    '''
+    Returns [{"period_start": iso date, "hours": {category: hours}, "entries": {category: count}}, ...]
+    for the buckets starting in [start, end), read from the rollups only.
+    '''
+    rows = (WorkLogRollup.objects
+            .filter(period=period, period_start__gte=start, period_start__lt=end, entry_count__gt=0)
+            .order_by('period_start', 'category')
+            .values_list('period_start', 'category', 'total_duration', 'entry_count'))
+    report = []
+    for period_start, category, hours, count in rows:
+        if not report or report[-1]['period_start'] != period_start.isoformat():
+            report.append({'period_start': period_start.isoformat(), 'hours': {}, 'entries': {}})
+        report[-1]['hours'][category] = float(hours)
+        report[-1]['entries'][category] = count
+    return report
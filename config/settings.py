@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
+import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,6 +27,9 @@ SECRET_KEY = 'django-insecure-q)0tz=@0!egci_z84_3n2o+oa6gid9g+sae7bxv)5stl8adb_!
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# running under `manage.py test`
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = []
 
 
@@ -41,11 +46,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'MyLife.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'MyLife.middleware.ProfileMiddleware',
+    'MyLife.db.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'MyLife.context_processors.profile',
             ],
         },
     },
@@ -80,6 +89,17 @@ DATABASES = {
     }
 }
 
+# optional read replica for the read heavy views (see MyLife/db.py).
+# MYLIFE_REPLICA_DB=replica.sqlite3 uses a second sqlite file, refreshed with `manage.py sync_replica`;
+# a postgres replica can be put here the same way. The test run has no replica (every read goes to default).
+if os.environ.get('MYLIFE_REPLICA_DB') and not TESTING:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.environ['MYLIFE_REPLICA_DB'],
+    }
+
+DATABASE_ROUTERS = ['MyLife.db.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -116,3 +136,59 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+
+# MyLife settings
+
+# worker threads that make the resized renditions of post images (0 = make them inline)
+MYLIFE_RENDITION_WORKERS = 2
+
+# most SQL queries a view may run per request, by url name (over budget is logged, and fails tests)
+MYLIFE_QUERY_BUDGETS = {
+    'user_dashboard': 8,
+    'events_json': 6,
+    'event_details': 12,
+    'event_post_feed': 8,
+    'calendar_subscription': 4,
+    'search': 6,
+}
+MYLIFE_QUERY_BUDGET_STRICT = TESTING
+
+# a query shape repeated this many times in one request is logged as a likely N+1
+MYLIFE_N_PLUS_ONE_THRESHOLD = 5
+
+# bearer token prometheus sends to read /metrics (staff users can always read it)
+MYLIFE_METRICS_TOKEN = None
+
+# database alias reads of the dashboard/profile/feed views may use, and how long a browser
+# stays on the primary after it wrote something
+MYLIFE_REPLICA_ALIAS = 'replica'
+MYLIFE_REPLICA_PIN_SECONDS = 5
+
+# serve the dashboard, event details and events feed with their native async views (MyLife/async_views.py).
+# Turn on when running under ASGI (uvicorn/daphne), under WSGI every request would go through async_to_sync
+MYLIFE_ASYNC_VIEWS = False
+# let those views run their independent queries at the same time, each on its own thread and connection.
+# Off in tests: the other connections can't see the test case's uncommitted rows
+MYLIFE_ASYNC_CONCURRENT_QUERIES = not TESTING
+
+# pub/sub broker behind the live updates stream (MyLife/push.py). The in-process one only reaches browsers
+# connected to the same server process, plug in one backed by a shared pub/sub (ex. redis) to run several
+MYLIFE_PUSH_BROKER = 'MyLife.push.InProcessBroker'
+# seconds between keep-alive comments on an idle stream, and before a stream ends (the browser reconnects)
+MYLIFE_PUSH_HEARTBEAT_SECONDS = 15
+MYLIFE_PUSH_STREAM_SECONDS = 300
+
+# how long the cached page fragments (event posts/collaborators/invites, profile invites) are kept;
+# they are keyed by version counters the signals bump, so this only bounds how long unused copies stay
+MYLIFE_FRAGMENT_CACHE_SECONDS = 3600
+
+# applied to every sqlite connection
+MYLIFE_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}